@@ -1,11 +1,21 @@
+import functools
+import os
+
 import gym
 import numpy
 
+from src import checkpoints
 from src import controllers
+from src import generators
+from src import genetics
+from src import optimizers
 from src import settings
+from src import simulators
 
 
 class CartPole(controllers.EnvironmentWorker):
+    batched = True
+
     def __init__(self, env: gym.Env):
         super().__init__(env)
         self.episode = 0
@@ -14,24 +24,36 @@ class CartPole(controllers.EnvironmentWorker):
 
     def reset(self, seed=None):
         if seed is not None:
-            rng = numpy.random.default_rng(seed)
+            # Not default_rng(seed), which would repeat the generators
+            # of the modules for the seeds 1000, 2000 and 4000
+            rng = numpy.random.default_rng(
+                generators.get_seed_sequence(seed, 'episode'))
         else:
             rng = numpy.random.default_rng()
         self.episode += 1
         episode = self.episode
-        intervals = settings.EPISODE_LEARN
+        intervals = self.config.episode_learn
         progress = (episode // intervals) * intervals
         unluck = rng.random() * 2 - 1
-        self.progress = progress / settings.EPISODE.CAP
+        self.progress = progress / self.config.episode_cap
         self.difficulty = self.progress * unluck
         self.position = 2 * self.difficulty
 
-    def get_action(self, observation: gym.core.ObsType) -> gym.core.ActType:
+    def get_output(self, observation):
         output = 0
         position = pid_point.get_output((node_point.get_output(observation, 0),), self.position)
         output += pid_pole.get_output((node_pole.get_output(observation, 0),), 0.0)
         output += pid_cart.get_output((node_cart.get_output(observation, 0),), position)
-        return action_space(output)
+        return output
+
+    def get_action(self, observation: gym.core.ObsType) -> gym.core.ActType:
+        return action_space(self.get_output(observation))
+
+    def get_actions(self, observations):
+        return (self.get_output(observations.T) > 0).astype(int)
+
+    def get_rewards(self, observations):
+        return self.get_reward(observations.T)
 
     def get_reward(self, observation: gym.core.ObsType) -> float:
         reward = abs(self.difficulty)
@@ -58,6 +80,9 @@ def action_space(output):
 
 settings.EPISODE.CAP *= 10
 settings.TIME_STEPS = 500
+# Highest reward of a step, 1 of the environment and at most
+# 1 of the difficulty in CartPole.get_reward(), to race candidates
+STEP_BOUND = 2.0
 
 PID_CART = (-4.4474, 0.0178, -0.2146)
 PID_POLE = (0.0541, 0.0496, 1.1687)
@@ -114,6 +139,8 @@ def generate_improving_model():
     manager.add_controller(node_cart)
     manager.add_controller(node_pole)
     manager.add_controller(node_point)
+    for controller in manager.controllers:
+        controller.step_bound = STEP_BOUND
     pid_pole = pid_pole.model
     pid_cart = pid_cart.model
     pid_point = pid_point.model
@@ -122,19 +149,139 @@ def generate_improving_model():
     node_point = node_point.model
 
 
-def main():
+def generate_tuning_model(method='spsa'):
+    global manager, pid_cart, pid_point, node_cart, node_point
+    global pid_pole, node_pole
+    pid_pole = optimizers.TuningPIDModel('PID_POLE', PID_POLE, method)
+    pid_cart = optimizers.TuningPIDModel('PID_CART', PID_CART, method)
+    pid_point = optimizers.TuningPIDModel('PID_POINT', PID_POINT, method)
+    node_pole = optimizers.TuningNodeModel('NODE_POLE', NODE_POLE, method)
+    node_cart = optimizers.TuningNodeModel('NODE_CART', NODE_CART, method)
+    node_point = optimizers.TuningNodeModel('NODE_POINT', NODE_POINT, method)
+    manager = controllers.ImprovingControllerManager()
+    manager.add_controller(pid_cart)
+    manager.add_controller(pid_pole)
+    manager.add_controller(pid_point)
+    manager.add_controller(node_cart)
+    manager.add_controller(node_pole)
+    manager.add_controller(node_point)
+    pid_pole = pid_pole.model
+    pid_cart = pid_cart.model
+    pid_point = pid_point.model
+    node_pole = node_pole.model
+    node_cart = node_cart.model
+    node_point = node_point.model
+
+
+def generate_genetic_model():
+    global manager, pid_cart, pid_point, node_cart, node_point
+    global pid_pole, node_pole
+    pid_pole = controllers.PIDModel(PID_POLE)
+    pid_cart = controllers.PIDModel(PID_CART)
+    pid_point = controllers.PIDModel(PID_POINT)
+    node_pole = controllers.NodeModel(NODE_POLE)
+    node_cart = controllers.NodeModel(NODE_CART)
+    node_point = controllers.NodeModel(NODE_POINT)
+    manager = genetics.GeneticEvolutionController()
+    for model in (pid_cart, pid_pole, pid_point,
+                  node_cart, node_pole, node_point):
+        manager.add_controller(model)
+    manager.resize_genetic_population(20)
+
+
+def generate_cmaes_model():
+    global manager, pid_cart, pid_point, node_cart, node_point
+    global pid_pole, node_pole
+    pid_pole = controllers.PIDModel(PID_POLE)
+    pid_cart = controllers.PIDModel(PID_CART)
+    pid_point = controllers.PIDModel(PID_POINT)
+    node_pole = controllers.NodeModel(NODE_POLE)
+    node_cart = controllers.NodeModel(NODE_CART)
+    node_point = controllers.NodeModel(NODE_POINT)
+    manager = optimizers.CMAESController()
+    for model in (pid_cart, pid_pole, pid_point,
+                  node_cart, node_pole, node_point):
+        manager.add_controller(model)
+
+
+def main(simulator=False, checkpoint=None, headless=False, stop_file=None):
     global env_manager
     generate_improving_model()
-    env = gym.make('CartPole-v1')
-    env_manager = controllers.EnvironmentManager(env, manager, CartPole(env))
+    if simulator:
+        env = simulators.make('CartPole-v1')
+    else:
+        env = gym.make('CartPole-v1')
+    writer = None
+    if checkpoint is not None:
+        writer = checkpoints.CheckpointWriter(checkpoint)
+    env_manager = controllers.EnvironmentManager(
+        env, manager, CartPole(env), checkpoint_writer=writer)
+    env_manager.racing = True
+    if checkpoint is not None and os.path.exists(checkpoint):
+        checkpoints.set_checkpoint(env_manager, checkpoints.load(checkpoint))
     # environment.controller.episode = environment.episode = Settings.EPISODE_CAP // 10 * 7
 
+    env_manager.run(headless, stop_file)
+    for i in range(manager.get_size()):
+        manager.select_controller(i)
+        print(manager.name, '=', manager.get_string())
+
+
+def main_vector(asynchronous=False, simulator=False):
+    global env_manager
+    generate_improving_model()
+    if simulator:
+        env = simulators.make('CartPole-v1')
+        vector_env = simulators.make('CartPole-v1', settings.EPISODE_LEARN)
+    else:
+        env = gym.make('CartPole-v1')
+        vector_env = gym.vector.make(
+            'CartPole-v1', settings.EPISODE_LEARN, asynchronous)
+    models = [pid_pole, pid_cart, pid_point, node_pole, node_cart, node_point]
+    env_manager = controllers.VectorEnvironmentManager(
+        env, manager, CartPole(env), vector_env, models)
+    env_manager.racing = True
+
     env_manager.run()
     for i in range(manager.get_size()):
         manager.select_controller(i)
         print(manager.name, '=', manager.get_string())
 
 
+def main_tuning(method='spsa', simulator=False):
+    global env_manager
+    generate_tuning_model(method)
+    # Room for both points of an SPSA iteration in a single batch
+    size = 2 * settings.EPISODE_LEARN
+    if simulator:
+        env = simulators.make('CartPole-v1')
+        vector_env = simulators.make('CartPole-v1', size)
+    else:
+        env = gym.make('CartPole-v1')
+        vector_env = gym.vector.make('CartPole-v1', size, asynchronous=False)
+    models = [pid_pole, pid_cart, pid_point, node_pole, node_cart, node_point]
+    env_manager = controllers.VectorEnvironmentManager(
+        env, manager, CartPole(env), vector_env, models)
+
+    episodes = 0
+
+    def evaluate_points(model, points):
+        nonlocal episodes
+        episodes += len(points) * settings.EPISODE_LEARN
+        return env_manager.evaluate_models(model, points)
+
+    while episodes < settings.EPISODE.CAP:
+        for i, controller in enumerate(manager.controllers):
+            manager.select_controller(i)
+            controller.evaluate(
+                functools.partial(evaluate_points, controller.model))
+        print('Episodes', episodes, manager.get_string())
+    env_manager.stop()
+    for i in range(manager.get_size()):
+        manager.select_controller(i)
+        print(manager.name, '=', manager.get_string())
+
+
 def main1():
     env = gym.make('CartPole-v1')
     env.reset(seed=1)
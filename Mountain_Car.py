@@ -1,14 +1,20 @@
+import functools
+
 import gym
+import numpy
 
 from src import controllers
 from src import genetics
+from src import optimizers
 from src import settings
+from src import simulators
 
 
 class MountainCar(controllers.EnvironmentWorker):
     position = 0.6
+    batched = True
 
-    def get_action(self, observation: gym.core.ObsType) -> gym.core.ActType:
+    def get_output(self, observation):
         output = 0
         n_point = node_point.get_output(observation, 0.0)
         n_cart = node_cart.get_output(observation, 0.0)
@@ -18,9 +24,19 @@ class MountainCar(controllers.EnvironmentWorker):
         #     output = cart_agent.get_output(observation[0], 0.6)
         # elif observation[1] > 0:
         #     output = cart_agent.get_output(observation[0], -1.2)
-        action = action_space(output)
+        return output
+
+    def get_action(self, observation: gym.core.ObsType) -> gym.core.ActType:
+        action = action_space(self.get_output(observation))
         return action
 
+    def get_actions(self, observations):
+        output = self.get_output(observations.T)
+        return numpy.select([output > 0.1, output < -0.1], [2, 0], 1)
+
+    def get_rewards(self, observations):
+        return self.get_reward(observations.T)
+
     def get_reward(self, observation: gym.core.ObsType) -> float:
         reward = 0
         position, speed = observation
@@ -48,6 +64,9 @@ def action_space(output):
 
 settings.EPISODE.CAP *= 10
 settings.TIME_STEPS = 250
+# Highest reward of a step, -1 of the environment and at most
+# 0.07 ** 0.2 at the top speed in MountainCar.get_reward()
+STEP_BOUND = -1 + 0.07 ** 0.2
 
 PID_CART = (0, 0, 0)
 # PID_CART = (-1.2978, -0.0252, -0.8364)
@@ -75,6 +94,25 @@ def generate_improving_model():
     manager.add_controller(pid_point)
     manager.add_controller(node_cart)
     manager.add_controller(node_point)
+    for controller in manager.controllers:
+        controller.step_bound = STEP_BOUND
+    pid_cart = pid_cart.model
+    pid_point = pid_point.model
+    node_cart = node_cart.model
+    node_point = node_point.model
+
+
+def generate_tuning_model(method='spsa'):
+    global manager, pid_cart, pid_point, node_cart, node_point
+    pid_cart = optimizers.TuningPIDModel('PID_CART', PID_CART, method)
+    pid_point = optimizers.TuningPIDModel('PID_POINT', PID_POINT, method)
+    node_cart = optimizers.TuningNodeModel('NODE_CART', NODE_CART, method)
+    node_point = optimizers.TuningNodeModel('NODE_POINT', NODE_POINT, method)
+    manager = controllers.ImprovingControllerManager()
+    manager.add_controller(pid_cart)
+    manager.add_controller(pid_point)
+    manager.add_controller(node_cart)
+    manager.add_controller(node_point)
     pid_cart = pid_cart.model
     pid_point = pid_point.model
     node_cart = node_cart.model
@@ -95,9 +133,70 @@ def generate_genetic_model():
     manager.resize_genetic_population(20)
 
 
-def main():
+def generate_cmaes_model():
+    global manager, pid_cart, pid_point, node_cart, node_point
+    pid_cart = controllers.PIDModel(PID_CART)
+    pid_point = controllers.PIDModel(PID_POINT)
+    node_cart = controllers.NodeModel(NODE_CART)
+    node_point = controllers.NodeModel(NODE_POINT)
+    manager = optimizers.CMAESController()
+    manager.add_controller(pid_cart)
+    manager.add_controller(pid_point)
+    manager.add_controller(node_cart)
+    manager.add_controller(node_point)
+
+
+def generate_evaluation(simulator=False, generate=True):
+    # Worker processes create models of their own, evaluators
+    # inside this process use the models of the script instead
+    if generate:
+        generate_genetic_model()
+    if simulator:
+        env = simulators.make('MountainCar-v0')
+    else:
+        env = gym.make('MountainCar-v0')
+    return env, MountainCar(env), manager
+
+
+def main_parallel(simulator=False, halving=False):
+    generate_genetic_model()
+    if simulator:
+        evaluator = genetics.BatchPopulationEvaluator(
+            functools.partial(generate_evaluation, True, False),
+            functools.partial(simulators.make, 'MountainCar-v0'))
+    else:
+        evaluator = genetics.PopulationEvaluator(generate_evaluation)
+    if halving:
+        evaluator = genetics.SuccessiveHalvingEvaluator(evaluator)
+    # Start a generation only while it fits the cap without halving
+    budget = manager.get_size() * settings.EPISODE_LEARN
+    generation, total = 0, 0
+    while total + budget <= settings.EPISODE.CAP:
+        manager.evaluate(evaluator)
+        if halving:
+            episodes = evaluator.episodes
+        else:
+            episodes = budget
+        population = manager.genetic_population
+        best = population.rank.argmax()
+        print('Generation', generation, population.get_name(best),
+              '=', population.get_gene(best))
+        controllers.decay_epsilon(episodes)
+        manager.explore()
+        generation += 1
+        total += episodes
+    evaluator.close()
+    for i in range(manager.get_size()):
+        manager.select_controller(i)
+        print(manager.name, '=', manager.get_string())
+
+
+def main(simulator=False):
     generate_genetic_model()
-    env = gym.make('MountainCar-v0')
+    if simulator:
+        env = simulators.make('MountainCar-v0')
+    else:
+        env = gym.make('MountainCar-v0')
     environment = controllers.EnvironmentManager(env, manager, MountainCar(env))
 
     environment.run()
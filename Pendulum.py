@@ -1,30 +1,45 @@
-import gym
+import functools
 import math
 
+import gym
+import numpy
+
 from src import controllers
 from src import settings
+from src import simulators
 
 
 class Pendulum(controllers.EnvironmentWorker):
+    batched = True
+
     def get_reward(self, observation: gym.core.ObsType) -> float:
         # reward -= abs(observation[0] - 0.50)
         # reward += abs(observation[1] * 100)
         return 0
 
     def get_action(self, observation: gym.core.ObsType) -> gym.core.ActType:
+        action = action_space(self.get_output(observation))
+        return action
+
+    def get_actions(self, observations):
+        return numpy.tanh(self.get_output(observations.T))[:, None] * 2
+
+    def get_rewards(self, observations):
+        return self.get_reward(observations.T)
+
+    def get_output(self, observation):
         output = 0
         n_point_x = node_point_x.get_output(observation, 0)
         n_point_y = node_point_y.get_output(observation, 0)
         # n_direct = node_direct.get_output(observation, 0)
         n_pendulum_x = node_pendulum_x.get_output(observation, 0)
-        n_pendulum_y = node_pendulum_x.get_output(observation, 0)
+        n_pendulum_y = node_pendulum_y.get_output(observation, 0)
         target_x = pid_point_x.get_output((n_point_x,), 0.0)
         target_y = pid_point_y.get_output((n_point_y,), 1.0)
         # output += pid_direct.get_output((n_direct,), 1.0)
         output += pid_pendulum_x.get_output((n_pendulum_x,), target_x)
         output += pid_pendulum_y.get_output((n_pendulum_y,), target_y)
-        action = action_space(output)
-        return action
+        return output
 
 
 def action_space(output):
@@ -34,6 +49,9 @@ def action_space(output):
 
 settings.EPISODE.recalculate(10)
 settings.EPISODE.CAP *= 10
+# Highest reward of a step, the environment never rewards
+# more than 0 and Pendulum.get_reward() adds nothing
+STEP_BOUND = 0.0
 
 PID_POINT_X = (0, 0, 0)
 PID_POINT_Y = (0, 0, 0)
@@ -84,8 +102,10 @@ def generate_improving_model():
     manager.add_controller(node_pendulum_y)
     manager.add_controller(node_point_x)
     manager.add_controller(node_point_y)
-    pid_pendulum_x = node_pendulum_x.model
-    pid_pendulum_y = node_pendulum_y.model
+    for controller in manager.controllers:
+        controller.step_bound = STEP_BOUND
+    pid_pendulum_x = pid_pendulum_x.model
+    pid_pendulum_y = pid_pendulum_y.model
     # pid_direct = node_direct.model
     pid_point_x = pid_point_x.model
     pid_point_y = pid_point_y.model
@@ -96,10 +116,14 @@ def generate_improving_model():
     node_point_y = node_point_y.model
 
 
-def main():
+def main(simulator=False):
     generate_improving_model()
-    env = gym.make('Pendulum-v1')
+    if simulator:
+        env = simulators.make('Pendulum-v1')
+    else:
+        env = gym.make('Pendulum-v1')
     environment = controllers.EnvironmentManager(env, manager, Pendulum(env))
+    environment.racing = True
 
     environment.run()
     for i in range(manager.get_size()):
@@ -107,5 +131,52 @@ def main():
         print(manager.name, '=', manager.get_string())
 
 
+def main_vector():
+    generate_improving_model()
+    env = simulators.make('Pendulum-v1')
+    vector_env = simulators.make('Pendulum-v1', settings.EPISODE_LEARN)
+    models = [pid_pendulum_x, pid_pendulum_y, pid_point_x, pid_point_y,
+              node_pendulum_x, node_pendulum_y, node_point_x, node_point_y]
+    environment = controllers.VectorEnvironmentManager(
+        env, manager, Pendulum(env), vector_env, models)
+    environment.racing = True
+
+    environment.run()
+    for i in range(manager.get_size()):
+        manager.select_controller(i)
+        print(manager.name, '=', manager.get_string())
+
+
+def main_lockstep(count=8):
+    generate_improving_model()
+    env = simulators.make('Pendulum-v1')
+    # Room for every candidate of a controller in a single batch
+    vector_env = simulators.make(
+        'Pendulum-v1', count * settings.EPISODE_LEARN)
+    models = [pid_pendulum_x, pid_pendulum_y, pid_point_x, pid_point_y,
+              node_pendulum_x, node_pendulum_y, node_point_x, node_point_y]
+    environment = controllers.VectorEnvironmentManager(
+        env, manager, Pendulum(env), vector_env, models)
+
+    episodes = 0
+
+    def evaluate_models(model, configurations):
+        nonlocal episodes
+        episodes += len(configurations) * settings.EPISODE_LEARN
+        controllers.decay_epsilon(len(configurations) * settings.EPISODE_LEARN)
+        return environment.evaluate_models(model, configurations)
+
+    while episodes < settings.EPISODE.CAP:
+        for i, controller in enumerate(manager.controllers):
+            manager.select_controller(i)
+            controller.evaluate(
+                functools.partial(evaluate_models, controller.model), count)
+        print('Episodes', episodes, manager.get_string())
+    environment.stop()
+    for i in range(manager.get_size()):
+        manager.select_controller(i)
+        print(manager.name, '=', manager.get_string())
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,92 @@
+"""
+Measures the import time of every module in src with `python -X importtime`.
+
+Every module is imported in a fresh interpreter, so the numbers include
+the dependencies a worker process pays for when it imports the module.
+The median over several runs and the heavy dependencies that got loaded
+are printed and written to a JSON file.
+
+Usage: python benchmarks/imports.py [--repeat 5] [--output imports.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    'src.settings',
+    'src.mutations',
+    'src.controllers',
+    'src.genetics',
+    'src.optimizers',
+    'src.simulators',
+    'src.visualizers',
+]
+HEAVY_MODULES = ['numpy', 'gym', 'tabulate', 'tkinter', 'multiprocessing']
+
+
+def parse_importtime(text) -> dict[str, tuple[int, int]]:
+    """
+    Parses the output of `python -X importtime`.
+
+    :param str text: Standard error of the interpreter
+    :return: Self and cumulative time in microseconds per module
+    """
+    times = {}
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[12:].split('|')
+        times[name.strip()] = (int(self_time), int(cumulative))
+    return times
+
+
+def measure_module(name, repeat=5) -> dict:
+    """
+    Imports the module in fresh interpreters and measures the time.
+
+    :param str name: Name of the module
+    :param int repeat: Amount of interpreters to start
+    :return: Median self and cumulative time in microseconds and
+     the heavy dependencies loaded by the import
+    """
+    self_times, cumulative_times = [], []
+    times = {}
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + name],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        times = parse_importtime(process.stderr)
+        self_time, cumulative = times[name]
+        self_times.append(self_time)
+        cumulative_times.append(cumulative)
+    return {
+        'self_us': statistics.median(self_times),
+        'cumulative_us': statistics.median(cumulative_times),
+        'heavy': [module for module in HEAVY_MODULES if module in times],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='imports.json')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.modules:
+        result = measure_module(name, args.repeat)
+        results[name] = result
+        print('{:<20} {:>10.1f} ms  {}'.format(
+            name, result['cumulative_us'] / 1000,
+            ', '.join(result['heavy'])))
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
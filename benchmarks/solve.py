@@ -0,0 +1,110 @@
+"""
+Counts the episodes every learner needs to solve the environments.
+
+Every learner trains with an EnvironmentManager on the NumPy simulators
+until one of its configurations solves every episode of its window, or
+until the budget of episodes runs out. CartPole is solved when the pole
+stays up for 475 steps, MountainCar when the car reaches the flag before
+the time limit. Every learner is run with several seeds and the median
+amount of episodes is reported, counting unsolved runs as the budget.
+
+Usage: python benchmarks/solve.py [--runs 3] [--budget 10000] [--output solve.json]
+python benchmarks/solve.py Cart_Pole --learners spsa nelder_mead
+"""
+import argparse
+import dataclasses
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import controllers  # noqa: E402
+from src import settings  # noqa: E402
+from src import simulators  # noqa: E402
+from suite import DEFAULT_SETTINGS, import_script  # noqa: E402
+
+ENVIRONMENTS = {
+    'Cart_Pole': ('CartPole-v1', 'CartPole', lambda steps: steps >= 475),
+    'Mountain_Car': ('MountainCar-v0', 'MountainCar', lambda steps: steps < 200),
+}
+LEARNERS = {
+    'improving': ('generate_improving_model',),
+    'genetic': ('generate_genetic_model',),
+    'cmaes': ('generate_cmaes_model',),
+    'spsa': ('generate_tuning_model', 'spsa'),
+    'nelder_mead': ('generate_tuning_model', 'nelder_mead'),
+}
+
+
+def solve(name, learner, seed, budget) -> int | None:
+    """
+    Trains a learner on an environment until a window is solved.
+
+    :param str name: Name of the environment script
+    :param str learner: Name of the learner, see :data:`LEARNERS`
+    :param int seed: Seed of the run
+    :param int budget: Highest amount of episodes
+    :return: Amount of episodes until the end of the first solved
+     window, None if no window was solved within the budget
+    """
+    env_name, worker_name, is_solved = ENVIRONMENTS[name]
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    script = import_script(name)
+    generate, *arguments = LEARNERS[learner]
+    getattr(script, generate)(*arguments)
+    # Keep the settings of the script without the logs
+    config = dataclasses.replace(
+        settings.RunConfig.from_module(), episode_show=budget + 1)
+    env = simulators.make(env_name)
+    manager = controllers.EnvironmentManager(
+        env, script.manager, getattr(script, worker_name)(env),
+        config=config, seed=seed)
+    manager.headless = True
+    manager.start()
+    solved = True
+    for episode in range(1, budget + 1):
+        manager.run_sequence()
+        solved = solved and is_solved(manager.time_steps - 1)
+        if manager.learn_episode != 0:
+            continue
+        if solved:
+            return episode
+        solved = True
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--budget', type=int, default=10000)
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--learners', nargs='*', default=list(LEARNERS),
+                        choices=list(LEARNERS))
+    parser.add_argument('names', nargs='*', default=list(ENVIRONMENTS),
+                        help='environment scripts to run')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.names:
+        for learner in args.learners:
+            episodes = [solve(name, learner, seed, args.budget)
+                        for seed in range(args.runs)]
+            median = statistics.median(
+                args.budget if e is None else e for e in episodes)
+            results[f'{name}/{learner}'] = {
+                'episodes': episodes, 'median': median}
+            print('{:<24} {:>8} episodes  solved {}/{}'.format(
+                f'{name}/{learner}', median,
+                sum(e is not None for e in episodes), len(episodes)))
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({'budget': args.budget, 'results': results},
+                      file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
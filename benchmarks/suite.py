@@ -0,0 +1,319 @@
+"""
+Times the hot paths of the controllers, the learners and the environments.
+
+Every benchmark reports the best time per call over several repeats.
+The results are written to a JSON baseline, and the compare mode flags
+every benchmark that got slower than the baseline by more than the
+tolerance. The end-to-end benchmarks run the training loop of every
+environment script in headless mode on the gym environments, or on the
+NumPy simulators with --simulator.
+
+Usage:
+python benchmarks/suite.py --output baseline.json
+python benchmarks/suite.py --compare baseline.json --tolerance 0.1
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import timeit
+
+import gym
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src import controllers  # noqa: E402
+from src import genetics  # noqa: E402
+from src import mutations  # noqa: E402
+from src import settings  # noqa: E402
+from src import simulators  # noqa: E402
+
+BENCHMARKS = {}
+DEFAULT_SETTINGS = settings.get_checkpoint()
+SCRIPT_SETTINGS = {}
+POPULATION_SIZES = (10, 50, 200, 10000)
+WINDOW_SIZES = (20, 200, 2000)
+# Allowed slowdown of episodes_Cart_Pole_timed over episodes_Cart_Pole
+TIMER_OVERHEAD = 0.01
+SCRIPTS = {
+    'Cart_Pole': ('CartPole-v1', 'CartPole', 'generate_improving_model'),
+    'Mountain_Car': ('MountainCar-v0', 'MountainCar', 'generate_genetic_model'),
+    'Pendulum': ('Pendulum-v1', 'Pendulum', 'generate_improving_model'),
+}
+
+
+def benchmark(name):
+    """
+    Registers a function that sets up a benchmark and returns
+    the function to time and how often to call it per repeat.
+
+    :param str name: Name of the benchmark
+    :return: Decorator of the setup function
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def import_script(name):
+    """
+    Imports an environment script and applies the settings which the
+    script changes on import, also when it was imported before.
+
+    :param str name: Name of the script module
+    :return: Module of the script
+    """
+    if name not in SCRIPT_SETTINGS:
+        importlib.import_module(name)
+        SCRIPT_SETTINGS[name] = settings.get_checkpoint()
+    settings.set_checkpoint(SCRIPT_SETTINGS[name])
+    return sys.modules[name]
+
+
+@benchmark('pid_get_output')
+def setup_pid_get_output():
+    model = controllers.PIDModel((1.0, 0.1, 2.0))
+    return lambda: model.get_output((0.5,), 0.0), 10000
+
+
+@benchmark('node_get_output')
+def setup_node_get_output():
+    model = controllers.NodeModel((0.5, 0.1, 2.0, 0.0))
+    observation = numpy.array([0.1, -0.2, 0.03, 0.4], dtype=numpy.float32)
+    return lambda: model.get_output(observation, 0), 10000
+
+
+@benchmark('cartpole_worker_step')
+def setup_cartpole_worker_step():
+    script = import_script('Cart_Pole')
+    script.generate_improving_model()
+    env = gym.make('CartPole-v1')
+    worker = script.CartPole(env)
+    worker.reset(seed=1)
+    observation = env.reset(seed=1)
+
+    def step():
+        worker.get_action(observation)
+        worker.get_reward(observation)
+    return step, 5000
+
+
+@benchmark('mutate_io_model')
+def setup_mutate_io_model():
+    current, previous = (1.0, 0.2, 3.0), (0.8, 0.2, 2.5)
+    return lambda: mutations.mutate_io_model(current, previous, 'pid'), 5000
+
+
+@benchmark('mutate_io_models_1000')
+def setup_mutate_io_models():
+    current, previous = (1.0, 0.2, 3.0), (0.8, 0.2, 2.5)
+    return lambda: mutations.mutate_io_models(
+        current, previous, 1000, 'pid'), 100
+
+
+def setup_genetic_explore(size):
+    controller = genetics.GeneticEvolutionController(size)
+    for preset in ((1, 0, 0), (0, 1, 0), (0.5, 0.5, 0.5, 0.5)):
+        if len(preset) == 3:
+            controller.add_controller(controllers.PIDModel(preset))
+        else:
+            controller.add_controller(controllers.NodeModel(preset))
+    rng = numpy.random.default_rng(0)
+
+    def explore():
+        controller.genetic_population.rank = rng.random(size)
+        controller.genetic_index = size - 1
+        controller.explore()
+    return explore, max(1, 2000 // size)
+
+
+def setup_monitor_window(size):
+    monitor = controllers.EnvironmentMonitor()
+    rng = numpy.random.default_rng(0)
+    episodes = [{
+        'episode': episode,
+        'reward': reward,
+        'difficulty': difficulty,
+        'steps': 200,
+        'seed': episode % 1000,
+    } for episode, reward, difficulty in zip(
+        range(1, size + 1), rng.normal(size=size).tolist(),
+        rng.random(size).tolist())]
+
+    def window():
+        for values in episodes:
+            monitor.monitor(values)
+        monitor.process(size)
+    return window, max(1, 20000 // size)
+
+
+def setup_episodes(name, simulator=False, timed=False):
+    env_name, worker_name, generate_name = SCRIPTS[name]
+    script = import_script(name)
+    getattr(script, generate_name)()
+    if simulator:
+        env = simulators.make(env_name)
+    else:
+        env = gym.make(env_name)
+    # The seed keeps the episodes the same in every run of the benchmark
+    manager = controllers.EnvironmentManager(
+        env, script.manager, getattr(script, worker_name)(env), seed=0)
+    manager.headless = True
+    if timed:
+        manager.timer = controllers.PhaseTimer()
+    manager.start()
+    return manager.run_sequence, 2 * settings.EPISODE_LEARN
+
+
+for population in POPULATION_SIZES:
+    benchmark(f'genetic_explore_{population}')(
+        lambda size=population: setup_genetic_explore(size))
+for window_size in WINDOW_SIZES:
+    benchmark(f'monitor_window_{window_size}')(
+        lambda size=window_size: setup_monitor_window(size))
+
+
+def measure(setup, repeat=5) -> dict[str, float | int]:
+    """
+    Sets up the benchmark with the default settings and
+    times its function.
+
+    :param setup: Setup function of the benchmark
+    :param int repeat: Amount of repeats, the fastest one is kept
+    :return: Best seconds per call and calls per repeat
+    """
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    function, number = setup()
+    seconds = min(timeit.repeat(function, number=number, repeat=repeat))
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    return {'seconds': seconds / number, 'number': number}
+
+
+def measure_interleaved(setups, repeat=5) -> list[dict[str, float | int]]:
+    """
+    Sets up several benchmarks and times them in turns, so
+    a drift of the machine slows all of them down alike.
+
+    :param list setups: Setup functions of the benchmarks
+    :param int repeat: Amount of repeats, the fastest one is kept
+    :return: Best seconds per call and calls per repeat of each
+    """
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    functions = [setup() for setup in setups]
+    times = [[] for _ in functions]
+    turns = list(zip(functions, times))
+    for _ in range(repeat):
+        for (function, number), seconds in turns:
+            seconds.append(timeit.timeit(function, number=number))
+        # The order alternates, neither benchmark always runs first
+        turns.reverse()
+    settings.set_checkpoint(DEFAULT_SETTINGS)
+    return [{'seconds': min(seconds) / number, 'number': number}
+            for (_, number), seconds in zip(functions, times)]
+
+
+def compare(results, baseline, tolerance) -> list[str]:
+    """
+    Prints every benchmark next to its baseline.
+
+    :param dict results: Results of this run
+    :param dict baseline: Results of the baseline
+    :param float tolerance: Allowed slowdown relative to the baseline
+    :return: Names of the benchmarks which regressed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print('{:<28} {:>12.3f} us  (new)'.format(
+                name, result['seconds'] * 1e6))
+            continue
+        ratio = result['seconds'] / baseline[name]['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print('{:<28} {:>12.3f} us  {:>6.2f}x  {}'.format(
+            name, result['seconds'] * 1e6, ratio, flag))
+    return regressions
+
+
+def check_overhead(results, overhead=TIMER_OVERHEAD) -> list[str]:
+    """
+    Prints the overhead of the phase timer on the episodes.
+
+    :param dict results: Results of this run
+    :param float overhead: Allowed slowdown of the timed episodes
+    :return: Name of the timed benchmark if it is too slow
+    """
+    if 'episodes_Cart_Pole' not in results or \
+            'episodes_Cart_Pole_timed' not in results:
+        return []
+    ratio = results['episodes_Cart_Pole_timed']['seconds'] / \
+        results['episodes_Cart_Pole']['seconds']
+    flag = 'REGRESSION' if ratio > 1 + overhead else ''
+    print('{:<28} {:>+11.2%}     {}'.format('timer overhead', ratio - 1, flag))
+    return ['episodes_Cart_Pole_timed'] if flag else []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', help='JSON baseline to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--simulator', action='store_true',
+                        help='run the end-to-end benchmarks on the '
+                             'NumPy simulators instead of gym')
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run, defaults to all of them')
+    args = parser.parse_args(argv)
+
+    for name in SCRIPTS:
+        benchmark(f'episodes_{name}')(
+            lambda script=name: setup_episodes(script, args.simulator))
+    # Overhead of the phase timer compared to episodes_Cart_Pole
+    benchmark('episodes_Cart_Pole_timed')(
+        lambda: setup_episodes('Cart_Pole', args.simulator, True))
+    names = args.names or list(BENCHMARKS)
+
+    results = {}
+    # The timer overhead is smaller than the drift between two
+    # benchmarks, so the Cart Pole episodes are timed in turns
+    pair = ['episodes_Cart_Pole', 'episodes_Cart_Pole_timed']
+    if set(pair) <= set(names):
+        results.update(zip(pair, measure_interleaved(
+            [BENCHMARKS[name] for name in pair], args.repeat)))
+    for name in names:
+        if name not in results:
+            results[name] = measure(BENCHMARKS[name], args.repeat)
+        if args.compare is None:
+            print('{:<28} {:>12.3f} us'.format(
+                name, results[name]['seconds'] * 1e6))
+
+    regressions = []
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+    regressions += check_overhead(results)
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'numpy': numpy.__version__,
+                'simulator': args.simulator,
+                'results': results,
+            }, file, indent=2)
+    if regressions:
+        print('Regressions: {}'.format(', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+This module holds the checkpoints to stop and resume a training run.
+
+A checkpoint holds the state of an :class:`EnvironmentManager` with its
+agent, worker, monitor and seed manager, the variables of the settings,
+and the states of the module level random generators. It is pickled
+into a compressed binary file, so a resumed run continues with exactly
+the same episodes as a run that was never stopped.
+"""
+import os
+import pickle
+import threading
+import zlib
+
+from src import controllers
+from src import genetics
+from src import mutations
+from src import optimizers
+from src import settings
+
+VERSION = 2
+GENERATORS = {
+    'controllers': controllers,
+    'mutations': mutations,
+    'genetics': genetics,
+    'optimizers': optimizers,
+}
+
+
+class CheckpointWriter:
+    """
+    Class writes checkpoints of an :class:`EnvironmentManager` to a
+    file from a background thread. Only a snapshot of the state is
+    taken when it is submitted, so the training can go on while the
+    thread pickles, compresses and writes it. When the thread falls
+    behind, only the newest of the waiting checkpoints is written.
+
+    Available methods:
+    :method:`submit()`,
+    :method:`flush()`,
+    :method:`close()`
+    """
+
+    def __init__(self, path, level=1):
+        self.path = path
+        self.level = level
+        self.pending: dict | None = None
+        self.writing = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, manager) -> None:
+        """
+        Takes a checkpoint of the manager and queues it for writing.
+
+        :param controllers.EnvironmentManager manager: Manager of the run
+        :return: None
+        """
+        checkpoint = get_checkpoint(manager)
+        with self.condition:
+            self.pending = checkpoint
+            self.condition.notify_all()
+
+    def flush(self) -> None:
+        """
+        Waits until the queued checkpoint has been written.
+
+        :return: None
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.pending is None and not self.writing)
+
+    def close(self) -> None:
+        """
+        Writes the queued checkpoint and stops the thread.
+
+        :return: None
+        """
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.pending is not None or self.closed)
+                if self.pending is None:
+                    return
+                checkpoint, self.pending = self.pending, None
+                self.writing = True
+            data = pickle.dumps(checkpoint, pickle.HIGHEST_PROTOCOL)
+            write(self.path, zlib.compress(data, self.level))
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def get_checkpoint(manager) -> dict:
+    """
+    Returns the state of the training run of the manager.
+
+    :param controllers.EnvironmentManager manager: Manager of the run
+    :return: Checkpoint of the run
+    """
+    return {
+        'version': VERSION,
+        'manager': manager.get_checkpoint(),
+        'settings': settings.get_checkpoint(),
+        'generators': {name: module.rng.get_checkpoint()
+                       for name, module in GENERATORS.items()},
+        'genome_names': genetics.GENOME_NAMES.index,
+    }
+
+
+def set_checkpoint(manager, checkpoint) -> None:
+    """
+    Restores the training run of the manager to the checkpoint.
+    The manager has to be set up with the same components as
+    the manager of the checkpoint.
+
+    :param controllers.EnvironmentManager manager: Manager of the run
+    :param dict checkpoint: Checkpoint of the run
+    :return: None
+    """
+    if checkpoint['version'] != VERSION:
+        raise ValueError(
+            f'Unsupported checkpoint version {checkpoint["version"]}')
+    settings.set_checkpoint(checkpoint['settings'])
+    for name, state in checkpoint['generators'].items():
+        GENERATORS[name].rng.set_checkpoint(state)
+    genetics.GENOME_NAMES.index = checkpoint['genome_names']
+    manager.set_checkpoint(checkpoint['manager'])
+
+
+def save(path, manager, level=1) -> None:
+    """
+    Writes a checkpoint of the manager to the file.
+
+    :param str path: Path of the checkpoint file
+    :param controllers.EnvironmentManager manager: Manager of the run
+    :param int level: Compression level of zlib
+    :return: None
+    """
+    data = pickle.dumps(get_checkpoint(manager), pickle.HIGHEST_PROTOCOL)
+    write(path, zlib.compress(data, level))
+
+
+def load(path) -> dict:
+    """
+    Reads a checkpoint written by :func:`save` or :class:`CheckpointWriter`.
+
+    :param str path: Path of the checkpoint file
+    :return: Checkpoint of the run
+    """
+    with open(path, 'rb') as file:
+        return pickle.loads(zlib.decompress(file.read()))
+
+
+def write(path, data) -> None:
+    """
+    Replaces the file with the data at once, so a crash while
+    writing leaves the previous checkpoint intact.
+
+    :param str path: Path of the file
+    :param bytes data: Content of the file
+    :return: None
+    """
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
@@ -1,16 +1,32 @@
+from __future__ import annotations
+
 import abc
-import statistics
+import collections
+import copy
+import os
+import signal
+import sys
+import threading
 import textwrap
 import time
+import typing
 
-import gym
 import numpy
-from tabulate import tabulate
 
+from src import generators
 from src import settings
-from src.mutations import mutate_io_model
+from src import mutations
+from src import storage
+
+if typing.TYPE_CHECKING:
+    import gym
 
-rng = numpy.random.default_rng(4000)
+    from src import checkpoints
+
+rng = generators.BlockGenerator(4000)
+# Phases of EnvironmentManager.run_sequence() in their order
+SEQUENCE_PHASES = ('render', 'episode', 'frame', 'monitor', 'agent',
+                   'print', 'end', 'epsilon', 'checkpoint')
 
 
 class IOModel:
@@ -69,6 +85,37 @@ class IOModel:
         """
         self.output = 0
 
+    def get_state(self) -> tuple:
+        """
+        Returns the values which change while calculating outputs.
+        Used to run a single model in multiple environments at once.
+
+        :return: Current model state
+        """
+        return self.output,
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Restores the values which change while calculating outputs.
+
+        :param state: Model state from :method:`get_state()`
+        :return: None
+        """
+        self.output, = state
+
+    def set_batch(self, models: list[tuple]) -> None:
+        """
+        Overwrite the current model with a configuration per row,
+        after which :method:`get_output()` takes and returns arrays
+        with a value per row. The current state is repeated for every
+        row. Restore a single model with :method:`set_model()` and
+        :method:`set_state()`.
+
+        :param models: Desired model configuration of every row
+        :return: None
+        """
+        raise NotImplementedError
+
 
 class LearningController:
     """
@@ -80,12 +127,21 @@ class LearningController:
     :method:`reflect()`,
     :method:`reward()`,
     :method:`reset()`,
-    :method:`get_string()`
+    :method:`get_string()`,
+    :method:`get_models()`,
+    :method:`set_config()`,
+    :method:`set_generator()`,
+    :method:`get_checkpoint()`,
+    :method:`set_checkpoint()`
     """
 
     @abc.abstractmethod
     def __init__(self, name=''):
         self.name = name
+        self.config: settings.RunConfig = settings.CONFIG
+        # Random generator of the controller, None uses the
+        # generators of the modules
+        self.generator: generators.BlockGenerator | None = None
 
     @abc.abstractmethod
     def explore(self) -> None:
@@ -136,6 +192,76 @@ class LearningController:
         """
         raise NotImplementedError
 
+    def get_models(self) -> tuple | None:
+        """
+        Returns the configurations of all models which are used
+        in the episodes, so the reward of an episode can be cached.
+
+        :return: Configuration per model, None if unknown
+        """
+        return None
+
+    def set_config(self, config) -> None:
+        """
+        Changes the config of the run which the controller learns in.
+
+        :param settings.RunConfig config: Config of the run
+        :return: None
+        """
+        self.config = config
+
+    def set_generator(self, generator) -> None:
+        """
+        Gives the controller a random generator of its own, so its
+        draws do not depend on the other controllers of the process.
+
+        :param generators.BlockGenerator generator: Random generator
+        :return: None
+        """
+        self.generator = generator
+
+    def get_is_eliminated(self) -> bool:
+        """
+        Returns whether the rewards of the current window already
+        show that the configuration can not be accepted anymore,
+        so the window can be ended early by :method:`eliminate()`.
+
+        :return: Whether the configuration is eliminated
+        """
+        return False
+
+    def eliminate(self) -> None:
+        """
+        Ends the current window early instead of :method:`reflect()`
+        and rejects the configuration of the window.
+
+        :return: None
+        """
+        self.reflect()
+
+    def get_checkpoint(self) -> dict:
+        """
+        Returns a copy of the learning state, which is
+        needed to resume the training at the same point.
+
+        :return: Learning state of the controller
+        """
+        checkpoint = {'name': self.name}
+        if self.generator is not None:
+            checkpoint['generator'] = self.generator.get_checkpoint()
+        return checkpoint
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        """
+        Restores the learning state of :method:`get_checkpoint()`.
+
+        :param dict checkpoint: Learning state of the controller
+        :return: None
+        """
+        self.name = checkpoint['name']
+        if self.generator is not None and 'generator' in checkpoint:
+            self.generator.set_checkpoint(checkpoint['generator'])
+
 
 class BaseManager:
     """
@@ -201,9 +327,14 @@ class EnvironmentWorker:
     :method:`get_reward()`,
     """
 
+    # Whether get_actions and get_rewards calculate a batch of rows
+    batched = False
+
     def __init__(self, env: gym.Env):
         self.action_space = env.action_space
         self.difficulty = 0
+        # Config of the run, set by the EnvironmentManager
+        self.config: settings.RunConfig = settings.CONFIG
 
     @abc.abstractmethod
     def reset(self, seed: int = None) -> None:
@@ -236,6 +367,41 @@ class EnvironmentWorker:
         """
         return 0
 
+    def get_actions(self, observations) -> numpy.ndarray:
+        """
+        Returns the action of every row of a batch at once. Only used
+        when `batched` is set, on a worker of :func:`stack_workers`
+        whose attributes hold a value per row, while the models hold
+        a configuration per row, see :method:`IOModel.set_batch()`.
+
+        :param numpy.ndarray observations: Observation per row
+        :return: Action per row
+        """
+        raise NotImplementedError
+
+    def get_rewards(self, observations) -> numpy.ndarray:
+        """
+        Returns the reward of every row of a batch at once,
+        see :method:`get_actions()`.
+
+        :param numpy.ndarray observations: Observation per row
+        :return: Reward per row
+        """
+        raise NotImplementedError
+
+    def get_checkpoint(self) -> dict:
+        """
+        Returns a copy of the attributes of the worker
+        except for the action space and the config.
+
+        :return: Attributes of the worker
+        """
+        return copy.deepcopy({key: value for key, value in vars(self).items()
+                              if key not in ('action_space', 'config')})
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        vars(self).update(copy.deepcopy(checkpoint))
+
 
 class PIDModel(IOModel):
     """
@@ -275,6 +441,20 @@ class PIDModel(IOModel):
         self.value_d = 0
         self.value_i = 0
 
+    def get_state(self) -> tuple:
+        return self.output, self.value_i, self.value_d
+
+    def set_state(self, state: tuple) -> None:
+        self.output, self.value_i, self.value_d = state
+
+    def set_batch(self, models: list[tuple]) -> None:
+        self.model_p, self.model_i, self.model_d = \
+            numpy.array(models, dtype=float).reshape(-1, 3).T
+        size = len(models)
+        self.output = numpy.full(size, self.output, dtype=float)
+        self.value_i = numpy.full(size, self.value_i, dtype=float)
+        self.value_d = numpy.full(size, self.value_d, dtype=float)
+
 
 class NodeModel(IOModel):
     """
@@ -302,6 +482,235 @@ class NodeModel(IOModel):
     def reset(self) -> None:
         self.output = 0
 
+    def set_batch(self, models: list[tuple]) -> None:
+        # The input values hold a row of values per weight,
+        # like the transposed observations of a batch
+        self.control = tuple(numpy.array(models, dtype=float).T)
+        self.output = numpy.full(len(models), self.output, dtype=float)
+
+
+class PIDBank:
+    """
+    Stores the gains and states of many :class:`PIDModel` in contiguous
+    arrays and calculates the output of all of them in one call.
+    Every row of the bank behaves like a single :class:`PIDModel`.
+
+    Available methods:
+    :method:`set_model()`,
+    :method:`get_model()`,
+    :method:`set_models()`,
+    :method:`get_models()`,
+    :method:`get_output()`,
+    :method:`get_size()`,
+    :method:`reset()`
+    """
+
+    def __init__(self, presets):
+        gains = numpy.array(presets, dtype=float)
+        if gains.ndim != 2 or gains.shape[1] != 3:
+            raise ValueError('Presets need to be a collection of PID tuples')
+        size = len(gains)
+        self.model_p = gains[:, 0].copy()
+        self.model_i = gains[:, 1].copy()
+        self.model_d = gains[:, 2].copy()
+        self.value_i = numpy.zeros(size)
+        self.value_d = numpy.zeros(size)
+        self.output = numpy.zeros(size)
+
+    def set_model(self, index: int, model: tuple) -> None:
+        """
+        Overwrite the model configuration of a single row.
+
+        :param index: Row of the bank
+        :param model: Desired PID configuration
+        :return: None
+        """
+        p, i, d = model
+        self.model_p[index] = p
+        self.model_i[index] = i
+        self.model_d[index] = d
+
+    def get_model(self, index: int) -> tuple:
+        """
+        Returns the model configuration of a single row.
+
+        :param index: Row of the bank
+        :return: PID configuration of the row
+        """
+        return (self.model_p[index].item(),
+                self.model_i[index].item(),
+                self.model_d[index].item())
+
+    def set_models(self, models: list[tuple]) -> None:
+        """
+        Overwrite the model configurations of all rows.
+
+        :param models: Desired PID configuration for every row
+        :return: None
+        """
+        gains = numpy.array(models, dtype=float)
+        if gains.shape != (self.get_size(), 3):
+            raise ValueError('Models need to match the size of the bank')
+        self.model_p[:] = gains[:, 0]
+        self.model_i[:] = gains[:, 1]
+        self.model_d[:] = gains[:, 2]
+
+    def get_models(self) -> list[tuple]:
+        """
+        Returns the model configurations of all rows.
+
+        :return: PID configuration of every row
+        """
+        return [self.get_model(index) for index in range(self.get_size())]
+
+    def get_output(self, values, target) -> numpy.ndarray:
+        """
+        Returns the output of every row based on the input values and
+        target. Input values with two dimensions are summed per row,
+        like the tuple of values of :method:`PIDModel.get_output()`.
+
+        :param numpy.ndarray values: Input value per row, shape (N,) or (N, k)
+        :param float or numpy.ndarray target: Desired value, shared or per row
+        :return: Output of every row
+        """
+        values = numpy.asarray(values, dtype=float)
+        if values.ndim == 2:
+            values = values.sum(axis=1)
+        error = target - values
+
+        p = self.model_p * error
+        i = self.model_i * (error + self.value_i)
+        d = self.model_d * (error - self.value_d)
+
+        self.value_i += error
+        self.value_d = error
+        self.output = p + i + d
+        return self.output
+
+    def get_size(self) -> int:
+        """
+        Returns the amount of rows inside the bank.
+
+        :return: Amount of PID controllers
+        """
+        return len(self.model_p)
+
+    def reset(self, index: int = None) -> None:
+        """
+        Restores the state of a single row or all rows to the starting state.
+
+        :param index: Row of the bank, defaults to all rows
+        :return: None
+        """
+        if index is None:
+            index = slice(None)
+        self.output[index] = 0
+        self.value_d[index] = 0
+        self.value_i[index] = 0
+
+
+class NodeLayer:
+    """
+    Stores the weights of many :class:`NodeModel` as rows of a matrix
+    and calculates the weighted sums of all rows with a single product.
+    Rows with fewer weights are padded with zeros, which matches the
+    behaviour of :method:`NodeModel.get_output()` ignoring the values
+    that have no weight.
+
+    Available methods:
+    :method:`set_model()`,
+    :method:`get_model()`,
+    :method:`get_models()`,
+    :method:`get_output()`,
+    :method:`get_batch_output()`,
+    :method:`get_size()`,
+    :method:`reset()`
+    """
+
+    def __init__(self, presets):
+        self.lengths = [len(preset) for preset in presets]
+        if len(self.lengths) == 0:
+            raise ValueError('Please provide at least one preset')
+        self.weights = numpy.zeros((len(presets), max(self.lengths)))
+        for index, preset in enumerate(presets):
+            self.set_model(index, preset)
+        self.output = numpy.zeros(len(presets))
+
+    def set_model(self, index: int, model: tuple) -> None:
+        """
+        Overwrite the weights of a single row.
+
+        :param index: Row of the layer
+        :param model: Desired weights of the row
+        :return: None
+        """
+        if len(model) > self.weights.shape[1]:
+            raise ValueError('Model has more weights than the layer')
+        self.weights[index] = 0
+        self.weights[index, :len(model)] = model
+        self.lengths[index] = len(model)
+
+    def get_model(self, index: int) -> tuple:
+        """
+        Returns the weights of a single row.
+
+        :param index: Row of the layer
+        :return: Weights of the row
+        """
+        return tuple(self.weights[index, :self.lengths[index]].tolist())
+
+    def get_models(self) -> list[tuple]:
+        """
+        Returns the weights of all rows.
+
+        :return: Weights of every row
+        """
+        return [self.get_model(index) for index in range(self.get_size())]
+
+    def get_output(self, values, target) -> numpy.ndarray:
+        """
+        Returns the weighted sum of every row. One dimensional values
+        are shared by all rows (matrix-vector product), two dimensional
+        values hold the input of every row (row-wise product).
+
+        :param numpy.ndarray values: Input values, shape (k,) or (N, k)
+        :param float or numpy.ndarray target: Offset, shared or per row
+        :return: Output of every row
+        """
+        values = numpy.asarray(values, dtype=float)
+        width = min(values.shape[-1], self.weights.shape[1])
+        weights, values = self.weights[:, :width], values[..., :width]
+        if values.ndim == 1:
+            output = weights @ values
+        else:
+            output = numpy.einsum('ij,ij->i', weights, values)
+        self.output = output + target
+        return self.output
+
+    def get_batch_output(self, values, target=0.0) -> numpy.ndarray:
+        """
+        Returns the weighted sum of every row for a batch of
+        inputs with a single matrix-matrix product.
+
+        :param numpy.ndarray values: Batch of input values, shape (B, k)
+        :param float or numpy.ndarray target: Offset, shared or per row
+        :return: Output of every row for every input, shape (B, N)
+        """
+        values = numpy.asarray(values, dtype=float)
+        width = min(values.shape[-1], self.weights.shape[1])
+        return values[:, :width] @ self.weights[:, :width].T + target
+
+    def get_size(self) -> int:
+        """
+        Returns the amount of rows inside the layer.
+
+        :return: Amount of node models
+        """
+        return len(self.weights)
+
+    def reset(self) -> None:
+        self.output = numpy.zeros(self.get_size())
+
 
 class ImprovingController(LearningController):
     """
@@ -320,6 +729,20 @@ class ImprovingController(LearningController):
     def reward(self, reward: float) -> None:
         self.current_rewards.append(reward)
 
+    def get_checkpoint(self) -> dict:
+        return {
+            **LearningController.get_checkpoint(self),
+            'previous_rewards': list(self.previous_rewards),
+            'current_rewards': list(self.current_rewards),
+            'is_improving': list(self.is_improving),
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        LearningController.set_checkpoint(self, checkpoint)
+        self.previous_rewards = list(checkpoint['previous_rewards'])
+        self.current_rewards = list(checkpoint['current_rewards'])
+        self.is_improving = list(checkpoint['is_improving'])
+
     def reflect(self) -> None:
         previous_rewards = self.previous_rewards
         current_rewards = self.current_rewards
@@ -348,29 +771,67 @@ class ImprovingModelController(ImprovingController):
     and is base class that provides improvement based learning to any
     instances of :class:`IOModel`. Uses reward based calculations to
     decide whether improvements have been made.
+
+    Available methods:
+    :method:`evaluate()`
     """
+    # Type of the model, which scales the random steps of mutations
+    io_type = ''
 
     def __init__(self, name='', preset=(0, 0, 0)):
         ImprovingController.__init__(self, name)
         self.model = IOModel()
         self.current_model = preset
         self.previous_model = preset
+        # Highest reward an episode can score, for example 500 for
+        # CartPole, needed to race the candidates
+        self.reward_bound: float | None = None
+        # Highest reward a step can score, which bounds the reward
+        # of an episode by the time steps of the config instead
+        self.step_bound: float | None = None
 
     def get_string(self) -> str:
         return get_tuple_string(self.model.get_model())
 
     def explore(self) -> None:
-        self.current_model = mutate_io_model(
-            self.current_model, self.previous_model)
+        self.current_model = mutations.mutate_io_model(
+            self.current_model, self.previous_model, self.io_type,
+            self.config, self.generator)
         self.model.set_model(self.current_model)
 
+    def evaluate(self, evaluate_models, count=8) -> None:
+        """
+        Evaluates several candidates of the model at once, for example
+        in lockstep by :method:`VectorEnvironmentManager.evaluate_models()`,
+        and reflects on the candidate with the highest rewards, which
+        replaces the previous model if it is an improvement.
+
+        :param evaluate_models: Function which returns the rewards
+         of a list of configurations of the model
+        :param int count: Amount of candidates
+        :return: None
+        """
+        if not self.previous_rewards:
+            self.previous_rewards = list(
+                evaluate_models([self.previous_model])[0])
+        candidates = [tuple(candidate) for candidate in
+                      mutations.mutate_io_models(
+                          self.current_model, self.previous_model, count,
+                          self.io_type, self.config, self.generator).tolist()]
+        results = evaluate_models(candidates)
+        best = max(range(len(candidates)), key=lambda i: sum(results[i]))
+        self.current_model = candidates[best]
+        self.current_rewards = list(results[best])
+        self.reflect()
+
     def reflect(self) -> None:
         previous_rewards = self.previous_rewards
         current_rewards = self.current_rewards
         ImprovingController.reflect(self)
 
         is_improving = get_is_improving_random(
-            self.is_improving, current_rewards, previous_rewards)
+            self.is_improving, current_rewards, previous_rewards,
+            self.config, self.generator)
         avg, low, high = is_improving
 
         if low and avg or low and high or avg and high:
@@ -390,9 +851,43 @@ class ImprovingModelController(ImprovingController):
     def reward(self, reward: float) -> None:
         super().reward(reward)
 
+    def get_models(self) -> tuple | None:
+        return self.model.get_model(),
+
+    def get_is_eliminated(self, rewards=None) -> bool:
+        if rewards is None:
+            rewards = self.current_rewards
+        bound = self.reward_bound
+        if bound is None and self.step_bound is not None:
+            bound = get_reward_bound(self.step_bound, self.config)
+        return get_is_eliminated(
+            rewards, self.previous_rewards, bound, self.config)
+
+    def eliminate(self) -> None:
+        # Revert the changes like a rejected reflect
+        self.current_model = self.previous_model
+        self.model.set_model(self.current_model)
+        self.current_rewards = []
+
     def reset(self) -> None:
         self.model.reset()
 
+    def get_checkpoint(self) -> dict:
+        return {
+            **super().get_checkpoint(),
+            'current_model': self.current_model,
+            'previous_model': self.previous_model,
+            'model': self.model.get_model(),
+            'model_state': self.model.get_state(),
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        super().set_checkpoint(checkpoint)
+        self.current_model = checkpoint['current_model']
+        self.previous_model = checkpoint['previous_model']
+        self.model.set_model(checkpoint['model'])
+        self.model.set_state(checkpoint['model_state'])
+
 
 class ImprovingPIDModel(ImprovingModelController):
     """
@@ -401,15 +896,12 @@ class ImprovingPIDModel(ImprovingModelController):
     decide whether improvements have been made.
     """
 
+    io_type = 'pid'
+
     def __init__(self, name='', preset=(0, 0, 0)):
         ImprovingModelController.__init__(self, name, preset)
         self.model = PIDModel(preset)
 
-    def explore(self) -> None:
-        self.current_model = mutate_io_model(
-            self.current_model, self.previous_model, 'pid')
-        self.model.set_model(self.current_model)
-
 
 class ImprovingNodeModel(ImprovingModelController):
     """
@@ -516,10 +1008,67 @@ class ImprovingControllerManager(ImprovingController,
     def get_string(self) -> str:
         return LearningControllerManager.get_string(self)
 
+    def get_models(self) -> tuple | None:
+        models = ()
+        for controller in self.controllers:
+            controller_models = controller.get_models()
+            if controller_models is None:
+                return None
+            models += controller_models
+        return models
+
+    def set_config(self, config) -> None:
+        super().set_config(config)
+        for controller in self.controllers:
+            controller.set_config(config)
+
+    def set_generator(self, generator) -> None:
+        """
+        Gives every controller a generator of its own,
+        which is spawned by the index of the controller.
+
+        :param generators.BlockGenerator generator: Random generator
+        :return: None
+        """
+        super().set_generator(generator)
+        for index, controller in enumerate(self.controllers):
+            controller.set_generator(generator.spawn(index))
+
+    def get_is_eliminated(self) -> bool:
+        if not isinstance(self.selected, ImprovingModelController):
+            return False
+        return self.selected.get_is_eliminated(self.current_rewards)
+
+    def eliminate(self) -> None:
+        self.selected.eliminate()
+        self.current_rewards = []
+
     def reset(self) -> None:
         for controller in self.controllers:
             controller.reset()
 
+    def get_checkpoint(self) -> dict:
+        return {
+            **ImprovingController.get_checkpoint(self),
+            'index': self.index,
+            'is_rotating': self.is_rotating,
+            'is_next': self.is_next,
+            'count': self.count,
+            'controllers': [c.get_checkpoint() for c in self.controllers],
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        for controller, state in zip(self.controllers,
+                                     checkpoint['controllers']):
+            controller.set_checkpoint(state)
+        # Select without select_controller, which clears the rewards
+        self.index = checkpoint['index']
+        self.selected = self.controllers[self.index]
+        ImprovingController.set_checkpoint(self, checkpoint)
+        self.is_rotating = checkpoint['is_rotating']
+        self.is_next = checkpoint['is_next']
+        self.count = checkpoint['count']
+
 
 class EnvironmentSeedManager:
     """
@@ -551,19 +1100,138 @@ class EnvironmentSeedManager:
     def get_seed(self):
         return self.output
 
+    def get_checkpoint(self) -> dict:
+        return {
+            'output': self.output,
+            'seed': self.seed,
+            'generator': self.generator.bit_generator.state,
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        self.output = checkpoint['output']
+        self.seed = checkpoint['seed']
+        self.generator.bit_generator.state = checkpoint['generator']
+
+
+class EpisodeBuffer:
+    """
+    Class stores the values of the episodes as rows of a NumPy array
+    with one column per key. The array grows by doubling its capacity
+    and is reused after :method:`clear()`, so filling the buffer does
+    not allocate memory once it has reached the size of a window.
+
+    Available methods:
+    :method:`append()`,
+    :method:`get_column()`,
+    :method:`get_values()`,
+    :method:`clear()`
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.size = 0
+        self.keys: tuple[str, ...] = ()
+        self.integers: list[bool] = []
+        self.data = numpy.zeros((capacity, 0))
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index) -> dict[str, float | int]:
+        index = range(self.size)[index]
+        return {key: self.get_values(key, [index])[0] for key in self.keys}
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def append(self, values: dict[str, float | int]) -> None:
+        """
+        Appends the values of an episode as a row. A key that is new
+        adds a column, which holds integers if its first value is one.
+
+        :param dict values: Value per key of an episode
+        """
+        if self.size == self.capacity:
+            self.capacity *= 2
+            self.data = numpy.resize(self.data, (self.capacity, len(self.keys)))
+        if tuple(values) == self.keys:
+            self.data[self.size] = tuple(values.values())
+        else:
+            self.add_columns(values)
+            self.data[self.size] = [values.get(key, 0) for key in self.keys]
+        self.size += 1
+
+    def add_columns(self, values: dict[str, float | int]) -> None:
+        keys = [key for key in values if key not in self.keys]
+        if not keys:
+            return
+        self.keys += tuple(keys)
+        self.integers += [isinstance(values[key], (int, numpy.integer))
+                          for key in keys]
+        columns = numpy.zeros((self.capacity, len(keys)))
+        self.data = numpy.hstack((self.data, columns))
+
+    def get_column(self, key) -> numpy.ndarray:
+        """
+        Returns the filled part of the column of the given key.
+
+        :param str key: Key of the column
+        :return: View on the values of the column as floats
+        """
+        return self.data[:self.size, self.keys.index(key)]
+
+    def get_values(self, key, indices) -> list[float | int]:
+        """
+        Returns the values of the given rows of the column as Python
+        numbers. Integral values of integer columns are integers.
+
+        :param str key: Key of the column
+        :param indices: Indices of the rows
+        :return: Values at the rows
+        """
+        index = self.keys.index(key)
+        values = self.data[indices, index].tolist()
+        if self.integers[index]:
+            values = [int(value) if value.is_integer() else value
+                      for value in values]
+        return values
+
+    def clear(self) -> None:
+        self.size = 0
+
 
 class EnvironmentMonitor:
     """
     Class monitors the episode values, processes the
     values into high, low, average, etc..., and generates
     logs with representation of the values in a table.
+
+    The latest results are kept in a ring of fixed size. Results
+    that leave the ring are downsampled into a history of the same
+    size, so the memory stays flat however long the training runs.
     """
 
-    def __init__(self):
-        self.buffer: list[dict] = []
-        self.results: list[dict[str, any]] = []
+    def __init__(self, capacity=1000, downsample=10, config=None):
+        """
+        :param int capacity: Amount of results kept in the ring and
+         in the history
+        :param int downsample: Every how many results leaving the
+         ring are kept in the history
+        :param settings.RunConfig config: Config of the run, which
+         delivers the epsilon of the results
+        """
+        self.config = settings.CONFIG if config is None else config
+        self.buffer = EpisodeBuffer()
+        self.results: collections.deque[dict[str, any]] = \
+            collections.deque(maxlen=capacity)
+        self.history: collections.deque[dict[str, any]] = \
+            collections.deque(maxlen=capacity)
+        self.downsample = downsample
+        self.dropped = 0
 
     def get_log(self, n=-1):
+        from tabulate import tabulate
+
         result = self.results[n]
         text = '\n'
 
@@ -588,49 +1256,46 @@ class EnvironmentMonitor:
         if len(self.buffer) == 0:
             raise IndexError
         result: dict[str, float | dict[str, float | int]] = {}
-        self.results.append(result)
-
-        division = sorted(self.buffer, key=lambda ep: ep['reward'])
-        self.buffer.clear()
-        division_rewards = [ep['reward'] for ep in division]
-
-        lowest_i, highest_i = 0, -1
-        lowest_value = division_rewards[lowest_i]
-        highest_value = division_rewards[highest_i]
-
-        median_value = statistics.median(division_rewards)
-        median_i = get_index_closest(median_value, division_rewards)
-
+        self.add_result(result)
+
+        rewards = self.buffer.get_column('reward')
+        order = numpy.argsort(rewards, kind='stable')
+        division_rewards = rewards[order]
+        size = len(division_rewards)
+
+        lowest_i, highest_i = 0, size - 1
+        lowest_value, highest_value = self.buffer.get_values(
+            'reward', order[[lowest_i, highest_i]])
+        median_value = (division_rewards[(size - 1) // 2]
+                        + division_rewards[size // 2]).item() / 2
         middle_value = (lowest_value + highest_value) / 2
-        middle_i = get_index_closest(middle_value, division_rewards)
+        mean_value = division_rewards.mean().item()
+
+        values = numpy.array([median_value, middle_value, mean_value])
+        distances = numpy.abs(division_rewards[:, None] - values)
+        median_i, middle_i, mean_i = distances.argmin(axis=0)
 
-        mean_value = statistics.mean(division_rewards)
-        mean_i = get_index_closest(mean_value, division_rewards)
+        indices = order[[highest_i, mean_i, lowest_i, median_i, middle_i]]
+        keys = ('highest', 'average', 'lowest', 'median', 'middle')
 
         def get_result(category):
-            if category not in division[0]:
+            if category not in self.buffer:
                 # Prevent key error of categories
                 # which do not exist in division
                 return
-            result[category] = {
-                'highest': division[highest_i][category],
-                'average': division[mean_i][category],
-                'lowest': division[lowest_i][category],
-                'median': division[median_i][category],
-                'middle': division[middle_i][category],
-            }
+            values = self.buffer.get_values(category, indices)
             if category == 'episode':
-                for k, value in result['episode'].items():
-                    result['episode'][k] = (value - 1) % len(division) + 1
-                return
-            for k, value in result[category].items():
-                result[category][k] = round(value, 2)
+                values = [(value - 1) % size + 1 for value in values]
+            else:
+                values = [round(value, 2) for value in values]
+            result[category] = dict(zip(keys, values))
 
         get_result('reward')
         get_result('steps')
         get_result('seed')
         get_result('difficulty')
         get_result('episode')
+        self.buffer.clear()
 
         result['episodes'] = episode
         result['highest'] = round(highest_value, 2)
@@ -638,8 +1303,266 @@ class EnvironmentMonitor:
         result['lowest'] = round(lowest_value, 2)
         result['median'] = round(median_value, 2)
         result['middle'] = round(middle_value, 2)
-        result['epsilon'] = round(settings.EPSILON.VALUE, 3)
-        result['multiplier'] = round(settings.MULTIPLIER_EPSILON, 3)
+        result['epsilon'] = round(self.config.state.epsilon, 3)
+        result['multiplier'] = round(self.config.state.multiplier_epsilon, 3)
+
+    def get_checkpoint(self) -> dict:
+        # The processed results are not changed anymore,
+        # so the lists can share them with the monitor
+        return {
+            'buffer': [self.buffer[i] for i in range(len(self.buffer))],
+            'results': list(self.results),
+            'history': list(self.history),
+            'dropped': self.dropped,
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        checkpoint = copy.deepcopy(checkpoint)
+        self.buffer.clear()
+        for values in checkpoint['buffer']:
+            self.buffer.append(values)
+        self.results.clear()
+        self.results.extend(checkpoint['results'])
+        self.history.clear()
+        self.history.extend(checkpoint['history'])
+        self.dropped = checkpoint['dropped']
+
+    def add_result(self, result) -> None:
+        """
+        Adds the result to the ring and keeps every `downsample`-th
+        result that is pushed out of the full ring in the history.
+
+        :param dict result: Processed result of a window
+        """
+        if len(self.results) == self.results.maxlen:
+            if self.dropped % self.downsample == 0:
+                self.history.append(self.results[0])
+            self.dropped += 1
+        self.results.append(result)
+
+
+class PhaseTimer:
+    """
+    Class accumulates the wall time in nanoseconds and the amount of
+    calls per phase of the training loop with a monotonic clock.
+    Timestamps of :method:`add_stamps()` are only kept and summed up
+    in batches, so timing a whole sequence costs little more than
+    taking the timestamps.
+
+    Available methods:
+    :method:`add()`,
+    :method:`add_stamps()`,
+    :method:`get_report()`,
+    :method:`get_line()`,
+    :method:`reset()`
+    """
+
+    def __init__(self, batch=1000):
+        """
+        :param int batch: Amount of kept timestamps per
+         sequence of phases before they are summed up
+        """
+        self.batch = batch
+        self.totals: dict[str, int] = {}
+        self.calls: dict[str, int] = {}
+        self.stamps: dict[tuple[str, ...], list[tuple[int, ...]]] = {}
+
+    @property
+    def times(self) -> dict[str, int]:
+        self.merge()
+        return self.totals
+
+    @property
+    def counts(self) -> dict[str, int]:
+        self.merge()
+        return self.calls
+
+    def add(self, phase, nanoseconds, count=1) -> None:
+        """
+        Adds the time of calls to the phase.
+
+        :param str phase: Name of the phase
+        :param int nanoseconds: Time spent in the phase
+        :param int count: Amount of calls
+        :return: None
+        """
+        self.totals[phase] = self.totals.get(phase, 0) + nanoseconds
+        self.calls[phase] = self.calls.get(phase, 0) + count
+
+    def add_stamps(self, phases, stamps) -> None:
+        """
+        Adds a call to every phase of a sequence with the time
+        between the timestamps at its start and its end.
+
+        :param tuple[str] phases: Names of the phases in their order
+        :param tuple[int] stamps: Timestamp at the start of every
+         phase and at the end of the last one
+        :return: None
+        """
+        kept = self.stamps.get(phases)
+        if kept is None:
+            kept = self.stamps[phases] = []
+        kept.append(stamps)
+        if len(kept) >= self.batch:
+            self.merge()
+
+    def merge(self) -> None:
+        """
+        Sums up the kept timestamps into the times of the phases.
+
+        :return: None
+        """
+        for phases, stamps in self.stamps.items():
+            if not stamps:
+                continue
+            # The sum of the differences is the difference of the sums
+            sums = [sum(column) for column in zip(*stamps)]
+            for phase, start, end in zip(phases, sums, sums[1:]):
+                self.add(phase, end - start, len(stamps))
+            stamps.clear()
+
+    def get_total(self) -> int:
+        """
+        Returns the time of all phases, without the phases
+        nested inside another one, which contain a dot.
+
+        :return: Total time in nanoseconds
+        """
+        return sum(t for phase, t in self.times.items() if '.' not in phase)
+
+    def get_report(self) -> str:
+        """
+        Returns a table of the time, calls, average time per call
+        and share of the total time of every phase.
+
+        :return: Table of the phases
+        """
+        from tabulate import tabulate
+
+        total = self.get_total() or 1
+        rows = [[phase, round(t / 1e9, 3), self.counts[phase],
+                 round(t / self.counts[phase] / 1e3, 1),
+                 round(100 * t / total, 1)]
+                for phase, t in self.times.items()]
+        return tabulate(rows, headers=['phase', 'seconds', 'calls',
+                                       'us/call', '%'],
+                        tablefmt='github') + '\n'
+
+    def get_line(self) -> str:
+        """
+        Returns the share of the total time of every phase in a line.
+
+        :return: Line with the phases
+        """
+        total = self.get_total() or 1
+        return 'Time: ' + ', '.join(
+            f'{phase} {100 * t / total:.1f}%'
+            for phase, t in self.times.items())
+
+    def reset(self) -> None:
+        self.totals.clear()
+        self.calls.clear()
+        self.stamps.clear()
+
+
+class RewardCache:
+    """
+    Class holds the rewards and time steps of finished episodes,
+    so an episode which is run again with the same models, seed,
+    difficulty, agent name and config does not need to be simulated.
+    The least recently used episodes are dropped when it is full.
+    Episodes taken from the cache add no steps to a :class:`PhaseTimer`.
+
+    Available methods:
+    :method:`get_key()`,
+    :method:`get()`,
+    :method:`put()`,
+    :method:`get_hit_rate()`,
+    :method:`get_memory()`,
+    :method:`get_line()`,
+    :method:`clear()`
+    """
+
+    def __init__(self, size=100000):
+        self.size = size
+        self.entries: collections.OrderedDict[tuple, tuple[float, int]] = \
+            collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, agent, worker, seed, config=None) -> tuple | None:
+        """
+        Returns the key of an episode after the worker was reset.
+
+        :param LearningController agent: Agent of the models
+        :param EnvironmentWorker worker: Worker of the episode
+        :param int seed: Seed of the episode
+        :param settings.RunConfig config: Config of the run, whose
+         variables are part of the key except for the decaying state
+        :return: Key of the episode, None if it can not be cached
+        """
+        if config is None:
+            config = settings.CONFIG
+        models = agent.get_models()
+        if models is None or seed is None:
+            return None
+        return (models, seed, worker.difficulty, agent.name,
+                tuple(getattr(config, field)
+                      for field in settings.CONFIG_FIELDS))
+
+    def get(self, key) -> tuple[float, int] | None:
+        """
+        Returns the rewards and time steps of an episode.
+
+        :param tuple key: Key of the episode
+        :return: Rewards and time steps, None if not cached
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result) -> None:
+        """
+        Adds the rewards and time steps of an episode.
+
+        :param tuple key: Key of the episode
+        :param tuple result: Rewards and time steps
+        :return: None
+        """
+        self.entries[key] = result
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def get_hit_rate(self) -> float:
+        return self.hits / max(1, self.hits + self.misses)
+
+    def get_memory(self) -> int:
+        """
+        Returns the estimated size of the entries in bytes.
+
+        :return: Size of the entries
+        """
+        def get_size(value):
+            size = sys.getsizeof(value)
+            if type(value) is tuple:
+                size += sum(get_size(item) for item in value)
+            return size
+        return sys.getsizeof(self.entries) + sum(
+            get_size(key) + get_size(result)
+            for key, result in self.entries.items())
+
+    def get_line(self) -> str:
+        return 'Cache: {} episodes, {:.1%} hits, {:.2f} MB'.format(
+            len(self.entries), self.get_hit_rate(), self.get_memory() / 1e6)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class EnvironmentManager:
@@ -651,53 +1574,131 @@ class EnvironmentManager:
     def __init__(self,
                  environment: gym.Env,
                  agent: LearningController,
-                 worker: EnvironmentWorker):
+                 worker: EnvironmentWorker,
+                 store: storage.LogStore | None = None,
+                 checkpoint_writer: checkpoints.CheckpointWriter | None = None,
+                 config: settings.RunConfig | None = None,
+                 seed: int | None = None):
         self.env = environment
         self.worker = worker
-        self.logger = EnvironmentMonitor()
+        self.store = store
+        self.checkpoint_writer = checkpoint_writer
 
         self.agent = agent
 
+        # Without a config the run follows the module variables
+        self.config = settings.CONFIG if config is None else config
+        if config is not None:
+            agent.set_config(config)
+            worker.config = config
+        self.logger = EnvironmentMonitor(config=self.config)
+
         self.seed_manager = EnvironmentSeedManager()
+        # With a seed the agent draws from generators of its own
+        # and the episodes get seeds of their own
+        if seed is not None:
+            agent.set_generator(generators.get_generator(seed, 'agent'))
+            self.seed_manager.set_generator(seed)
         self.fps_time = time.time()
         self.episode = 1
         self.running = False
         self.rewards = 0
         self.time_steps = 0
 
+        self.headless = False
+        self.skipped_renders = 0
+        self.skipped_frames = 0
+        # Set to a PhaseTimer to measure the phases of the training loop
+        self.timer: PhaseTimer | None = None
+        # Set to end the window of a configuration as soon as the agent
+        # has eliminated it, see LearningController.get_is_eliminated
+        self.racing = False
+        self.learn_episode = 0
+        self.raced_episodes = 0
+        # Set to a RewardCache to skip episodes which already ran,
+        # not supported by the VectorEnvironmentManager
+        self.reward_cache: RewardCache | None = None
+
     def start(self):
         self.running = True
 
     def stop(self):
         self.running = False
         self.env.close()
+        if self.store is not None:
+            self.store.close()
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()
+
+    def get_checkpoint(self) -> dict:
+        """
+        Returns a copy of the state of the training run
+        after the last finished episode.
+
+        :return: State of the manager and its components
+        """
+        return {
+            'episode': self.episode,
+            'learn_episode': self.learn_episode,
+            'rewards': self.rewards,
+            'time_steps': self.time_steps,
+            'agent': self.agent.get_checkpoint(),
+            'worker': self.worker.get_checkpoint(),
+            'logger': self.logger.get_checkpoint(),
+            'seed_manager': self.seed_manager.get_checkpoint(),
+            'state': {field: getattr(self.config.state, field)
+                      for field in settings.STATE_FIELDS},
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        """
+        Restores the state of :method:`get_checkpoint()`.
+
+        :param dict checkpoint: State of the manager and its components
+        :return: None
+        """
+        self.episode = checkpoint['episode']
+        self.learn_episode = checkpoint['learn_episode']
+        self.rewards = checkpoint['rewards']
+        self.time_steps = checkpoint['time_steps']
+        self.agent.set_checkpoint(checkpoint['agent'])
+        self.worker.set_checkpoint(checkpoint['worker'])
+        self.logger.set_checkpoint(checkpoint['logger'])
+        self.seed_manager.set_checkpoint(checkpoint['seed_manager'])
+        for field, value in checkpoint['state'].items():
+            setattr(self.config.state, field, value)
 
     def step_epsilon(self):
-        if settings.MULTIPLIER_EPSILON > settings.EPSILON.CAP:
-            settings.MULTIPLIER_EPSILON *= settings.EPSILON.DECAY_RATE
-        if settings.EPSILON.VALUE > settings.EPSILON.CAP:
-            settings.EPSILON.VALUE *= settings.EPSILON.DECAY_RATE
+        decay_epsilon(config=self.config)
 
     def step_monitor(self):
-        self.logger.monitor({
+        values = {
             'episode': self.episode,
             'reward': self.rewards,
             'difficulty': self.worker.difficulty,
             'steps': self.time_steps,
             'seed': self.seed_manager.output,
-        })
+        }
+        self.logger.monitor(values)
+        if self.store is not None:
+            self.store.add_episode(values, self.agent.name)
 
     def step_print(self):
         episode, time_steps = self.episode, self.time_steps
-        if not settings.EPISODE.PRINT_TOGGLE:
+        config = self.config
+        if not config.print_toggle:
             pass
-        elif (episode % settings.EPISODE.PRINT == 0
-              or episode % settings.EPISODE.SHOW == 0):
+        elif (episode % config.episode_print == 0
+              or episode % config.episode_show == 0):
             print("Episode {} finished after {} time steps"
                   .format(episode, time_steps))
-        if episode % settings.EPISODE.SHOW == 0:
+        if episode % config.episode_show == 0:
             log = self.logger.get_log()
             log += f'{self.agent.name} = {self.agent.get_string()}'
+            if self.timer is not None:
+                log += '\n' + self.timer.get_line()
+            if self.reward_cache is not None:
+                log += '\n' + self.reward_cache.get_line()
             print(log, '\n')
 
     def step_frame(self):
@@ -705,18 +1706,36 @@ class EnvironmentManager:
         if frame_time < self.fps_time:
             return
         self.fps_time = frame_time + 0.1
+        if self.headless:
+            self.skipped_frames += 1
+            return
         self.env.render()
 
     def step_agent(self):
         self.agent.reward(self.rewards)
-        if self.episode % settings.EPISODE_LEARN == 0:
-            self.logger.process(self.episode)
+        self.learn_episode += 1
+        remaining = self.config.episode_learn - self.learn_episode
+        eliminated = (self.racing and remaining > 0
+                      and self.agent.get_is_eliminated())
+        if remaining > 0 and not eliminated:
+            return
+        self.learn_episode = 0
+        self.logger.process(self.episode)
+        if self.store is not None:
+            self.store.add_window(self.logger.results[-1], self.agent.name)
+        if eliminated:
+            self.raced_episodes += remaining
+            self.agent.eliminate()
+        else:
             self.agent.reflect()
-            self.agent.explore()
-            self.seed_manager.reset()
+        self.agent.explore()
+        self.seed_manager.reset()
 
     def step_render(self):
-        if self.episode % settings.EPISODE.SHOW != 1:
+        if self.episode % self.config.episode_show != 1:
+            return
+        if self.headless:
+            self.skipped_renders += 1
             return
         # Get best episode to show
         time_steps, rewards, done = 1, 0, False
@@ -730,49 +1749,126 @@ class EnvironmentManager:
             reward += self.worker.get_reward(observation)
             rewards += reward
             time_steps += 1
-            if time_steps == settings.TIME_STEPS:
+            if time_steps == self.config.time_steps:
                 break
         self.time_steps = time_steps
         self.rewards = rewards
 
     def step_episode(self):
-        time_steps, rewards, done = 1, 0, False
         seed = self.seed_manager.next_seed()
-        observation = self.env.reset(seed=seed)
+        if self.reward_cache is not None:
+            self.rewards, self.time_steps = self.run_episode_cached(seed)
+            return
+        self.rewards, self.time_steps = run_episode(
+            self.env, self.worker, self.agent, seed, self.config, self.timer)
+
+    def run_episode_cached(self, seed) -> tuple[float, int]:
+        """
+        Runs the episode the same as :func:`run_episode`, unless
+        the reward cache already holds its rewards and time steps.
+
+        :param int seed: Seed of the episode
+        :return: Collected rewards and amount of time steps
+        """
+        # The difficulty of the worker is part of the key
         self.worker.reset(seed=seed)
+        key = self.reward_cache.get_key(
+            self.agent, self.worker, seed, self.config)
+        result = None if key is None else self.reward_cache.get(key)
+        if result is not None:
+            return result
+        observation = self.env.reset(seed=seed)
         self.agent.reset()
-        while not done:
-            action = self.worker.get_action(observation)
-            observation, reward, done, info = self.env.step(action)
-            reward += self.worker.get_reward(observation)
-            rewards += reward
-            time_steps += 1
-            if time_steps == settings.TIME_STEPS:
-                break
-        self.time_steps = time_steps
-        self.rewards = rewards
+        result = run_steps(self.env, self.worker, observation, self.config,
+                           self.timer)
+        if key is not None:
+            self.reward_cache.put(key, result)
+        return result
 
     def step_end(self):
-        if self.episode > settings.EPISODE.CAP:
+        if self.episode > self.config.episode_cap:
             self.stop()
         self.episode += 1
 
-    def run(self):
+    def run(self, headless=False, stop_file=None):
+        """
+        Runs the episodes until the episode cap is reached or the
+        training is stopped. The interactive mode opens a window to
+        stop the training and renders episodes and frames. The headless
+        mode skips every rendering and GUI path, stops on SIGINT or
+        SIGTERM, and prints the throughput when it is done.
+
+        :param bool headless: Whether to run without rendering and GUI
+        :param str stop_file: Path of a file which stops the training
+         as soon as it exists
+        :return: None
+        """
+        self.headless = headless
         self.start()
-        self.stop_event()
+        if headless:
+            handlers = self.stop_signals()
+        else:
+            self.stop_event()
+        started, episode = time.perf_counter(), self.episode
         while self.running:
             self.run_sequence()
+            if stop_file is not None and os.path.exists(stop_file):
+                self.running = False
         self.stop()
+        if headless:
+            for number, handler in handlers.items():
+                signal.signal(number, handler)
+            throughput = self.get_throughput(
+                self.episode - episode, time.perf_counter() - started)
+            print(get_throughput_string(throughput))
+        if self.timer is not None:
+            print(self.timer.get_report())
 
     def run_sequence(self):
+        if self.timer is not None:
+            self.run_sequence_timed()
+            return
+        self.step_render()
+        self.step_episode()
+        self.step_frame()
+        self.step_monitor()
+        self.step_agent()
+        self.step_print()
+        self.step_end()
+        self.step_epsilon()
+        self.step_checkpoint()
+
+    def run_sequence_timed(self):
+        # Timestamps inline at the phase boundaries, which
+        # keeps the overhead of the timer below 1%
+        clock = time.perf_counter_ns
+        start = clock()
         self.step_render()
+        render = clock()
         self.step_episode()
+        episode = clock()
         self.step_frame()
+        frame = clock()
         self.step_monitor()
+        monitor = clock()
         self.step_agent()
+        agent = clock()
         self.step_print()
+        print_end = clock()
         self.step_end()
+        end = clock()
         self.step_epsilon()
+        epsilon = clock()
+        self.step_checkpoint()
+        self.timer.add_stamps(SEQUENCE_PHASES, (
+            start, render, episode, frame, monitor, agent,
+            print_end, end, epsilon, clock()))
+
+    def step_checkpoint(self):
+        if self.checkpoint_writer is None:
+            return
+        if self.learn_episode == 0:
+            self.checkpoint_writer.submit(self)
 
     def run_once(self):
         self.episode = 1
@@ -782,8 +1878,46 @@ class EnvironmentManager:
         print("Collected rewards:", self.rewards)
         self.stop()
 
+    def stop_signals(self) -> dict:
+        """
+        Stops the training on SIGINT and SIGTERM instead of raising,
+        so the running episode finishes and the stores are closed.
+
+        :return: Previous handler per signal, to restore them
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+
+        def handler(number, frame):
+            self.running = False
+
+        handlers = {}
+        for number in (signal.SIGINT, signal.SIGTERM):
+            handlers[number] = signal.signal(number, handler)
+        return handlers
+
+    def get_throughput(self, episodes, seconds) -> dict[str, float | int]:
+        """
+        Returns the throughput of a headless run. Every skipped render
+        would have run one more episode, so the gain over the
+        interactive mode is at least their share of the episodes,
+        not counting the time the skipped frames would have taken.
+
+        :param int episodes: Amount of finished episodes
+        :param float seconds: Duration of the run
+        :return: Throughput values of the run
+        """
+        return {
+            'episodes': episodes,
+            'seconds': seconds,
+            'episodes_per_second': episodes / seconds if seconds else 0.0,
+            'skipped_renders': self.skipped_renders,
+            'skipped_frames': self.skipped_frames,
+            'gain': self.skipped_renders / episodes if episodes else 0.0,
+        }
+
     def stop_event(self):
-        import tkinter, threading
+        import tkinter
 
         def thread():
             root = tkinter.Tk()
@@ -796,6 +1930,434 @@ class EnvironmentManager:
         th.start()
 
 
+class VectorEnvironmentManager(EnvironmentManager):
+    """
+    Implements from :class:`EnvironmentManager` and runs the evaluation
+    episodes between two reflects at once in a vector environment,
+    for example `gym.vector.make(name, num_envs, asynchronous)`.
+    Every sub environment gets its own copy of the worker and its own
+    state of the models. The episode results are passed one by one to
+    the monitor and the agent, so learning works the same as running
+    the episodes one after another. Workers with `batched` set calculate
+    the actions of all sub environments at once, see
+    :func:`run_batch_episodes`, the others one by one. Asynchronous
+    vector environments only pay off for environments whose steps take
+    longer than sending the actions and observations between processes.
+    """
+
+    def __init__(self,
+                 environment: gym.Env,
+                 agent: LearningController,
+                 worker: EnvironmentWorker,
+                 vector_env: gym.vector.VectorEnv,
+                 models: list[IOModel],
+                 store: storage.LogStore | None = None,
+                 checkpoint_writer: checkpoints.CheckpointWriter | None = None,
+                 config: settings.RunConfig | None = None,
+                 seed: int | None = None):
+        super().__init__(environment, agent, worker, store, checkpoint_writer,
+                         config, seed)
+        self.vector_env = vector_env
+        self.models = models
+        self.batch: list[dict] = []
+
+    def stop(self):
+        super().stop()
+        self.vector_env.close()
+
+    def get_checkpoint(self) -> dict:
+        return {**super().get_checkpoint(), 'batch': copy.deepcopy(self.batch)}
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        super().set_checkpoint(checkpoint)
+        self.batch = copy.deepcopy(checkpoint['batch'])
+
+    def step_batch(self):
+        if self.reward_cache is not None:
+            raise ValueError('The episodes of a vector environment '
+                             'can not be taken from a reward cache')
+        size = self.config.episode_learn - self.learn_episode
+        seeds, workers = [], []
+        for _ in range(size):
+            seed = self.seed_manager.next_seed()
+            self.worker.reset(seed=seed)
+            seeds.append(seed)
+            workers.append(copy.copy(self.worker))
+        self.agent.reset()
+
+        envs = self.vector_env.num_envs
+        for start in range(0, size, envs):
+            self.batch += run_vector_episodes(
+                self.vector_env, workers[start:start + envs],
+                self.models, seeds[start:start + envs], config=self.config)
+
+    def evaluate_configurations(self, configurations,
+                                seeds=None) -> list[list[float]]:
+        """
+        Runs every configuration of the models on every seed in
+        lockstep, for example the candidates of improving models.
+        The configurations of the models are not changed.
+
+        :param list[list[tuple]] configurations: Configuration of
+         every model per candidate
+        :param list[int] seeds: Seed per episode, defaults to the
+         seeds of a reset :class:`EnvironmentSeedManager`
+        :return: List of rewards per candidate
+        """
+        if seeds is None:
+            seeds = get_evaluation_seeds(self.config.episode_learn)
+        return run_configurations(self.vector_env, self.worker, self.models,
+                                  configurations, seeds, self.config)
+
+    def evaluate_models(self, model, configurations,
+                        seeds=None) -> list[list[float]]:
+        """
+        Runs every configuration of a single model on every seed in
+        lockstep, while the other models keep their configuration,
+        for example the points of a tuner.
+
+        :param IOModel model: Model of the configurations
+        :param list[tuple] configurations: Configurations of the model
+        :param list[int] seeds: Seed per episode
+        :return: List of rewards per configuration
+        """
+        index = self.models.index(model)
+        current = [m.get_model() for m in self.models]
+        return self.evaluate_configurations(
+            [current[:index] + [configuration] + current[index + 1:]
+             for configuration in configurations], seeds)
+
+    def step_agent(self):
+        super().step_agent()
+        if self.learn_episode == 0:
+            # The rest of a window that was ended early
+            # belongs to the eliminated configuration
+            self.batch.clear()
+
+    def step_episode(self):
+        if len(self.batch) == 0:
+            self.step_batch()
+        result = self.batch.pop(0)
+        self.seed_manager.output = result['seed']
+        self.worker.difficulty = result['difficulty']
+        self.time_steps = result['steps']
+        self.rewards = result['reward']
+
+
+def run_episode(env, worker, agent, seed=None, config=None,
+                timer=None) -> tuple[float, int]:
+    """
+    Runs a single episode in the environment until it is done
+    or the maximum amount of time steps has been reached.
+
+    :param gym.Env env: Environment to run the episode in
+    :param EnvironmentWorker worker: Worker which delivers the actions
+    :param LearningController agent: Agent which resets the models
+    :param int seed: Seed of the episode
+    :param settings.RunConfig config: Config of the run, defaults to
+     the module variables of :mod:`settings`
+    :param PhaseTimer timer: Timer which gets the time of the
+     environment steps, the actions and the rewards, see :func:`run_steps`
+    :return: Collected rewards and amount of time steps
+    """
+    observation = env.reset(seed=seed)
+    worker.reset(seed=seed)
+    agent.reset()
+    return run_steps(env, worker, observation, config, timer)
+
+
+def run_steps(env, worker, observation, config=None,
+              timer=None) -> tuple[float, int]:
+    """
+    Runs the steps of an episode after the environment, the worker
+    and the agent have been reset. With a timer, the time of the
+    environment steps, the actions and the rewards is added to the
+    phases episode.step, episode.action and episode.reward.
+
+    :param gym.Env env: Environment to run the episode in
+    :param EnvironmentWorker worker: Worker which delivers the actions
+    :param observation: First observation of the episode
+    :param settings.RunConfig config: Config of the run
+    :param PhaseTimer timer: Timer of the phases
+    :return: Collected rewards and amount of time steps
+    """
+    if config is None:
+        config = settings.CONFIG
+    cap = config.time_steps
+    # A timestamp at every phase boundary is cheaper than
+    # a branch per step, so the steps are always timed
+    clock = time.perf_counter_ns
+    action_time = step_time = reward_time = 0
+    time_steps, rewards, done = 1, 0, False
+    start = clock()
+    while not done:
+        action = worker.get_action(observation)
+        action_end = clock()
+        observation, reward, done, info = env.step(action)
+        step_end = clock()
+        reward += worker.get_reward(observation)
+        reward_end = clock()
+        action_time += action_end - start
+        step_time += step_end - action_end
+        reward_time += reward_end - step_end
+        start = reward_end
+        rewards += reward
+        time_steps += 1
+        if time_steps == cap:
+            break
+    if timer is not None:
+        steps = time_steps - 1
+        timer.add('episode.action', action_time, steps)
+        timer.add('episode.step', step_time, steps)
+        timer.add('episode.reward', reward_time, steps)
+    return rewards, time_steps
+
+
+def run_vector_episodes(vector_env, workers, models, seeds,
+                        configurations=None, config=None) -> list[dict]:
+    """
+    Runs one episode per worker in a vector environment. Finished
+    episodes are frozen by a done mask while the others continue.
+    The models are shared by the workers, so their state is swapped
+    in and out for every sub environment and restored afterwards.
+    When configurations are given, every episode runs its own model
+    configurations, which evaluates many candidates in lockstep.
+
+    :param gym.vector.VectorEnv vector_env: Environment with at least
+     as many sub environments as workers
+    :param list[EnvironmentWorker] workers: Worker per episode
+    :param list[IOModel] models: Models which are used by the workers
+    :param list[int] seeds: Seed per episode
+    :param list[list[tuple]] configurations: Model configurations
+     per episode, defaults to the current model configurations
+    :param settings.RunConfig config: Config of the run
+    :return: Episode results with reward, steps, seed, and difficulty
+    """
+    if workers and workers[0].batched:
+        return run_batch_episodes(vector_env, workers, models, seeds,
+                                  configurations, config)
+    if config is None:
+        config = settings.CONFIG
+    cap = config.time_steps
+    size, count = vector_env.num_envs, len(workers)
+    observations = vector_env.reset(seed=seeds + [None] * (size - count))
+    initial = [model.get_state() for model in models]
+    initial_models = [model.get_model() for model in models]
+    states = [initial for _ in range(count)]
+    active = numpy.zeros(size, dtype=bool)
+    active[:count] = True
+    time_steps, rewards = [1] * count, [0.0] * count
+    actions = [None] * size
+
+    while active.any():
+        for k in numpy.flatnonzero(active):
+            for model, state in zip(models, states[k]):
+                model.set_state(state)
+            if configurations is not None:
+                for model, configuration in zip(models, configurations[k]):
+                    model.set_model(configuration)
+            actions[k] = workers[k].get_action(observations[k])
+            states[k] = [model.get_state() for model in models]
+        for k in numpy.flatnonzero(~active):
+            # Frozen environments still need a valid action
+            actions[k] = actions[numpy.argmax(active)]
+
+        observations, env_rewards, dones, infos = vector_env.step(actions)
+        for k in numpy.flatnonzero(active):
+            observation = observations[k]
+            if dones[k]:
+                observation = get_terminal_observation(infos, k, observation)
+            reward = env_rewards[k] + workers[k].get_reward(observation)
+            rewards[k] += float(reward)
+            time_steps[k] += 1
+            if dones[k] or time_steps[k] == cap:
+                active[k] = False
+
+    for model, state, configuration in zip(models, initial, initial_models):
+        model.set_state(state)
+        model.set_model(configuration)
+    return [{
+        'reward': rewards[k],
+        'steps': time_steps[k],
+        'seed': seeds[k],
+        'difficulty': workers[k].difficulty,
+    } for k in range(count)]
+
+
+def run_batch_episodes(vector_env, workers, models, seeds,
+                       configurations=None, config=None) -> list[dict]:
+    """
+    Runs one episode per worker the same as :func:`run_vector_episodes`,
+    but calculates the actions and rewards of all rows at once. The
+    workers are stacked into a single worker, see :func:`stack_workers`,
+    and every model gets a configuration per row, see
+    :method:`IOModel.set_batch()`, which replaces the swaps of the model
+    states per row and step with a few array operations per step.
+    The observations are passed as floats of double precision, which
+    matches the precision of the single observations.
+
+    :param gym.vector.VectorEnv vector_env: Environment with at least
+     as many sub environments as workers
+    :param list[EnvironmentWorker] workers: Batched worker per episode
+    :param list[IOModel] models: Models which are used by the workers
+    :param list[int] seeds: Seed per episode
+    :param list[list[tuple]] configurations: Model configurations
+     per episode, defaults to the current model configurations
+    :param settings.RunConfig config: Config of the run
+    :return: Episode results with reward, steps, seed, and difficulty
+    """
+    if config is None:
+        config = settings.CONFIG
+    cap = config.time_steps
+    size, count = vector_env.num_envs, len(workers)
+    observations = vector_env.reset(seed=seeds + [None] * (size - count))
+    initial = [model.get_state() for model in models]
+    initial_models = [model.get_model() for model in models]
+    if configurations is None:
+        configurations = [initial_models] * count
+    # Frozen environments repeat the first episode
+    worker = stack_workers(workers + workers[:1] * (size - count))
+    rows = list(configurations) + configurations[:1] * (size - count)
+    for index, model in enumerate(models):
+        model.set_batch([row[index] for row in rows])
+    active = numpy.zeros(size, dtype=bool)
+    active[:count] = True
+    time_steps, rewards = numpy.ones(size, dtype=int), numpy.zeros(size)
+
+    while active.any():
+        actions = worker.get_actions(numpy.asarray(observations, float))
+        observations, env_rewards, dones, infos = vector_env.step(actions)
+        finished = numpy.asarray(observations, float)
+        for k in numpy.flatnonzero(dones & active):
+            finished[k] = get_terminal_observation(infos, k, observations[k])
+        reward = env_rewards + worker.get_rewards(finished)
+        rewards[active] += reward[active]
+        time_steps[active] += 1
+        active &= ~numpy.asarray(dones, bool) & (time_steps != cap)
+
+    for model, state, configuration in zip(models, initial, initial_models):
+        model.set_model(configuration)
+        model.set_state(state)
+    return [{
+        'reward': rewards[k].item(),
+        'steps': time_steps[k].item(),
+        'seed': seeds[k],
+        'difficulty': workers[k].difficulty,
+    } for k in range(count)]
+
+
+def stack_workers(workers) -> EnvironmentWorker:
+    """
+    Returns a copy of the first worker where every number attribute
+    holds an array with the value of every worker, so the batched
+    methods of the worker calculate every row at once.
+
+    :param list[EnvironmentWorker] workers: Worker per row
+    :return: Worker of all rows
+    """
+    worker = copy.copy(workers[0])
+    for key, value in vars(worker).items():
+        if isinstance(value, (int, float, numpy.number)) \
+                and not isinstance(value, bool):
+            setattr(worker, key, numpy.array([vars(w)[key] for w in workers]))
+    return worker
+
+
+def run_configurations(vector_env, worker, models, configurations,
+                       seeds, config=None) -> list[list[float]]:
+    """
+    Runs every configuration of the models on every seed in lockstep.
+    Every pair of configuration and seed gets its own sub environment,
+    the pairs are split into chunks of the vector environment size.
+
+    :param gym.vector.VectorEnv vector_env: Environment to run the episodes in
+    :param EnvironmentWorker worker: Worker which is copied per episode
+    :param list[IOModel] models: Models which are used by the worker
+    :param list[list[tuple]] configurations: Configuration of every
+     model per candidate
+    :param list[int] seeds: Seed per episode
+    :param settings.RunConfig config: Config of the run
+    :return: List of rewards per configuration
+    """
+    # Reset the worker once per seed, so every configuration
+    # runs the episodes with the same difficulty
+    snapshots = []
+    for seed in seeds:
+        worker.reset(seed=seed)
+        snapshots.append(copy.copy(worker))
+    workers, rows = [], []
+    for configuration in configurations:
+        workers += [copy.copy(snapshot) for snapshot in snapshots]
+        rows += [configuration] * len(seeds)
+    for model in models:
+        model.reset()
+
+    size, rewards = vector_env.num_envs, []
+    row_seeds = seeds * len(configurations)
+    for start in range(0, len(rows), size):
+        results = run_vector_episodes(
+            vector_env, workers[start:start + size], models,
+            row_seeds[start:start + size], rows[start:start + size], config)
+        rewards += [result['reward'] for result in results]
+    return [rewards[i:i + len(seeds)]
+            for i in range(0, len(rewards), len(seeds))]
+
+
+def get_evaluation_seeds(episodes) -> list[int]:
+    """
+    Returns the seeds of the episodes between two reflects,
+    which are the first seeds of a reset :class:`EnvironmentSeedManager`.
+
+    :param int episodes: Amount of episodes
+    :return: Seed per episode
+    """
+    seed_manager = EnvironmentSeedManager()
+    seed_manager.reset()
+    return [seed_manager.next_seed() for _ in range(episodes)]
+
+
+def get_terminal_observation(infos, index, observation):
+    """
+    Returns the last observation of a finished episode in a vector
+    environment, which resets the sub environment automatically.
+    Supports the list of info dicts of older gym versions and the
+    dict of info arrays of newer gym versions.
+
+    :param list or dict infos: Info of the vector environment step
+    :param int index: Index of the sub environment
+    :param observation: Observation returned by the vector environment
+    :return: Terminal observation, defaults to the given observation
+    """
+    if type(infos) is dict:
+        if infos.get('_terminal_observation', [False] * (index + 1))[index]:
+            return infos['terminal_observation'][index]
+        return observation
+    return infos[index].get('terminal_observation', observation)
+
+
+def decay_epsilon(episodes: int = 1, config=None) -> None:
+    """
+    Decays the epsilon value and multiplier as if the
+    given amount of episodes have been finished.
+
+    :param episodes: Amount of finished episodes
+    :param settings.RunConfig config: Config of the run, defaults to
+     the module variables of :mod:`settings`
+    :return: None
+    """
+    if config is None:
+        config = settings.CONFIG
+    state, cap, rate = config.state, config.epsilon_cap, \
+        config.epsilon_decay_rate
+    multiplier, epsilon = state.multiplier_epsilon, state.epsilon
+    for _ in range(episodes):
+        if multiplier > cap:
+            multiplier *= rate
+        if epsilon > cap:
+            epsilon *= rate
+    state.multiplier_epsilon, state.epsilon = multiplier, epsilon
+
+
 def get_tuple_string(array: tuple) -> str:
     """
     Returns a reformatted tuple in text form.
@@ -839,16 +2401,72 @@ def get_is_improvement(bypass, new_values, old_values, func, threshold):
     return improvement > threshold
 
 
-def get_is_improving_random(improvements, new_values, old_values):
+def get_is_improving_random(improvements, new_values, old_values,
+                            config=None, generator=None):
+    if config is None:
+        config = settings.CONFIG
+    if generator is None:
+        generator = rng
     avg, low, high = improvements
-    threshold = settings.IMPROVEMENT_THRESHOLD
-    threshold += settings.IMPROVEMENT_THRESHOLD_RNG * rng.random()
+    threshold = config.improvement_threshold
+    threshold += config.improvement_threshold_rng * generator.random()
     low = get_is_improvement(low, new_values, old_values, min, threshold)
     high = get_is_improvement(high, new_values, old_values, max, threshold)
     avg = get_is_improvement(avg, new_values, old_values, sum, threshold)
     return avg, low, high
 
 
+def get_reward_bound(step_bound: float, config=None) -> float:
+    """
+    Returns the highest reward an episode can score when no step scores
+    more than the step bound and the episode ends at the time steps of
+    the config at the latest.
+
+    :param float step_bound: Highest reward of a step, the reward of
+     the environment included
+    :param settings.RunConfig config: Config of the run
+    :return: Highest reward of an episode
+    """
+    if config is None:
+        config = settings.CONFIG
+    # With negative rewards a step bounds the reward of an episode
+    # better, the episode can end after a single step
+    return max(step_bound * config.time_steps, step_bound)
+
+
+def get_is_eliminated(new_values, old_values, bound=None, config=None) -> bool:
+    """
+    Returns whether the partial rewards of a candidate can not pass
+    :func:`get_is_improving_random` against the rewards of the previous
+    model on the same seeds anymore, even if every remaining episode
+    scores the bound and the lowest random threshold is drawn.
+
+    :param list new_values: Rewards of the candidate so far
+    :param list old_values: Rewards of the previous model
+    :param float bound: Highest reward an episode of the environment
+     can score, without it no candidate is eliminated
+    :param settings.RunConfig config: Config of the run
+    :return: Whether the candidate is eliminated
+    """
+    if config is None:
+        config = settings.CONFIG
+    remaining = len(old_values) - len(new_values)
+    if bound is None or len(new_values) == 0 or remaining < 0:
+        return False
+    best_sum = sum(new_values) + remaining * bound
+    best_min = min(new_values)
+    best_max = max(new_values) if remaining == 0 else \
+        max(max(new_values), bound)
+    threshold = config.improvement_threshold
+    passed = [
+        best > old or get_improvement_gain(best, old) > threshold
+        for best, old in ((best_sum, sum(old_values)),
+                          (best_min, min(old_values)),
+                          (best_max, max(old_values)))
+    ]
+    return sum(passed) < 2
+
+
 def get_is_improving(new_values, old_values):
     a, b, c = (True, True, True)
     if len(old_values) == 0:
@@ -876,18 +2494,22 @@ def get_index_difference(tuple_a, tuple_b) -> int:
     return -1
 
 
-def get_index_random(index_range, index_skip=-1) -> int:
+def get_index_random(index_range, index_skip=-1, generator=None) -> int:
     """
     Gets random index within a maximum range.
     When index_skip is specified it will not return that number.
 
     :param int index_range: Maximum value of the random index
     :param int index_skip: Index that is not allowed to be picked
+    :param generators.BlockGenerator generator: Random generator,
+     defaults to the generator of the module
     :return: Random index number
     """
-    random_index = rng.integers(index_range)
+    if generator is None:
+        generator = rng
+    random_index = generator.integers(index_range)
     while random_index == index_skip:
-        random_index = rng.integers(index_range)
+        random_index = generator.integers(index_range)
     return random_index
 
 
@@ -895,10 +2517,24 @@ def get_index_closest(value, data) -> int:
     """
     Returns the index of the closest value at the given value.
 
-    :param list or tuple data: Container with values
+    :param list or tuple or numpy.ndarray data: Container with values
     :param float or int value: Any value that has some
     relation to the given container
     :return: Index at closest value
     """
-    item = min(data, key=lambda x: abs(x - value))
-    return data.index(item)
+    distances = numpy.abs(numpy.asarray(data) - value)
+    return int(numpy.argmin(distances))
+
+
+def get_throughput_string(throughput) -> str:
+    """
+    Returns a representation of the throughput of a headless run.
+
+    :param dict throughput: Values of :method:`EnvironmentManager.get_throughput()`
+    :return: Line with the throughput
+    """
+    return ('Headless: {episodes} episodes in {seconds:.1f} s '
+            '({episodes_per_second:.1f} episodes/s), skipped '
+            '{skipped_renders} rendered episodes and {skipped_frames} frames, '
+            'at least {gain:.1%} more episodes than interactive'
+            .format(**throughput))
@@ -0,0 +1,145 @@
+"""
+This module holds the random generators of the training runs.
+
+Every generator is derived from the seed of a run and a key, such as the
+index of a controller or the seed of an episode, with the spawn keys of
+:class:`numpy.random.SeedSequence`. The streams are independent of each
+other and do not depend on the order in which they are created, so a
+run draws the same numbers no matter how many workers share the work.
+"""
+import zlib
+
+import numpy
+
+BLOCK_SIZE = 1024
+
+
+class BlockGenerator:
+    """
+    Class wraps a :class:`numpy.random.Generator` and draws the single
+    floats and integers from a prefetched block of floats, which is much
+    cheaper per call than asking the generator for every single number.
+    Draws of arrays and the other methods of the generator are passed on
+    to the generator itself.
+
+    Available methods:
+    :method:`random()`,
+    :method:`integers()`,
+    :method:`spawn()`,
+    :method:`get_checkpoint()`,
+    :method:`set_checkpoint()`
+    """
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        if not isinstance(seed, numpy.random.SeedSequence):
+            seed = numpy.random.SeedSequence(seed)
+        self.sequence = seed
+        self.generator = numpy.random.default_rng(seed)
+        self.block_size = block_size
+        self.block: list[float] = []
+        self.index = 0
+
+    def __getattr__(self, name):
+        if name == 'generator':
+            raise AttributeError(name)
+        return getattr(self.generator, name)
+
+    def random(self, size=None):
+        """
+        Returns a float in [0, 1), or an array of floats when a size
+        is given. Single floats come in the same order as the floats
+        of the generator itself.
+
+        :param int or tuple size: Shape of the array
+        :return: Random float or array of random floats
+        """
+        if size is not None:
+            return self.generator.random(size)
+        if self.index == len(self.block):
+            self.block = self.generator.random(self.block_size).tolist()
+            self.index = 0
+        value = self.block[self.index]
+        self.index += 1
+        return value
+
+    def integers(self, low, high=None, size=None, **kwargs):
+        """
+        Returns a random integer in [0, low) taken from the block when
+        only the upper bound is given, otherwise the integers of
+        :method:`numpy.random.Generator.integers()`.
+
+        :param int low: Lowest integer, or the upper bound if it is
+         the only argument
+        :param int high: Upper bound of the integers
+        :param int or tuple size: Shape of the array
+        :return: Random integer or array of random integers
+        """
+        if high is None and size is None and not kwargs \
+                and isinstance(low, (int, numpy.integer)):
+            if low < 1:
+                raise ValueError('high <= 0')
+            return int(self.random() * low)
+        return self.generator.integers(low, high, size, **kwargs)
+
+    def spawn(self, *key) -> 'BlockGenerator':
+        """
+        Returns an independent generator for a part of the run.
+
+        :param key: Integers or strings which identify the part
+        :return: Generator of the part
+        """
+        return BlockGenerator(
+            get_seed_sequence(self.sequence, *key), self.block_size)
+
+    def get_checkpoint(self) -> dict:
+        return {
+            'state': self.generator.bit_generator.state,
+            'block': list(self.block),
+            'index': self.index,
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        self.generator.bit_generator.state = checkpoint['state']
+        self.block = list(checkpoint['block'])
+        self.index = checkpoint['index']
+
+
+def get_key_id(key) -> int:
+    """
+    Returns the integer of a part of a spawn key. Strings are
+    hashed with CRC-32, so they are the same in every process.
+
+    :param int or str key: Part of a spawn key
+    :return: Non-negative integer
+    """
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    return int(key)
+
+
+def get_seed_sequence(seed, *key) -> numpy.random.SeedSequence:
+    """
+    Returns the seed sequence of the key below the seed. The same seed
+    and key always give the same sequence, and different keys give
+    independent sequences, also of the sequence of the seed itself.
+
+    :param int or numpy.random.SeedSequence seed: Seed of the run
+    :param key: Integers or strings which identify the part of the run
+    :return: Seed sequence of the part
+    """
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    return numpy.random.SeedSequence(
+        seed.entropy,
+        spawn_key=seed.spawn_key + tuple(get_key_id(k) for k in key))
+
+
+def get_generator(seed, *key) -> BlockGenerator:
+    """
+    Returns an independent generator of the key below the seed.
+
+    :param int seed: Seed of the run
+    :param key: Integers or strings which identify the part of the run
+    :return: Generator of the part
+    """
+    return BlockGenerator(get_seed_sequence(seed, *key))
@@ -1,24 +1,17 @@
+from __future__ import annotations
+
+import copy
+
 import numpy
 
-import controllers
-from mutations import mutate_io_controller_random
+from src import controllers
+from src import generators
+from src import mutations
+from src import settings
 
-rng = numpy.random.default_rng(2000)
+rng = generators.BlockGenerator(2000)
 
 ALPHABET = 'A B C D E F G H I J K L M N O P Q R S T U V W X Y Z'.split(' ')
-ALPHABET_EXTENDED = [a for a in ALPHABET]
-ALPHABET_EXTENDED += [
-    a + b for a in ALPHABET for b in ALPHABET
-]
-ALPHABET_EXTENDED += [
-    c + d + e for c in ALPHABET
-    for d in ALPHABET for e in ALPHABET
-]
-ALPHABET_EXTENDED += [
-    c + d + e + f for c in ALPHABET
-    for d in ALPHABET for e in ALPHABET
-    for f in ALPHABET for f in ALPHABET
-]
 
 """
 # It is time to do elitism, replication,
@@ -47,19 +40,38 @@ ALPHABET_EXTENDED += [
 """
 
 
-class RotatingList:
-    def __init__(self, data):
-        self.data = data
+class NameGenerator:
+    """
+    Generates the names of new genomes on demand in the order
+    A, B, ..., Z, AA, AB, ..., ZZ, AAA, ... without storing them.
+    """
+
+    def __init__(self):
         self.index = -1
 
-    def next(self):
+    def next(self) -> str:
+        """
+        Returns the next name in the sequence.
+
+        :return: Name of a genome
+        """
         self.index += 1
-        if self.index > len(self.data):
-            self.index = 0
-        return self.data[self.index]
+        return get_genome_name(self.index)
 
+    def next_ids(self, count) -> numpy.ndarray:
+        """
+        Returns the positions of the next names in the sequence,
+        see :func:`get_genome_name()`.
+
+        :param int count: Amount of names
+        :return: Position of every name
+        """
+        ids = numpy.arange(self.index + 1, self.index + 1 + count)
+        self.index += count
+        return ids
 
-ROTATING_ALPHABET = RotatingList(ALPHABET_EXTENDED)
+
+GENOME_NAMES = NameGenerator()
 
 
 class ModelManager:
@@ -121,16 +133,170 @@ class ModelManager:
         return text + ']'
 
 
+class Population:
+    """
+    Class holds the individuals of a genetic population in parallel
+    NumPy arrays. The genes of all models of an individual are
+    concatenated into a row of the gene matrix, `sizes` holds the
+    amount of values per model. The name of an individual is stored
+    as its position in the name sequence of :data:`GENOME_NAMES`, the
+    names of its parents and the amount of its mutations, and only
+    turned into text like `C=A+B:1` when it is needed.
+
+    Available methods:
+    :method:`add_model()`,
+    :method:`add_individuals()`,
+    :method:`extend()`,
+    :method:`take()`,
+    :method:`get_name()`,
+    :method:`get_names()`,
+    :method:`get_gene()`,
+    :method:`get_genes()`,
+    :method:`set_gene()`
+    """
+
+    def __init__(self, size=0, sizes=()):
+        self.sizes = list(sizes)
+        self.genes = numpy.zeros((size, sum(self.sizes)))
+        self.rank = numpy.ones(size)
+        self.name_id = GENOME_NAMES.next_ids(size)
+        # Name ids of both parents of a bred individual, -1 otherwise
+        self.parents = numpy.full((size, 2), -1)
+        self.iteration = numpy.zeros(size, int)
+        self.rewards: list[list[float]] = [[] for _ in range(size)]
+
+    def __len__(self):
+        return len(self.rank)
+
+    def __eq__(self, other):
+        return (isinstance(other, Population)
+                and self.sizes == other.sizes
+                and numpy.array_equal(self.genes, other.genes)
+                and numpy.array_equal(self.rank, other.rank)
+                and numpy.array_equal(self.name_id, other.name_id)
+                and numpy.array_equal(self.parents, other.parents)
+                and numpy.array_equal(self.iteration, other.iteration)
+                and self.rewards == other.rewards)
+
+    def get_offsets(self) -> numpy.ndarray:
+        """
+        Returns the first column of every model in the gene matrix.
+
+        :return: Column per model
+        """
+        return numpy.cumsum([0] + self.sizes[:-1])
+
+    def add_model(self, base, config=None, generator=None) -> None:
+        """
+        Adds the columns of a model to every gene, which
+        are randomized around the base of the model.
+
+        :param tuple base: Configuration of the model
+        :param settings.RunConfig config: Config of the run
+        :param generators.BlockGenerator generator: Random generator
+        :return: None
+        """
+        columns = numpy.tile(numpy.asarray(base, float), (len(self), 1))
+        self.genes = numpy.hstack([self.genes, randomize_genetics(
+            columns, [len(base)], config=config, generator=generator)])
+        self.sizes.append(len(base))
+
+    def add_individuals(self, size, base, config=None,
+                        generator=None) -> None:
+        """
+        Adds new individuals with genes which are
+        randomized around the base of the models.
+
+        :param int size: Amount of individuals
+        :param list[tuple] base: Configuration of every model
+        :param settings.RunConfig config: Config of the run
+        :param generators.BlockGenerator generator: Random generator
+        :return: None
+        """
+        population = Population(size, self.sizes)
+        genes = numpy.tile(numpy.concatenate(
+            [numpy.asarray(b, float) for b in base] or [[]]), (size, 1))
+        population.genes = randomize_genetics(
+            genes, self.sizes, config=config, generator=generator)
+        self.extend(population)
+
+    def extend(self, population) -> None:
+        self.genes = numpy.vstack([self.genes, population.genes])
+        self.rank = numpy.concatenate([self.rank, population.rank])
+        self.name_id = numpy.concatenate([self.name_id, population.name_id])
+        self.parents = numpy.vstack([self.parents, population.parents])
+        self.iteration = numpy.concatenate(
+            [self.iteration, population.iteration])
+        self.rewards += population.rewards
+
+    def take(self, indices) -> Population:
+        """
+        Returns a copy of the individuals at the indices.
+
+        :param numpy.ndarray indices: Index of every individual
+        :return: Population of the individuals
+        """
+        population = Population(0, self.sizes)
+        population.genes = self.genes[indices]
+        population.rank = self.rank[indices]
+        population.name_id = self.name_id[indices]
+        population.parents = self.parents[indices]
+        population.iteration = self.iteration[indices]
+        population.rewards = [list(self.rewards[i]) for i in indices]
+        return population
+
+    def get_name(self, index) -> str:
+        """
+        Returns the name of an individual, which is the name of the
+        individual, the names of the parents, and the amount of
+        mutations.
+
+        :param int index: Index of the individual
+        :return: Name of the individual
+        """
+        name = get_genome_name(self.name_id[index])
+        parent_a, parent_b = self.parents[index]
+        if parent_a > -1:
+            name += '=' + get_genome_name(parent_a) + \
+                    '+' + get_genome_name(parent_b)
+        return name + ':' + str(self.iteration[index])
+
+    def get_names(self) -> list[str]:
+        return [self.get_name(i) for i in range(len(self))]
+
+    def get_gene(self, index) -> list[tuple]:
+        """
+        Returns the configuration of every model of an individual.
+
+        :param int index: Index of the individual
+        :return: Configuration per model
+        """
+        row = self.genes[index].tolist()
+        return [tuple(row[offset:offset + size])
+                for offset, size in zip(self.get_offsets(), self.sizes)]
+
+    def get_genes(self) -> list[list[tuple]]:
+        return [self.get_gene(i) for i in range(len(self))]
+
+    def set_gene(self, index, gene) -> None:
+        """
+        Changes the configuration of every model of an individual.
+
+        :param int index: Index of the individual
+        :param list[tuple] gene: Configuration per model
+        :return: None
+        """
+        self.genes[index] = numpy.concatenate(
+            [numpy.asarray(model, float) for model in gene])
+
+
 class GeneticEvolutionController(controllers.LearningController,
                                  controllers.BaseManager):
-    def __init__(self, size=10):
+    def __init__(self, size=10, selection='roulette'):
         controllers.LearningController.__init__(self, 'Genetic')
-        self.genetic_population: list[dict] = [{
-            'name': ROTATING_ALPHABET.next() + ':0',
-            'gene': [],
-            'rank': 1,
-            'rewards': [],
-        } for _ in range(size)]
+        self.genetic_population = Population(size)
+        # Name of the function of SELECTIONS which picks the parents
+        self.selection = selection
         self.model_manager = ModelManager()
         self.genetic_index = -1
         self.rewards = []
@@ -139,18 +305,15 @@ class GeneticEvolutionController(controllers.LearningController,
         if self.genetic_index + 1 < len(self.genetic_population):
             self.next_controller()
             return
-        ranked_pool = sorted(
-            self.genetic_population, key=lambda g: g['rank'])
-        progress_pool = []
-
         population = len(self.genetic_population)
         elitism = int(population * 0.1)
         breeding = int(population * 0.3)
         mutation = int(population * 0.4)
         replication = int(population * 0.2)
+        generator = rng if self.generator is None else self.generator
 
         while elitism + replication + breeding + mutation != population:
-            chance = rng.random()
+            chance = generator.random()
             if chance < 0.1:
                 elitism += 1
                 continue
@@ -167,39 +330,65 @@ class GeneticEvolutionController(controllers.LearningController,
                 mutation += 1
                 continue
 
-        genetics_replication(ranked_pool, progress_pool, replication)
-        genetics_mutation(ranked_pool, progress_pool, mutation)
-        genetics_breeding(ranked_pool, progress_pool, breeding)
-        genetics_elitism(ranked_pool, progress_pool, elitism)
+        select = SELECTIONS[self.selection]
+        ranked_pool = self.genetic_population
+        progress_pool = Population(0, ranked_pool.sizes)
+        progress_pool.extend(genetics_replication(
+            ranked_pool, replication, select, generator))
+        progress_pool.extend(genetics_mutation(
+            ranked_pool, mutation, select, self.config, generator))
+        progress_pool.extend(genetics_breeding(
+            ranked_pool, breeding, select, generator))
+        progress_pool.extend(
+            genetics_elitism(ranked_pool, elitism))
         self.genetic_population = progress_pool
         self.next_controller()
 
     def reflect(self) -> None:
-        genetic_info = self.genetic_population[self.genetic_index]
-        genetic_info['rewards'] = self.rewards
+        self.genetic_population.rewards[self.genetic_index] = self.rewards
         self.rewards = []
 
         if self.genetic_index + 1 < len(self.genetic_population):
             return
+        self.rank_population()
+
+    def evaluate(self, evaluator) -> None:
+        """
+        Evaluates the whole population at once with the evaluator
+        and ranks the individuals, after which :method:`explore()`
+        creates the next generation.
+
+        :param PopulationEvaluator evaluator: Evaluator of the genes
+        :return: None
+        """
+        population = self.genetic_population
+        seeds = controllers.get_evaluation_seeds(self.config.episode_learn)
+        population.rewards = evaluator.evaluate(
+            population.get_names(), population.get_genes(), seeds)
+        self.genetic_index = len(population) - 1
+        self.rewards = []
+        self.rank_population()
 
-        rewards = [g['rewards'] for g in self.genetic_population]
-        max_reward = [max(r) for r in rewards]
-        highest, lowest = max(max_reward), min(max_reward)
-        genetics_rank = [(r - lowest) / (highest - lowest)
-                         for r in max_reward]
-        for genetic, rank in zip(self.genetic_population, genetics_rank):
-            genetic['rank'] = rank
-            genetic['rewards'] = []
+    def rank_population(self) -> None:
+        """
+        Ranks every individual between 0 and 1 based on the
+        highest reward of the individual and clears the rewards.
+        When every individual has the same reward, each one gets rank 1.
+
+        :return: None
+        """
+        population = self.genetic_population
+        max_reward = numpy.array([max(r) for r in population.rewards])
+        highest, lowest = max_reward.max(), max_reward.min()
+        if highest == lowest:
+            population.rank = numpy.ones(len(max_reward))
+        else:
+            population.rank = (max_reward - lowest) / (highest - lowest)
+        population.rewards = [[] for _ in range(len(population))]
 
     def resize_genetic_population(self, size):
-        genetic_base = self.model_manager.get_models()
-        for _ in range(size):
-            self.genetic_population.append({
-                'name': ROTATING_ALPHABET.next() + ':0',
-                'gene': randomize_genetics(genetic_base),
-                'rank': 1,
-                'rewards': [],
-            })
+        self.genetic_population.add_individuals(
+            size, self.model_manager.get_models(), self.config, self.generator)
         self.next_controller()
 
     def add_controller(self, controller) -> None:
@@ -209,9 +398,8 @@ class GeneticEvolutionController(controllers.LearningController,
         :param controllers.IOModel controller:
         """
         self.model_manager.add_model(controller)
-        io_base = controller.get_model()
-        for genetic in self.genetic_population:
-            genetic['gene'].append(randomize_genetic_io(io_base))
+        self.genetic_population.add_model(
+            controller.get_model(), self.config, self.generator)
 
     def next_controller(self):
         self.select_controller(self.genetic_index + 1)
@@ -220,9 +408,9 @@ class GeneticEvolutionController(controllers.LearningController,
         if not index < len(self.genetic_population):
             index = 0
         self.genetic_index = index
-        genetic_io = self.genetic_population[index]
-        self.model_manager.set_models(genetic_io['gene'])
-        self.name = genetic_io['name']
+        population = self.genetic_population
+        self.model_manager.set_models(population.get_gene(index))
+        self.name = population.get_name(index)
 
     def get_size(self):
         return len(self.genetic_population)
@@ -236,122 +424,516 @@ class GeneticEvolutionController(controllers.LearningController,
     def get_string(self) -> str:
         return self.model_manager.get_string()
 
+    def get_models(self) -> tuple | None:
+        return tuple(self.model_manager.get_models())
+
+    def get_checkpoint(self) -> dict:
+        return {
+            **controllers.LearningController.get_checkpoint(self),
+            'genetic_population': copy.deepcopy(self.genetic_population),
+            'genetic_index': self.genetic_index,
+            'rewards': list(self.rewards),
+            'models': self.model_manager.get_models(),
+            'model_states': [m.get_state() for m in self.model_manager.models],
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        controllers.LearningController.set_checkpoint(self, checkpoint)
+        self.genetic_population = copy.deepcopy(
+            checkpoint['genetic_population'])
+        self.genetic_index = checkpoint['genetic_index']
+        self.rewards = list(checkpoint['rewards'])
+        self.model_manager.set_models(checkpoint['models'])
+        for model, state in zip(self.model_manager.models,
+                                checkpoint['model_states']):
+            model.set_state(state)
+
+
+class PopulationEvaluator:
+    """
+    Evaluates the genes of a genetic population in a pool of worker
+    processes. Every process calls the factory once to create its own
+    environment, worker and :class:`GeneticEvolutionController`, and
+    runs the evaluation episodes of a gene on the given seeds.
+    The factory needs to be a module level function, so it can be
+    sent to the worker processes. A config of the run is given to the
+    worker and the controller of every process.
+
+    Available methods:
+    :method:`evaluate()`,
+    :method:`close()`
+    """
 
-def genetics_elitism(ranked_pool, progress_pool, elitism):
-    ranked_pool.reverse()
-    for genetic_info in ranked_pool:
-        progress_pool.append(genetic_info)
-        elitism += -1
-        if elitism > 0:
-            continue
-        break
+    def __init__(self, factory, processes=None, config=None):
+        """
+        :param factory: Function which returns an environment, an
+         environment worker and the genetic controller of the models
+         which are used by the worker
+        :param int processes: Amount of worker processes, defaults to
+         the amount of cpu cores, zero evaluates inside this process
+        :param settings.RunConfig config: Config of the run, defaults to
+         the module variables of :mod:`settings`
+        """
+        self.factory = factory
+        self.processes = processes
+        self.config = config
+        self.evaluation = None
+        self.pool = None
 
+    def evaluate(self, names, genes, seeds=None) -> list[list[float]]:
+        """
+        Returns the rewards of every gene on every seed.
 
-def genetics_replication(ranked_pool, progress_pool, replication):
-    while replication > 0:
-        for genetic_info in ranked_pool:
-            if rng.random() > genetic_info['rank']:
-                continue
-            if rng.random() > 0.2:
-                continue
-            progress_pool.append(genetic_info)
-            replication += -1
-            if replication > 0:
-                continue
-            break
+        :param list[str] names: Name of every individual
+        :param list[list[tuple]] genes: Gene of every individual
+        :param list[int] seeds: Seed per episode, defaults to the
+         seeds of a reset :class:`EnvironmentSeedManager`
+        :return: List of rewards per gene
+        """
+        if seeds is None:
+            config = settings.CONFIG if self.config is None else self.config
+            seeds = controllers.get_evaluation_seeds(config.episode_learn)
+        tasks = [(name, gene, seeds) for name, gene in zip(names, genes)]
+        if self.processes == 0:
+            if self.evaluation is None:
+                self.evaluation = get_evaluation(self.factory, self.config)
+            return [run_gene(self.evaluation, task) for task in tasks]
+        if self.pool is None:
+            import multiprocessing
+
+            self.pool = multiprocessing.Pool(
+                self.processes, initialize_evaluation,
+                (self.factory, self.config))
+        return self.pool.map(evaluate_gene, tasks, chunksize=1)
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
 
+        :return: None
+        """
+        if self.pool is None:
+            return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
 
-def genetics_breeding(ranked_pool, progress_pool, breeding):
-    while breeding > 0:
-        pool_a = generate_breeding_pool(ranked_pool)
-        pool_b = generate_breeding_pool(ranked_pool)
-        for parent_a, parent_b in zip(pool_a, pool_b):
-            if parent_a is parent_b:
-                continue
 
-            name_info_a: str = parent_a['name']
-            info_a = name_info_a.split(':')[0]
-            name_a = info_a.split('=')[0]
-
-            name_info_b: str = parent_b['name']
-            info_b = name_info_b.split(':')[0]
-            name_b = info_b.split('=')[0]
-
-            new_info = '=' + name_a + '+' + name_b + ':0'
-            genetics = breed_genetics(
-                parent_a['gene'], parent_b['gene'])
-            progress_pool.append({
-                'name': ROTATING_ALPHABET.next() + new_info,
-                'gene': genetics,
-                'rank': 0,
-                'rewards': [],
-            })
-            breeding += -1
-            if breeding > 0:
-                continue
-            break
+class BatchPopulationEvaluator:
+    """
+    Evaluates the genes of a genetic population in lockstep inside a
+    single batched environment, for example a simulator of
+    :mod:`simulators`. Every pair of gene and seed gets its own row
+    in the batch. Has the same interface as :class:`PopulationEvaluator`.
+    The name of the controller is not changed per row, so rewards of the
+    worker may not depend on it.
+
+    Available methods:
+    :method:`evaluate()`,
+    :method:`close()`
+    """
 
+    def __init__(self, factory, vector_factory, config=None):
+        """
+        :param factory: Function which returns an environment, an
+         environment worker and the genetic controller of the models
+         which are used by the worker
+        :param vector_factory: Function which returns a batched
+         environment with the given amount of rows
+        :param settings.RunConfig config: Config of the run, defaults to
+         the module variables of :mod:`settings`
+        """
+        self.factory = factory
+        self.vector_factory = vector_factory
+        self.config = config
+        self.evaluation = None
+        self.vector_env = None
 
-def genetics_mutation(ranked_pool, progress_pool, mutation):
-    while mutation > 0:
-        for genetic_info in ranked_pool:
-            if rng.random() > genetic_info['rank']:
-                continue
-            if rng.random() > 0.2:
-                continue
-            genetics = genetic_info['gene']
-            genetics = mutate_genetics(genetics)
-            name_info: str = genetic_info['name']
-            info, iteration = name_info.split(':')
-            iteration = ':' + str(int(iteration) + 1)
-            progress_pool.append({
-                'name': info + iteration,
-                'gene': genetics,
-                'rank': 0,
-                'rewards': [],
-            })
-            mutation += -1
-            if mutation > 0:
-                continue
-            break
+    def evaluate(self, names, genes, seeds=None) -> list[list[float]]:
+        """
+        Returns the rewards of every gene on every seed.
 
+        :param list[str] names: Name of every individual
+        :param list[list[tuple]] genes: Gene of every individual
+        :param list[int] seeds: Seed per episode, defaults to the
+         seeds of a reset :class:`EnvironmentSeedManager`
+        :return: List of rewards per gene
+        """
+        if seeds is None:
+            config = settings.CONFIG if self.config is None else self.config
+            seeds = controllers.get_evaluation_seeds(config.episode_learn)
+        if self.evaluation is None:
+            self.evaluation = get_evaluation(self.factory, self.config)
+        env, worker, controller = self.evaluation
+        size = len(genes) * len(seeds)
+        if self.vector_env is None or self.vector_env.num_envs != size:
+            self.vector_env = self.vector_factory(size)
+        return controllers.run_configurations(
+            self.vector_env, worker, controller.model_manager.models,
+            genes, seeds, self.config)
+
+    def close(self) -> None:
+        if self.vector_env is not None:
+            self.vector_env.close()
+
+
+class SuccessiveHalvingEvaluator:
+    """
+    Evaluates the genes of a genetic population with successive halving
+    on top of another evaluator. Every gene runs the first few seeds,
+    then only the best part of the genes is kept and runs more seeds,
+    until the order of the kept genes does not change anymore, a single
+    gene is left, or the seeds run out. Genes which were dropped early
+    return fewer rewards, which are all lower than the highest reward
+    of the genes that were kept, so :method:`rank_population()` of the
+    :class:`GeneticEvolutionController` still ranks them below.
+    Has the same interface as :class:`PopulationEvaluator`.
+
+    Available methods:
+    :method:`evaluate()`,
+    :method:`close()`
+    """
 
-def generate_breeding_pool(ranked_pool):
-    pool_a = []
-    for genetic_info in ranked_pool:
-        if rng.random() > genetic_info['rank']:
-            continue
-        if rng.random() > 0.2:
-            continue
-        pool_a.append(genetic_info)
-    return pool_a
+    def __init__(self, evaluator, start=2, keep=0.5, growth=2, config=None):
+        """
+        :param evaluator: Evaluator which runs the episodes, like
+         :class:`PopulationEvaluator` or :class:`BatchPopulationEvaluator`
+        :param int start: Amount of seeds of the first round
+        :param float keep: Part of the genes which is kept after a round
+        :param int growth: Factor of the amount of seeds per round
+        :param settings.RunConfig config: Config of the run, which
+         delivers the default amount of seeds
+        """
+        self.evaluator = evaluator
+        self.config = config
+        self.start = start
+        self.keep = keep
+        self.growth = growth
+        # Amount of episodes and rounds of the last evaluation
+        self.episodes = 0
+        self.rounds = 0
+
+    def evaluate(self, names, genes, seeds=None) -> list[list[float]]:
+        """
+        Returns the rewards of every gene on the seeds it was run on,
+        which are the first seeds of the given seeds.
+
+        :param list[str] names: Name of every individual
+        :param list[list[tuple]] genes: Gene of every individual
+        :param list[int] seeds: Seeds of the longest evaluation,
+         defaults to the seeds of a reset :class:`EnvironmentSeedManager`
+        :return: List of rewards per gene
+        """
+        if seeds is None:
+            config = settings.CONFIG if self.config is None else self.config
+            seeds = controllers.get_evaluation_seeds(config.episode_learn)
+        rewards = [[] for _ in genes]
+        alive = list(range(len(genes)))
+        order = []
+        done, size = 0, min(self.start, len(seeds))
+        self.episodes, self.rounds = 0, 0
+        while alive:
+            results = self.evaluator.evaluate(
+                [names[i] for i in alive], [genes[i] for i in alive],
+                seeds[done:size])
+            for i, result in zip(alive, results):
+                rewards[i].extend(result)
+            self.episodes += len(alive) * (size - done)
+            self.rounds += 1
+            # Sorting is stable, so ties keep the order of the last round
+            ranked = sorted(alive, key=lambda i: -max(rewards[i]))
+            if ranked == order or size == len(seeds):
+                break
+            alive = ranked[:max(1, int(len(ranked) * self.keep))]
+            order = alive
+            if len(alive) == 1:
+                break
+            done, size = size, min(size * self.growth, len(seeds))
+        return rewards
+
+    def close(self) -> None:
+        self.evaluator.close()
+
+
+# Environment, worker and controller of an evaluation process
+evaluation = None
+
+
+def initialize_evaluation(factory, config=None):
+    global evaluation
+    evaluation = get_evaluation(factory, config)
+
+
+def evaluate_gene(task):
+    return run_gene(evaluation, task)
+
+
+def get_evaluation(factory, config=None) -> tuple:
+    """
+    Returns the environment, the worker and the controller of the
+    factory, where the worker and the controller follow the config.
+
+    :param factory: Function which returns an environment, an
+     environment worker and the genetic controller of the models
+    :param settings.RunConfig config: Config of the run, without it
+     the worker and the controller keep their config
+    :return: Environment, worker and controller
+    """
+    env, worker, controller = factory()
+    if config is not None:
+        controller.set_config(config)
+        worker.config = config
+    return env, worker, controller
 
 
-def breed_genetics(genetics_a, genetics_b):
-    genetics_new = []
-    for a, b in zip(genetics_a, genetics_b):
-        if rng.random() > 0.5:
-            genetics_new.append(a)
-        else:
-            genetics_new.append(b)
-    return genetics_new
+def run_gene(setup, task):
+    name, gene, seeds = task
+    env, worker, controller = setup
+    controller.name = name
+    controller.model_manager.set_models(gene)
+    return [controllers.run_episode(
+        env, worker, controller, seed, controller.config)[0]
+        for seed in seeds]
+
 
+def get_genome_name(index) -> str:
+    """
+    Returns the name at the given position of the name sequence,
+    which counts with the letters of the alphabet as digits.
 
-def mutate_genetics(genetic_base):
-    index = rng.integers(len(genetic_base))
-    io_controller = genetic_base[index]
-    genetic_base[index] = mutate_io_controller_random(io_controller)
-    return genetic_base
+    :param int index: Position in the name sequence
+    :return: Name of a genome
+    """
+    name = ''
+    index += 1
+    while index > 0:
+        index, letter = divmod(index - 1, len(ALPHABET))
+        name = ALPHABET[letter] + name
+    return name
 
 
-def randomize_genetics(genetic_base):
-    return [
-        randomize_genetic_io(base)
-        for base in genetic_base
-    ]
+def genetics_elitism(population, elitism) -> Population:
+    """
+    Returns copies of the individuals with the highest rank.
+
+    :param Population population: Population of the generation
+    :param int elitism: Amount of individuals
+    :return: Population of the copies
+    """
+    ranked = numpy.argsort(population.rank, kind='stable')
+    return population.take(ranked[::-1][:elitism])
+
+
+def genetics_replication(population, replication, select,
+                         generator=None) -> Population:
+    """
+    Returns copies of individuals which are picked based on their rank.
+
+    :param Population population: Population of the generation
+    :param int replication: Amount of individuals
+    :param select: Selection function, see :data:`SELECTIONS`
+    :param generators.BlockGenerator generator: Random generator
+    :return: Population of the copies
+    """
+    return population.take(select(population.rank, replication, generator))
 
 
-def randomize_genetic_io(base_io):
-    for _ in range(10):
-        base_io = mutate_io_controller_random(base_io)
-    return base_io
+def genetics_breeding(population, breeding, select,
+                      generator=None) -> Population:
+    """
+    Returns children of two different parents, which are picked based
+    on their rank, with the models of either parent at random.
+
+    :param Population population: Population of the generation
+    :param int breeding: Amount of children
+    :param select: Selection function, see :data:`SELECTIONS`
+    :param generators.BlockGenerator generator: Random generator
+    :return: Population of the children
+    """
+    if generator is None:
+        generator = rng
+    parents_a = select(population.rank, breeding, generator)
+    parents_b = select(population.rank, breeding, generator)
+    same = parents_a == parents_b
+    if same.any() and len(population) > 1:
+        # Pair the parent with any other individual instead
+        parents_b[same] = (parents_a[same] + generator.integers(
+            1, len(population), same.sum())) % len(population)
+
+    children = Population(breeding, population.sizes)
+    children.genes = breed_genetics(population.genes[parents_a],
+                                    population.genes[parents_b],
+                                    population.sizes, generator)
+    children.rank[:] = 0
+    children.parents = numpy.stack([population.name_id[parents_a],
+                                    population.name_id[parents_b]], axis=1)
+    return children
+
+
+def genetics_mutation(population, mutation, select, config=None,
+                      generator=None) -> Population:
+    """
+    Returns copies of individuals which are picked based
+    on their rank with a single value changed.
+
+    :param Population population: Population of the generation
+    :param int mutation: Amount of individuals
+    :param select: Selection function, see :data:`SELECTIONS`
+    :param settings.RunConfig config: Config of the run
+    :param generators.BlockGenerator generator: Random generator
+    :return: Population of the mutated copies
+    """
+    children = population.take(select(population.rank, mutation, generator))
+    children.genes = mutate_genetics(
+        children.genes, children.sizes, config, generator)
+    children.iteration += 1
+    children.rank[:] = 0
+    return children
+
+
+def get_weights(rank) -> numpy.ndarray:
+    """
+    Returns the cumulative weights of the ranks, which are the same
+    for every individual if all ranks are zero or any is not finite.
+
+    :param numpy.ndarray rank: Rank of every individual
+    :return: Cumulative weight of every individual
+    """
+    weights = numpy.cumsum(rank, dtype=float)
+    if len(weights) == 0 or not numpy.isfinite(weights[-1]) \
+            or weights[-1] <= 0:
+        weights = numpy.arange(1.0, len(rank) + 1)
+    return weights
+
+
+def select_roulette(rank, count, generator=None) -> numpy.ndarray:
+    """
+    Returns the indices of individuals which are picked
+    independently with a chance proportional to their rank.
+
+    :param numpy.ndarray rank: Rank of every individual
+    :param int count: Amount of individuals
+    :param generators.BlockGenerator generator: Random generator,
+     defaults to the generator of the module
+    :return: Index of every picked individual
+    """
+    if generator is None:
+        generator = rng
+    weights = get_weights(rank)
+    pointers = generator.random(count) * weights[-1]
+    return numpy.searchsorted(weights, pointers, side='right')
+
+
+def select_universal(rank, count, generator=None) -> numpy.ndarray:
+    """
+    Returns the indices of individuals which are picked with stochastic
+    universal sampling, which uses evenly spaced pointers from a single
+    random start, so every individual is picked as often as its rank
+    expects, rounded up or down. The indices are shuffled.
+
+    :param numpy.ndarray rank: Rank of every individual
+    :param int count: Amount of individuals
+    :param generators.BlockGenerator generator: Random generator
+    :return: Index of every picked individual
+    """
+    if generator is None:
+        generator = rng
+    weights = get_weights(rank)
+    step = weights[-1] / max(1, count)
+    pointers = (generator.random() + numpy.arange(count)) * step
+    return generator.permutation(
+        numpy.searchsorted(weights, pointers, side='right'))
+
+
+def select_tournament(rank, count, generator=None, size=3) -> numpy.ndarray:
+    """
+    Returns the indices of the individuals with the highest
+    rank out of a few random individuals per pick.
+
+    :param numpy.ndarray rank: Rank of every individual
+    :param int count: Amount of individuals
+    :param generators.BlockGenerator generator: Random generator
+    :param int size: Amount of individuals per tournament
+    :return: Index of every picked individual
+    """
+    if generator is None:
+        generator = rng
+    contestants = generator.integers(len(rank), size=(count, size))
+    winners = numpy.argmax(rank[contestants], axis=1)
+    return contestants[numpy.arange(count), winners]
+
+
+SELECTIONS = {
+    'roulette': select_roulette,
+    'universal': select_universal,
+    'tournament': select_tournament,
+}
+
+
+def breed_genetics(genetics_a, genetics_b, sizes,
+                   generator=None) -> numpy.ndarray:
+    """
+    Returns genes with every model taken from either gene at random.
+
+    :param numpy.ndarray genetics_a: Genes of the first parents
+    :param numpy.ndarray genetics_b: Genes of the second parents
+    :param list[int] sizes: Amount of values per model
+    :param generators.BlockGenerator generator: Random generator
+    :return: Genes of the children
+    """
+    if generator is None:
+        generator = rng
+    from_a = generator.random((len(genetics_a), len(sizes))) > 0.5
+    return numpy.where(numpy.repeat(from_a, sizes, axis=1),
+                       genetics_a, genetics_b)
+
+
+def mutate_genetics(genetics, sizes, config=None,
+                    generator=None) -> numpy.ndarray:
+    """
+    Returns a copy of the genes with a random value of
+    a random model changed by a random float.
+
+    :param numpy.ndarray genetics: Genes of the individuals
+    :param list[int] sizes: Amount of values per model
+    :param settings.RunConfig config: Config of the run, defaults to
+     the module variables of :mod:`settings`
+    :param generators.BlockGenerator generator: Random generator
+    :return: Mutated genes
+    """
+    if generator is None:
+        generator = rng
+    genetics = genetics.copy()
+    rows = numpy.arange(len(genetics))
+    if len(rows) == 0 or len(sizes) == 0:
+        return genetics
+    models = generator.integers(len(sizes), size=len(rows))
+    offsets = numpy.cumsum([0] + list(sizes[:-1]))
+    columns = offsets[models] + generator.integers(
+        0, numpy.asarray(sizes)[models])
+    genetics[rows, columns] += (generator.random(len(rows)) - 0.5) \
+        * mutations.get_random_scale(config)
+    return genetics
+
+
+def randomize_genetics(genetics, sizes, times=10, config=None,
+                       generator=None) -> numpy.ndarray:
+    """
+    Returns a copy of the genes where every model is mutated several times.
+
+    :param numpy.ndarray genetics: Genes of the individuals
+    :param list[int] sizes: Amount of values per model
+    :param int times: Amount of mutations per model
+    :param settings.RunConfig config: Config of the run
+    :param generators.BlockGenerator generator: Random generator
+    :return: Randomized genes
+    """
+    genetics = genetics.copy()
+    offset = 0
+    for size in sizes:
+        columns = slice(offset, offset + size)
+        for _ in range(times):
+            genetics[:, columns] = mutate_genetics(
+                genetics[:, columns], [size], config, generator)
+        offset += size
+    return genetics
@@ -1,12 +1,14 @@
 import numpy
 
 from src import controllers
+from src import generators
 from src import settings
 
-rng = numpy.random.default_rng(1000)
+rng = generators.BlockGenerator(1000)
 
 
-def mutate_io_model(current, previous, io_type=''):
+def mutate_io_model(current, previous, io_type='', config=None,
+                    generator=None):
     """
     Compares, modifies, and returns new tuple where a single float of
     the model has been changed. Decides randomly wheather the controller
@@ -16,25 +18,36 @@ def mutate_io_model(current, previous, io_type=''):
     :param tuple or list current: Current controller configuration
     :param tuple or list previous: Previous controller configuration
     :param str io_type: Type of the in out controller, defaults to empty string
+    :param settings.RunConfig config: Config of the run, defaults to
+     the module variables of :mod:`settings`
+    :param generators.BlockGenerator generator: Random generator,
+     defaults to the generator of the module
     :return: Tuple with a single modified value
     """
+    if config is None:
+        config = settings.CONFIG
+    if generator is None:
+        generator = rng
     if type(current) is not list:
         current = list(current)
     current_index = controllers.get_index_difference(current, previous)
 
     # Explore or improve, at the start it will explore more
-    if current_index > -1 and rng.random() > settings.EPSILON.VALUE:
+    if current_index > -1 and generator.random() > config.state.epsilon:
         # Improve the previously changed controller setting
-        improve = get_improved_float(current, previous, current_index)
+        improve = get_improved_float(current, previous, current_index, config)
         current[current_index] += improve
         return tuple(current)
 
     # Random explore controller setting at index that has not been changed
-    random_index = controllers.get_index_random(len(current), current_index)
-    return mutate_io_controller_random(current, random_index, io_type)
+    random_index = controllers.get_index_random(
+        len(current), current_index, generator)
+    return mutate_io_controller_random(
+        current, random_index, io_type, config, generator)
 
 
-def mutate_io_controller_random(controller, index=-1, io_type=''):
+def mutate_io_controller_random(controller, index=-1, io_type='', config=None,
+                                generator=None):
     """
     Compares, modifies, and returns new model where a single float of
     the model has been changed.
@@ -44,17 +57,83 @@ def mutate_io_controller_random(controller, index=-1, io_type=''):
     :param tuple or list controller: Current controller configuration
     :param int index: Place of the value which needs to be changed
     :param str io_type: Type of the in out controller
+    :param settings.RunConfig config: Config of the run
+    :param generators.BlockGenerator generator: Random generator
     :return: Tuple with a changed value
     """
+    if generator is None:
+        generator = rng
     if type(controller) is not list:
         controller = list(controller)
     if index == -1:
-        index = rng.integers(len(controller))
+        index = generator.integers(len(controller))
     multiplier = get_io_multiplier(index, io_type)
-    controller[index] += get_random_float() * multiplier
+    controller[index] += get_random_float(config, generator) * multiplier
     return tuple(controller)
 
 
+def mutate_io_models(current, previous, count=None, io_type='', config=None,
+                     generator=None) -> numpy.ndarray:
+    """
+    Returns many candidates of :func:`mutate_io_model` at once as the
+    rows of an array. Every candidate follows the same rule to improve
+    or explore with random draws of its own. A single configuration is
+    repeated for the amount of candidates, a matrix of configurations
+    gives a candidate for every row, or count candidates per row.
+
+    :param current: Current controller configuration, or a matrix
+     with a configuration per row
+    :param previous: Previous controller configuration, or a matrix
+     with a configuration per row
+    :param int count: Amount of candidates of every configuration
+    :param str io_type: Type of the in out controller
+    :param settings.RunConfig config: Config of the run
+    :param generators.BlockGenerator generator: Random generator
+    :return: Array with a candidate per row
+    """
+    if config is None:
+        config = settings.CONFIG
+    if generator is None:
+        generator = rng
+    current = numpy.array(current, dtype=float, ndmin=2)
+    previous = numpy.array(previous, dtype=float, ndmin=2)
+    if count is not None:
+        current = numpy.repeat(current, count, axis=0)
+        if len(previous) > 1:
+            previous = numpy.repeat(previous, count, axis=0)
+    if previous.shape[1:] != current.shape[1:] \
+            or len(previous) not in (1, len(current)):
+        raise ValueError(
+            f'Previous configurations of shape {previous.shape} do not '
+            f'match the current configurations of shape {current.shape}')
+    previous = numpy.broadcast_to(previous, current.shape)
+    size, width = current.shape
+    if size == 0 or width == 0:
+        return current
+
+    changed = current != previous
+    index = numpy.where(changed.any(axis=1), changed.argmax(axis=1), -1)
+    improve = (index > -1) & (generator.random(size) > config.state.epsilon)
+
+    # Improve the previously changed controller setting
+    rows, columns = numpy.flatnonzero(improve), index[improve]
+    current[rows, columns] += (current[rows, columns]
+                               - previous[rows, columns]) \
+        * config.multiplier_improve
+
+    # Explore a random setting at an index that has not been changed,
+    # a single setting is changed anyway
+    rows, skip = numpy.flatnonzero(~improve), index[~improve]
+    skipping = (skip > -1) & (width > 1)
+    columns = generator.integers(0, width - skipping)
+    columns += skipping & (columns >= skip)
+    multipliers = numpy.array(
+        [get_io_multiplier(i, io_type) for i in range(width)], dtype=float)
+    current[rows, columns] += (generator.random(len(rows)) - 0.5) \
+        * get_random_scale(config) * multipliers[columns]
+    return current
+
+
 def get_io_multiplier(index, io_type):
     """
     Returns a multiplier value at given index if the controller is a PID controller.
@@ -71,7 +150,7 @@ def get_io_multiplier(index, io_type):
     return multiplier
 
 
-def get_improved_float(current, previous, index):
+def get_improved_float(current, previous, index, config=None):
     """
     Returns a slightly improved float at index. Takes float at the
     index of new and old controller to calculate a difference.
@@ -80,21 +159,40 @@ def get_improved_float(current, previous, index):
     :param tuple or list current: Current controller
     :param tuple or list previous: Previous controller
     :param int index: Position index of both data sets
+    :param settings.RunConfig config: Config of the run
     :return: Improved float at given index
     :rtype: float
     """
-    improve = settings.MULTIPLIER_IMPROVE
+    if config is None:
+        config = settings.CONFIG
+    improve = config.multiplier_improve
     difference = (current[index] - previous[index])
     return difference * improve
 
 
-def get_random_float():
+def get_random_float(config=None, generator=None):
     """
     Returns a random float between -0.5 and 0.5 times
     the multipliers of improve and epsilon.
 
+    :param settings.RunConfig config: Config of the run
+    :param generators.BlockGenerator generator: Random generator
     :return: Random float
     :rtype: float
     """
-    improve = settings.MULTIPLIER_RANDOM * settings.MULTIPLIER_EPSILON
-    return (rng.random() - 0.5) * improve
+    if generator is None:
+        generator = rng
+    return (generator.random() - 0.5) * get_random_scale(config)
+
+
+def get_random_scale(config=None) -> float:
+    """
+    Returns the scale of the random floats, which is the
+    multiplier of random times the multiplier of epsilon.
+
+    :param settings.RunConfig config: Config of the run
+    :return: Scale of the random floats
+    """
+    if config is None:
+        config = settings.CONFIG
+    return config.multiplier_random * config.state.multiplier_epsilon
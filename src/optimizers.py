@@ -0,0 +1,628 @@
+"""
+This module holds the learners which optimize all values of one or
+more models jointly as a single vector.
+
+The covariance matrix adaptation evolution strategy (CMA-ES) samples a
+whole generation of candidates from a normal distribution, ranks them
+by their rewards, and moves the mean, the step size and the shape of
+the distribution towards the candidates with the highest rewards.
+Every candidate of a generation is independent of the others, so a
+generation can be evaluated at once by the evaluators of :mod:`genetics`.
+
+The tuners of a single model, SPSA and the Nelder-Mead simplex, ask for
+a few points per iteration, which can be evaluated at once as well.
+"""
+from __future__ import annotations
+
+import copy
+
+import numpy
+
+from src import controllers
+from src import generators
+from src import genetics
+from src import mutations
+
+rng = generators.BlockGenerator(3000)
+
+
+class CMAESStrategy:
+    """
+    Class holds the normal distribution of CMA-ES with the default
+    parameters of Hansen, "The CMA Evolution Strategy: A Tutorial".
+    The candidates with the highest fitness are selected.
+
+    Available methods:
+    :method:`ask()`,
+    :method:`tell()`
+    """
+
+    def __init__(self, mean, sigma=0.5, size=None):
+        """
+        :param mean: Start of the search
+        :param float sigma: Step size at the start
+        :param int size: Amount of candidates per generation, defaults
+         to 4 + 3 ln(n) for n values
+        """
+        self.mean = numpy.array(mean, dtype=float)
+        self.sigma = sigma
+        n = len(self.mean)
+        self.size = size or 4 + int(3 * numpy.log(max(n, 1)))
+
+        mu = self.size // 2
+        weights = numpy.log(mu + 0.5) - numpy.log(numpy.arange(1, mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / (self.weights ** 2).sum()
+        # Time constants of the paths and learning rates of the matrix
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff)
+                       / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(
+            0, numpy.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        # Expected length of a standard normal vector
+        self.chi = numpy.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.pc = numpy.zeros(n)
+        self.ps = numpy.zeros(n)
+        self.covariance = numpy.eye(n)
+        self.axes = numpy.eye(n)
+        self.scales = numpy.ones(n)
+        self.generation = 0
+
+    def ask(self, generator=None) -> numpy.ndarray:
+        """
+        Returns the candidates of the next generation.
+
+        :param generators.BlockGenerator generator: Random generator,
+         defaults to the generator of the module
+        :return: Array with a candidate per row
+        """
+        if generator is None:
+            generator = rng
+        z = generator.standard_normal((self.size, len(self.mean)))
+        return self.mean + self.sigma * (z * self.scales) @ self.axes.T
+
+    def tell(self, candidates, fitness) -> None:
+        """
+        Updates the distribution with the fitness of the candidates
+        of :method:`ask()`.
+
+        :param numpy.ndarray candidates: Array with a candidate per row
+        :param fitness: Fitness of every candidate, higher is better
+        :return: None
+        """
+        n = len(self.mean)
+        order = numpy.argsort(-numpy.asarray(fitness), kind='stable')
+        steps = (candidates[order[:len(self.weights)]] - self.mean) \
+            / self.sigma
+        step = self.weights @ steps
+        self.mean = self.mean + self.sigma * step
+        self.generation += 1
+
+        inverse_root = self.axes @ numpy.diag(1 / self.scales) @ self.axes.T
+        self.ps = (1 - self.cs) * self.ps + numpy.sqrt(
+            self.cs * (2 - self.cs) * self.mueff) * inverse_root @ step
+        norm = numpy.linalg.norm(self.ps)
+        stalled = norm / numpy.sqrt(
+            1 - (1 - self.cs) ** (2 * self.generation)) / self.chi \
+            >= 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc
+        if not stalled:
+            self.pc += numpy.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+
+        rank_one = numpy.outer(self.pc, self.pc)
+        if stalled:
+            rank_one += self.cc * (2 - self.cc) * self.covariance
+        rank_mu = (steps.T * self.weights) @ steps
+        self.covariance = (1 - self.c1 - self.cmu) * self.covariance \
+            + self.c1 * rank_one + self.cmu * rank_mu
+        self.sigma *= numpy.exp(self.cs / self.damps * (norm / self.chi - 1))
+
+        covariance = numpy.triu(self.covariance)
+        self.covariance = covariance + numpy.triu(covariance, 1).T
+        values, self.axes = numpy.linalg.eigh(self.covariance)
+        self.scales = numpy.sqrt(numpy.maximum(values, 1e-20))
+
+
+class CMAESController(controllers.LearningController,
+                      controllers.BaseManager):
+    """
+    Learns the io models of a :class:`genetics.ModelManager` with
+    :class:`CMAESStrategy`. Like :class:`genetics.GeneticEvolutionController`
+    it runs a window of episodes per candidate when it is used by an
+    :class:`EnvironmentManager`, or evaluates a whole generation at once
+    with :method:`evaluate()`. Candidates are ranked by their average
+    reward.
+
+    Available methods:
+    :method:`evaluate()`,
+    :method:`get_mean()`,
+    :method:`get_size()`
+    """
+
+    def __init__(self, size=None, sigma=0.5):
+        """
+        :param int size: Amount of candidates per generation
+        :param float sigma: Step size at the start
+        """
+        controllers.LearningController.__init__(self, 'CMA-ES')
+        self.size = size
+        self.sigma = sigma
+        self.model_manager = genetics.ModelManager()
+        self.strategy: CMAESStrategy | None = None
+        self.candidates = numpy.zeros((0, 0))
+        self.candidate_rewards: list[list[float]] = []
+        self.candidate_index = -1
+        self.rewards = []
+
+    def add_controller(self, controller) -> None:
+        """
+        Adds an io model and starts the search again
+        from the current values of all models.
+
+        :param controllers.IOModel controller: Model to learn
+        """
+        self.model_manager.add_model(controller)
+        mean = numpy.concatenate([numpy.asarray(model, float)
+                                  for model in self.model_manager.get_models()])
+        self.strategy = CMAESStrategy(mean, self.sigma, self.size)
+        self.sample()
+
+    def set_generator(self, generator) -> None:
+        """
+        Gives the controller a random generator of its own. The first
+        generation is sampled again from it while none of its candidates
+        has been rewarded, so the models can be added before the seed
+        of the run is set.
+
+        :param generators.BlockGenerator generator: Random generator
+        :return: None
+        """
+        super().set_generator(generator)
+        if self.strategy is not None and self.strategy.generation == 0 \
+                and not self.rewards and not any(self.candidate_rewards):
+            self.sample()
+
+    def sample(self) -> None:
+        """
+        Samples the candidates of the next generation
+        and selects the first one.
+
+        :return: None
+        """
+        self.candidates = self.strategy.ask(self.generator)
+        self.candidate_rewards = [[] for _ in range(len(self.candidates))]
+        self.candidate_index = -1
+        self.next_controller()
+
+    def explore(self) -> None:
+        if self.candidate_index + 1 < len(self.candidates):
+            self.next_controller()
+            return
+        self.sample()
+
+    def reflect(self) -> None:
+        self.candidate_rewards[self.candidate_index] = self.rewards
+        self.rewards = []
+
+        if self.candidate_index + 1 < len(self.candidates):
+            return
+        self.update()
+
+    def evaluate(self, evaluator) -> None:
+        """
+        Evaluates the whole generation at once with an evaluator of
+        :mod:`genetics` and updates the distribution, after which
+        :method:`explore()` samples the next generation.
+
+        :param genetics.PopulationEvaluator evaluator: Evaluator of the genes
+        :return: None
+        """
+        size = len(self.candidates)
+        names = [self.get_candidate_name(i) for i in range(size)]
+        genes = [self.get_gene(i) for i in range(size)]
+        seeds = controllers.get_evaluation_seeds(self.config.episode_learn)
+        self.candidate_rewards = evaluator.evaluate(names, genes, seeds)
+        self.candidate_index = size - 1
+        self.rewards = []
+        self.update()
+
+    def update(self) -> None:
+        """
+        Updates the distribution with the average reward
+        of every candidate of the generation.
+
+        :return: None
+        """
+        fitness = [numpy.mean(rewards) for rewards in self.candidate_rewards]
+        self.strategy.tell(self.candidates, fitness)
+
+    def get_gene(self, index) -> list[tuple]:
+        """
+        Returns the configuration of every model of a candidate.
+
+        :param int index: Index of the candidate
+        :return: Configuration per model
+        """
+        return self.split(self.candidates[index])
+
+    def get_mean(self) -> list[tuple]:
+        """
+        Returns the configuration of every model at the mean of the
+        distribution, which is the best guess of the search.
+
+        :return: Configuration per model
+        """
+        return self.split(self.strategy.mean)
+
+    def split(self, values) -> list[tuple]:
+        values, offset, gene = values.tolist(), 0, []
+        for model in self.model_manager.get_models():
+            gene.append(tuple(values[offset:offset + len(model)]))
+            offset += len(model)
+        return gene
+
+    def get_candidate_name(self, index) -> str:
+        return f'CMA-ES:{self.strategy.generation}:{index}'
+
+    def next_controller(self):
+        self.select_controller(self.candidate_index + 1)
+
+    def select_controller(self, index):
+        if not index < len(self.candidates):
+            index = 0
+        self.candidate_index = index
+        self.model_manager.set_models(self.get_gene(index))
+        self.name = self.get_candidate_name(index)
+
+    def get_size(self):
+        return len(self.candidates)
+
+    def reward(self, reward):
+        self.rewards.append(reward)
+
+    def reset(self) -> None:
+        self.model_manager.reset()
+
+    def get_string(self) -> str:
+        return self.model_manager.get_string()
+
+    def get_models(self) -> tuple | None:
+        return tuple(self.model_manager.get_models())
+
+    def get_checkpoint(self) -> dict:
+        return {
+            **controllers.LearningController.get_checkpoint(self),
+            'strategy': copy.deepcopy(self.strategy),
+            'candidates': self.candidates.copy(),
+            'candidate_rewards': copy.deepcopy(self.candidate_rewards),
+            'candidate_index': self.candidate_index,
+            'rewards': list(self.rewards),
+            'models': self.model_manager.get_models(),
+            'model_states': [m.get_state() for m in self.model_manager.models],
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        controllers.LearningController.set_checkpoint(self, checkpoint)
+        self.strategy = copy.deepcopy(checkpoint['strategy'])
+        self.candidates = checkpoint['candidates'].copy()
+        self.candidate_rewards = copy.deepcopy(checkpoint['candidate_rewards'])
+        self.candidate_index = checkpoint['candidate_index']
+        self.rewards = list(checkpoint['rewards'])
+        self.model_manager.set_models(checkpoint['models'])
+        for model, state in zip(self.model_manager.models,
+                                checkpoint['model_states']):
+            model.set_state(state)
+
+
+class SPSATuner:
+    """
+    Class holds the state of simultaneous perturbation stochastic
+    approximation (SPSA), which estimates the gradient of all values
+    from two points per iteration, whatever the amount of values. The
+    points lie on either side of the current values along a random
+    direction. The values are scaled per index, so the steps fit the
+    magnitude of every value.
+
+    Available methods:
+    :method:`ask()`,
+    :method:`tell()`,
+    :method:`get_best()`
+    """
+
+    def __init__(self, values, scale=None, perturbation=0.1, step=0.2,
+                 stability=10, alpha=0.602, gamma=0.101):
+        """
+        :param values: Values at the start
+        :param scale: Scale per value, defaults to one
+        :param float perturbation: Distance of the points at the start
+        :param float step: Largest change of a value per iteration,
+         which the first iteration with a gradient takes
+        :param int stability: Offset of the iterations in the gain,
+         which keeps the first steps from being too large
+        :param float alpha: Decay of the gain of the steps
+        :param float gamma: Decay of the perturbation
+        """
+        self.scale = numpy.ones(len(values)) if scale is None \
+            else numpy.asarray(scale, dtype=float)
+        self.values = numpy.asarray(values, dtype=float) / self.scale
+        self.perturbation = perturbation
+        self.step = step
+        self.stability = stability
+        self.alpha = alpha
+        self.gamma = gamma
+        self.gain: float | None = None
+        self.iteration = 0
+        self.delta = numpy.zeros(len(self.values))
+
+    def ask(self, generator=None) -> list[numpy.ndarray]:
+        """
+        Returns the two points of the next iteration.
+
+        :param generators.BlockGenerator generator: Random generator,
+         defaults to the generator of the module
+        :return: Points on either side of the values
+        """
+        if generator is None:
+            generator = rng
+        self.delta = generator.integers(0, 2, len(self.values)) * 2.0 - 1
+        c = self.perturbation / (self.iteration + 1) ** self.gamma
+        return [(self.values + c * self.delta) * self.scale,
+                (self.values - c * self.delta) * self.scale]
+
+    def tell(self, fitness) -> None:
+        """
+        Moves the values along the estimated gradient.
+
+        :param fitness: Fitness of both points, higher is better
+        :return: None
+        """
+        plus, minus = fitness
+        c = self.perturbation / (self.iteration + 1) ** self.gamma
+        gradient = (plus - minus) / (2 * c * self.delta)
+        self.iteration += 1
+        highest = abs(gradient).max()
+        if highest == 0:
+            return
+        if self.gain is None:
+            self.gain = self.step * (self.stability + 1) ** self.alpha / highest
+        a = self.gain / (self.iteration + self.stability) ** self.alpha
+        # Block steps beyond the first one of noisy rewards
+        self.values = self.values + min(a, self.step / highest) * gradient
+
+    def get_best(self) -> numpy.ndarray:
+        return self.values * self.scale
+
+
+class NelderMeadTuner:
+    """
+    Class holds the simplex of the Nelder-Mead method, which moves the
+    worst of n + 1 points through the others until the simplex shrinks
+    around the best point. The first iteration asks for every point
+    of the simplex, a shrink for every point but the best one, every
+    other iteration for a single point.
+
+    Available methods:
+    :method:`ask()`,
+    :method:`tell()`,
+    :method:`get_best()`
+    """
+
+    def __init__(self, values, scale=None, size=0.5):
+        """
+        :param values: Values at the start
+        :param scale: Scale per value, defaults to one
+        :param float size: Length of the edges of the simplex at the
+         start, relative to the scale
+        """
+        self.scale = numpy.ones(len(values)) if scale is None \
+            else numpy.asarray(scale, dtype=float)
+        start = numpy.asarray(values, dtype=float) / self.scale
+        self.simplex = numpy.vstack(
+            [start, start + size * numpy.eye(len(start))])
+        self.fitness = numpy.full(len(self.simplex), -numpy.inf)
+        # Step of the method which the asked points belong to
+        self.stage = 'start'
+        self.points = self.simplex
+        self.reflected: tuple[numpy.ndarray, float] | None = None
+
+    def get_centroid(self) -> numpy.ndarray:
+        return self.simplex[:-1].mean(axis=0)
+
+    def ask(self, generator=None) -> list[numpy.ndarray]:
+        """
+        Returns the points of the next step.
+
+        :param generator: Unused, the method is deterministic
+        :return: Points to evaluate
+        """
+        return [point * self.scale for point in self.points]
+
+    def tell(self, fitness) -> None:
+        """
+        Takes the fitness of the asked points and
+        prepares the points of the next step.
+
+        :param fitness: Fitness of every asked point, higher is better
+        :return: None
+        """
+        fitness = list(fitness)
+        centroid = self.get_centroid()
+        if self.stage == 'start':
+            self.fitness = numpy.array(fitness, dtype=float)
+        elif self.stage == 'shrink':
+            self.simplex[1:] = self.points
+            self.fitness[1:] = fitness
+        elif self.stage == 'reflect':
+            point, value = self.points[0], fitness[0]
+            if value > self.fitness[0]:
+                self.reflected = point, value
+                self.ask_stage('expand', [centroid + 2 * (point - centroid)])
+                return
+            if value > self.fitness[-2]:
+                self.replace_worst(point, value)
+            elif value > self.fitness[-1]:
+                self.reflected = point, value
+                self.ask_stage(
+                    'outside', [centroid + 0.5 * (point - centroid)])
+                return
+            else:
+                self.reflected = None
+                self.ask_stage(
+                    'inside', [centroid + 0.5 * (self.simplex[-1] - centroid)])
+                return
+        elif self.stage == 'expand':
+            point, value = self.reflected
+            if fitness[0] > value:
+                point, value = self.points[0], fitness[0]
+            self.replace_worst(point, value)
+        else:
+            worst = self.fitness[-1] if self.reflected is None \
+                else self.reflected[1]
+            if fitness[0] >= worst:
+                self.replace_worst(self.points[0], fitness[0])
+            else:
+                best = self.simplex[0]
+                self.ask_stage('shrink', best + 0.5 * (self.simplex[1:] - best))
+                return
+        order = numpy.argsort(-self.fitness, kind='stable')
+        self.simplex, self.fitness = self.simplex[order], self.fitness[order]
+        centroid = self.get_centroid()
+        self.ask_stage('reflect', [2 * centroid - self.simplex[-1]])
+
+    def ask_stage(self, stage, points) -> None:
+        self.stage = stage
+        self.points = numpy.array(points)
+
+    def replace_worst(self, point, value) -> None:
+        self.simplex[-1] = point
+        self.fitness[-1] = value
+
+    def get_best(self) -> numpy.ndarray:
+        return self.simplex[self.fitness.argmax()] * self.scale
+
+
+TUNERS = {
+    'spsa': SPSATuner,
+    'nelder_mead': NelderMeadTuner,
+}
+
+
+class TuningModelController(controllers.ImprovingModelController):
+    """
+    Implements from :class:`ImprovingModelController` and tunes all
+    values of the model jointly with a tuner of :data:`TUNERS`, which
+    are scaled like the random steps of :mod:`mutations`. It plugs into
+    an :class:`ImprovingControllerManager` like the improving models.
+    Run by an :class:`EnvironmentManager`, every window evaluates a
+    point of the tuner. With :method:`evaluate()` all points of an
+    iteration are evaluated at once, for example in lockstep by
+    :method:`VectorEnvironmentManager.evaluate_models()`. A point is
+    ranked by its average reward.
+
+    Available methods:
+    :method:`evaluate()`,
+    :method:`get_best()`
+    """
+
+    def __init__(self, name='', preset=(0, 0, 0), method='spsa'):
+        controllers.ImprovingModelController.__init__(self, name, preset)
+        scale = [mutations.get_io_multiplier(i, self.io_type)
+                 for i in range(len(preset))]
+        self.tuner = TUNERS[method](preset, scale)
+        self.points: list[numpy.ndarray] = []
+        self.results: list[float] = []
+
+    def explore(self) -> None:
+        if not self.points:
+            generator = rng if self.generator is None else self.generator
+            self.points = self.tuner.ask(generator)
+            self.results = []
+        self.current_model = tuple(self.points[len(self.results)].tolist())
+        self.model.set_model(self.current_model)
+
+    def reflect(self) -> None:
+        rewards = self.current_rewards
+        controllers.ImprovingController.reflect(self)
+        # The window before the first explore ran the preset
+        if not self.points or not rewards:
+            return
+        self.results.append(float(numpy.mean(rewards)))
+        if len(self.results) == len(self.points):
+            self.tell()
+
+    def evaluate(self, evaluate_points) -> None:
+        """
+        Evaluates the remaining points of the iteration at once
+        and moves the tuner to the next iteration.
+
+        :param evaluate_points: Function which returns the rewards
+         of a list of configurations of the model
+        :return: None
+        """
+        if not self.points:
+            generator = rng if self.generator is None else self.generator
+            self.points = self.tuner.ask(generator)
+            self.results = []
+        remaining = [tuple(point.tolist())
+                     for point in self.points[len(self.results):]]
+        self.results += [float(numpy.mean(rewards))
+                         for rewards in evaluate_points(remaining)]
+        self.tell()
+
+    def tell(self) -> None:
+        self.tuner.tell(self.results)
+        self.points, self.results = [], []
+        self.previous_model = self.current_model = self.get_best()
+        self.model.set_model(self.current_model)
+
+    def get_best(self) -> tuple:
+        """
+        Returns the best configuration of the tuner so far.
+
+        :return: Configuration of the model
+        """
+        return tuple(self.tuner.get_best().tolist())
+
+    def get_is_eliminated(self, rewards=None) -> bool:
+        # Every point is needed to move the tuner
+        return False
+
+    def get_checkpoint(self) -> dict:
+        return {
+            **super().get_checkpoint(),
+            'tuner': copy.deepcopy(self.tuner),
+            'points': [point.copy() for point in self.points],
+            'results': list(self.results),
+        }
+
+    def set_checkpoint(self, checkpoint: dict) -> None:
+        super().set_checkpoint(checkpoint)
+        self.tuner = copy.deepcopy(checkpoint['tuner'])
+        self.points = [point.copy() for point in checkpoint['points']]
+        self.results = list(checkpoint['results'])
+
+
+class TuningPIDModel(TuningModelController):
+    """
+    Implements from :class:`TuningModelController` and :class:`PIDModel`.
+    """
+    io_type = 'pid'
+
+    def __init__(self, name='', preset=(0, 0, 0), method='spsa'):
+        TuningModelController.__init__(self, name, preset, method)
+        self.model = controllers.PIDModel(preset)
+
+
+class TuningNodeModel(TuningModelController):
+    """
+    Implements from :class:`TuningModelController` and :class:`NodeModel`.
+    """
+
+    def __init__(self, name='', preset=None, method='spsa'):
+        if preset is None:
+            raise ValueError('Please provide a preset')
+        TuningModelController.__init__(self, name, preset, method)
+        self.model = controllers.NodeModel(preset)
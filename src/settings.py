@@ -3,8 +3,12 @@ This module holds the variables for the whole project.
 
 Changing one variable in this file affects all the scripts.
 Better modify the variable inside the script by importing
-this file as a module.
+this file as a module. Runs which need variables of their own
+take a :class:`RunConfig` instead.
 """
+from __future__ import annotations
+
+import dataclasses
 
 
 class EPISODE:
@@ -112,3 +116,213 @@ def set_dict(info):
             setattr(EPSILON, split[1], value)
             continue
         globals()[id] = value
+
+
+def get_checkpoint():
+    """
+    Returns a copy of every variable of the module, including the
+    derived ones skipped by :func:`get_dict`, to resume a training run.
+
+    :return: A copy of the modules variables
+    """
+    return {
+        'EPISODE.MULTIPLIER': EPISODE.MULTIPLIER,
+        'EPISODE.CAP': EPISODE.CAP,
+        'EPISODE.SHOW': EPISODE.SHOW,
+        'EPISODE.PRINT': EPISODE.PRINT,
+        'EPISODE.PRINT_TOGGLE': EPISODE.PRINT_TOGGLE,
+        'EPISODE.RENDER': EPISODE.RENDER,
+
+        'TIME_STEPS': TIME_STEPS,
+        'EPISODE_LEARN': EPISODE_LEARN,
+
+        'EPSILON.VALUE': EPSILON.VALUE,
+        'EPSILON.CAP': EPSILON.CAP,
+        'EPSILON.DISCOUNT': EPSILON.DISCOUNT,
+        'EPSILON.DECAY_RATE': EPSILON.DECAY_RATE,
+
+        'MULTIPLIER_EPSILON': MULTIPLIER_EPSILON,
+        'MULTIPLIER_IMPROVE': MULTIPLIER_IMPROVE,
+        'MULTIPLIER_RANDOM': MULTIPLIER_RANDOM,
+
+        'IMPROVEMENT_THRESHOLD': IMPROVEMENT_THRESHOLD,
+        'IMPROVEMENT_THRESHOLD_RNG': IMPROVEMENT_THRESHOLD_RNG,
+    }
+
+
+def set_checkpoint(info):
+    """
+    Restores every variable of :func:`get_checkpoint`.
+
+    :param dict[str, int | float] info: Copy of the modules variables
+    :return: None
+    """
+    for id, value in info.items():
+        split = id.split('.')
+        if 'EPISODE' in split:
+            setattr(EPISODE, split[1], value)
+            continue
+        if 'EPSILON' in split:
+            setattr(EPSILON, split[1], value)
+            continue
+        globals()[id] = value
+
+
+def get_variable(id):
+    """
+    Returns the value of a variable of :func:`get_checkpoint`.
+
+    :param str id: Name of the variable
+    :return: Value of the variable
+    """
+    split = id.split('.')
+    if 'EPISODE' in split:
+        return getattr(EPISODE, split[1])
+    if 'EPSILON' in split:
+        return getattr(EPSILON, split[1])
+    return globals()[id]
+
+
+# Module variable of every field of RunConfig and RunState
+CONFIG_FIELDS = {
+    'episode_cap': 'EPISODE.CAP',
+    'episode_show': 'EPISODE.SHOW',
+    'episode_print': 'EPISODE.PRINT',
+    'print_toggle': 'EPISODE.PRINT_TOGGLE',
+    'render': 'EPISODE.RENDER',
+    'time_steps': 'TIME_STEPS',
+    'episode_learn': 'EPISODE_LEARN',
+    'epsilon_cap': 'EPSILON.CAP',
+    'epsilon_discount': 'EPSILON.DISCOUNT',
+    'epsilon_decay_rate': 'EPSILON.DECAY_RATE',
+    'multiplier_improve': 'MULTIPLIER_IMPROVE',
+    'multiplier_random': 'MULTIPLIER_RANDOM',
+    'improvement_threshold': 'IMPROVEMENT_THRESHOLD',
+    'improvement_threshold_rng': 'IMPROVEMENT_THRESHOLD_RNG',
+}
+STATE_FIELDS = {
+    'epsilon': 'EPSILON.VALUE',
+    'multiplier_epsilon': 'MULTIPLIER_EPSILON',
+}
+
+
+@dataclasses.dataclass
+class RunState:
+    """
+    Holds the variables of a training run which decay while it runs.
+    """
+    epsilon: float = 0.9
+    multiplier_epsilon: float = 10
+
+
+@dataclasses.dataclass(frozen=True)
+class RunConfig:
+    """
+    Holds the variables of a single training run, so several runs can
+    share a process with different variables. The variables are fixed
+    for the whole run, except for the :class:`RunState` in `state`.
+    The derived variables default to the values the module calculates.
+    Use :func:`dataclasses.replace` to derive a changed config.
+
+    Available methods:
+    :method:`from_module()`,
+    :method:`get_dict()`
+    """
+    episode_cap: int = 10000
+    episode_show: int = 1000
+    episode_print: int = 100
+    print_toggle: bool = False
+    render: int = 50
+    time_steps: int = 200
+    episode_learn: int = 20
+    epsilon_cap: float = 0.05
+    epsilon_discount: float = 0.95
+    epsilon_decay_rate: float | None = None
+    multiplier_improve: float = 0.8
+    multiplier_random: float = 0.1
+    improvement_threshold: float = 0.95
+    improvement_threshold_rng: float | None = None
+    state: RunState = dataclasses.field(default_factory=RunState)
+
+    def __post_init__(self):
+        if self.epsilon_decay_rate is None:
+            object.__setattr__(self, 'epsilon_decay_rate',
+                               self.epsilon_discount ** (10 / self.episode_cap))
+        if self.improvement_threshold_rng is None:
+            object.__setattr__(self, 'improvement_threshold_rng',
+                               1.0 - self.improvement_threshold)
+
+    @classmethod
+    def from_module(cls) -> RunConfig:
+        """
+        Returns a config with the current values of the module variables.
+
+        :return: Copy of the module variables
+        """
+        return cls(
+            **{field: get_variable(id) for field, id in CONFIG_FIELDS.items()},
+            state=RunState(**{field: get_variable(id)
+                              for field, id in STATE_FIELDS.items()}))
+
+    def get_dict(self) -> dict[str, int | float]:
+        """
+        Returns the variables in the format of the module :func:`get_dict`.
+
+        :return: A copy of the variables
+        """
+        return {
+            'EPISODE.CAP': self.episode_cap,
+            'EPISODE.SHOW': self.episode_show,
+            'EPISODE.PRINT': self.episode_print,
+            'EPISODE.PRINT_TOGGLE': self.print_toggle,
+            'EPISODE.RENDER': self.render,
+
+            'TIME_STEPS': self.time_steps,
+            'EPISODE_LEARN': self.episode_learn,
+
+            'EPSILON.VALUE': self.state.epsilon,
+            'EPSILON.CAP': self.epsilon_cap,
+            'EPSILON.DISCOUNT': self.epsilon_discount,
+
+            'MULTIPLIER_EPSILON': self.state.multiplier_epsilon,
+            'MULTIPLIER_IMPROVE': self.multiplier_improve,
+            'MULTIPLIER_RAND': self.multiplier_random,
+        }
+
+
+class ModuleState:
+    """
+    Adapter with the interface of :class:`RunState` which
+    reads and changes the variables of this module.
+    """
+
+    def __getattr__(self, name):
+        if name not in STATE_FIELDS:
+            raise AttributeError(name)
+        return get_variable(STATE_FIELDS[name])
+
+    def __setattr__(self, name, value):
+        if name not in STATE_FIELDS:
+            raise AttributeError(name)
+        set_checkpoint({STATE_FIELDS[name]: value})
+
+
+class ModuleConfig:
+    """
+    Adapter with the interface of :class:`RunConfig` which reads the
+    variables of this module. It is the default config of every
+    component, so runs without a config of their own keep following
+    the module variables and the changes of the scripts.
+    """
+    state = ModuleState()
+
+    def __getattr__(self, name):
+        if name not in CONFIG_FIELDS:
+            raise AttributeError(name)
+        return get_variable(CONFIG_FIELDS[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Change the module variable of {name} instead')
+
+
+CONFIG = ModuleConfig()
@@ -0,0 +1,424 @@
+"""
+This module holds NumPy implementations of the gym environments.
+
+Every simulator steps a batch of environments at once on arrays and
+follows the interface of a gym vector environment, so it can be used
+by :class:`controllers.VectorEnvironmentManager`. Finished rows are
+frozen instead of reset automatically. :class:`SimulatorEnv` wraps a
+simulator with a single row into a drop-in replacement of `gym.Env`,
+which steps the same equations on floats instead of arrays.
+"""
+import math
+
+import numpy
+
+
+class BatchSimulator:
+    """
+    Base class that provides the interface for the batched simulators.
+
+    Available methods:
+    :method:`reset()`,
+    :method:`step()`,
+    :method:`step_single()`,
+    :method:`get_observations()`,
+    :method:`get_observation()`,
+    :method:`render()`,
+    :method:`close()`
+    """
+    max_episode_steps = 0
+    state_size = 0
+
+    def __init__(self, num_envs=1):
+        self.num_envs = num_envs
+        self.state = numpy.zeros((num_envs, self.state_size))
+        self.dones = numpy.ones(num_envs, dtype=bool)
+        self.terminated = numpy.zeros(num_envs, dtype=bool)
+        self.elapsed_steps = numpy.zeros(num_envs, dtype=int)
+        self.generators = [numpy.random.default_rng()
+                           for _ in range(num_envs)]
+
+    @property
+    def single_action_space(self):
+        raise NotImplementedError
+
+    @property
+    def action_space(self):
+        return self.single_action_space
+
+    def reset(self, seed=None):
+        """
+        Resets every row to a random starting state. Works the same
+        as the reset of a gym vector environment.
+
+        :param None or int or list seed: Seed per row, a single seed
+         is incremented for every row
+        :return: Observations of every row
+        """
+        if seed is None:
+            seed = [None] * self.num_envs
+        elif type(seed) is int:
+            seed = [seed + i for i in range(self.num_envs)]
+        for index, row_seed in enumerate(seed):
+            if row_seed is not None:
+                self.generators[index] = numpy.random.default_rng(row_seed)
+        self.state = self.reset_state(self.generators)
+        self.dones[:] = False
+        self.terminated[:] = False
+        self.elapsed_steps[:] = 0
+        return self.get_observations()
+
+    def step(self, actions):
+        """
+        Advances every unfinished row with the given actions.
+        Finished rows keep their state and return a zero reward.
+        Rows which finished by the termination rules of the environment
+        instead of the time limit are marked in `terminated`.
+
+        :param actions: Action per row
+        :return: Observations, rewards, dones, and info of every row
+        """
+        active = ~self.dones
+        state, rewards, dones = self.step_state(
+            self.state, numpy.asarray(actions))
+        self.state[active] = state[active]
+        self.elapsed_steps[active] += 1
+        truncated = self.elapsed_steps >= self.max_episode_steps
+        rewards = numpy.where(active, rewards, 0.0)
+        self.terminated |= dones & active
+        self.dones |= self.terminated | truncated
+        return self.get_observations(), rewards, self.dones.copy(), {}
+
+    def reset_state(self, generators) -> numpy.ndarray:
+        """
+        Returns a random starting state for every row.
+
+        :param list[numpy.random.Generator] generators: Generator per row
+        :return: Starting state of every row
+        """
+        raise NotImplementedError
+
+    def step_state(self, state, actions) -> tuple:
+        """
+        Returns the next state, reward and termination of every row.
+
+        :param numpy.ndarray state: Current state of every row
+        :param numpy.ndarray actions: Action per row
+        :return: Next state, rewards, and dones of every row
+        """
+        raise NotImplementedError
+
+    def step_single(self, state, action) -> tuple:
+        """
+        Returns the next state, reward and termination of a single
+        environment, which follows the equations of :method:`step_state()`
+        on floats, since array operations on a single row are slow.
+
+        :param list[float] state: Current state of the environment
+        :param action: Action of the environment
+        :return: Next state, reward, and done of the environment
+        """
+        raise NotImplementedError
+
+    def get_observations(self) -> numpy.ndarray:
+        """
+        Returns the observations of every row.
+
+        :return: Observations of every row
+        """
+        return self.state.astype(numpy.float32)
+
+    def get_observation(self, state) -> numpy.ndarray:
+        """
+        Returns the observation of the state of a single environment.
+
+        :param list[float] state: State of the environment
+        :return: Observation of the environment
+        """
+        return numpy.array(state, dtype=numpy.float32)
+
+    def render(self, mode='human'):
+        pass
+
+    def close(self):
+        pass
+
+
+class CartPoleSimulator(BatchSimulator):
+    """
+    Implements from :class:`BatchSimulator` and simulates the
+    equations of motion and termination rules of `CartPole-v1`.
+    """
+    max_episode_steps = 500
+    state_size = 4
+
+    gravity = 9.8
+    mass_cart = 1.0
+    mass_pole = 0.1
+    total_mass = mass_pole + mass_cart
+    length = 0.5
+    pole_mass_length = mass_pole * length
+    force_mag = 10.0
+    tau = 0.02
+    theta_threshold = 12 * 2 * math.pi / 360
+    x_threshold = 2.4
+
+    @property
+    def single_action_space(self):
+        from gym import spaces
+        return spaces.Discrete(2)
+
+    def reset_state(self, generators):
+        return numpy.array([
+            generator.uniform(low=-0.05, high=0.05, size=(4,))
+            for generator in generators
+        ])
+
+    def step_state(self, state, actions):
+        x, x_dot, theta, theta_dot = state.T
+        force = numpy.where(actions == 1, self.force_mag, -self.force_mag)
+        cos_theta = numpy.cos(theta)
+        sin_theta = numpy.sin(theta)
+
+        temp = (force + self.pole_mass_length * theta_dot ** 2 * sin_theta
+                ) / self.total_mass
+        theta_acc = (self.gravity * sin_theta - cos_theta * temp) / (
+            self.length * (4.0 / 3.0 - self.mass_pole * cos_theta ** 2
+                           / self.total_mass))
+        x_acc = temp - (self.pole_mass_length * theta_acc * cos_theta
+                        / self.total_mass)
+
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * x_acc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * theta_acc
+
+        dones = ((x < -self.x_threshold) | (x > self.x_threshold)
+                 | (theta < -self.theta_threshold)
+                 | (theta > self.theta_threshold))
+        rewards = numpy.ones(len(state))
+        return numpy.stack((x, x_dot, theta, theta_dot), axis=1), rewards, dones
+
+    def step_single(self, state, action):
+        x, x_dot, theta, theta_dot = state
+        force = self.force_mag if action == 1 else -self.force_mag
+        cos_theta = math.cos(theta)
+        sin_theta = math.sin(theta)
+
+        temp = (force + self.pole_mass_length * theta_dot ** 2 * sin_theta
+                ) / self.total_mass
+        theta_acc = (self.gravity * sin_theta - cos_theta * temp) / (
+            self.length * (4.0 / 3.0 - self.mass_pole * cos_theta ** 2
+                           / self.total_mass))
+        x_acc = temp - (self.pole_mass_length * theta_acc * cos_theta
+                        / self.total_mass)
+
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * x_acc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * theta_acc
+
+        done = (x < -self.x_threshold or x > self.x_threshold
+                or theta < -self.theta_threshold
+                or theta > self.theta_threshold)
+        return [x, x_dot, theta, theta_dot], 1.0, done
+
+
+class MountainCarSimulator(BatchSimulator):
+    """
+    Implements from :class:`BatchSimulator` and simulates the
+    equations of motion and goal rules of `MountainCar-v0`.
+    Position and velocity are clipped like the gym environment.
+    """
+    max_episode_steps = 200
+    state_size = 2
+
+    min_position = -1.2
+    max_position = 0.6
+    max_speed = 0.07
+    goal_position = 0.5
+    goal_velocity = 0
+    force = 0.001
+    gravity = 0.0025
+
+    @property
+    def single_action_space(self):
+        from gym import spaces
+        return spaces.Discrete(3)
+
+    @property
+    def goal_reached(self) -> numpy.ndarray:
+        """
+        Returns which rows have reached the goal.
+
+        :return: Goal reached per row
+        """
+        return self.terminated.copy()
+
+    def reset_state(self, generators):
+        return numpy.array([
+            [generator.uniform(low=-0.6, high=-0.4), 0]
+            for generator in generators
+        ])
+
+    def step_state(self, state, actions):
+        position, velocity = state.T
+        velocity = velocity + ((actions - 1) * self.force
+                               + numpy.cos(3 * position) * (-self.gravity))
+        velocity = numpy.clip(velocity, -self.max_speed, self.max_speed)
+        position = numpy.clip(
+            position + velocity, self.min_position, self.max_position)
+        velocity[(position == self.min_position) & (velocity < 0)] = 0
+
+        dones = ((position >= self.goal_position)
+                 & (velocity >= self.goal_velocity))
+        rewards = numpy.full(len(state), -1.0)
+        return numpy.stack((position, velocity), axis=1), rewards, dones
+
+    def step_single(self, state, action):
+        position, velocity = state
+        velocity += ((action - 1) * self.force
+                     + math.cos(3 * position) * (-self.gravity))
+        velocity = min(max(velocity, -self.max_speed), self.max_speed)
+        position = min(max(position + velocity, self.min_position),
+                       self.max_position)
+        if position == self.min_position and velocity < 0:
+            velocity = 0.0
+
+        done = (position >= self.goal_position
+                and velocity >= self.goal_velocity)
+        return [position, velocity], -1.0, done
+
+
+class PendulumSimulator(BatchSimulator):
+    """
+    Implements from :class:`BatchSimulator` and simulates the equations
+    of motion and cost function of `Pendulum-v1` with a continuous
+    torque per row. The episodes only end at the time limit.
+    """
+    max_episode_steps = 200
+    state_size = 2
+
+    max_speed = 8
+    max_torque = 2.0
+    dt = 0.05
+    g = 10.0
+    m = 1.0
+    l = 1.0
+
+    @property
+    def single_action_space(self):
+        from gym import spaces
+        return spaces.Box(low=-self.max_torque, high=self.max_torque,
+                          shape=(1,), dtype=numpy.float32)
+
+    def reset_state(self, generators):
+        high = numpy.array([numpy.pi, 1])
+        return numpy.array([
+            generator.uniform(low=-high, high=high)
+            for generator in generators
+        ])
+
+    def step_state(self, state, actions):
+        theta, theta_dot = state.T
+        torque = actions.reshape(len(state), -1)[:, 0]
+        torque = numpy.clip(torque, -self.max_torque, self.max_torque)
+        costs = (angle_normalize(theta) ** 2 + 0.1 * theta_dot ** 2
+                 + 0.001 * (torque ** 2))
+
+        theta_dot = theta_dot + (
+            3 * self.g / (2 * self.l) * numpy.sin(theta)
+            + 3.0 / (self.m * self.l ** 2) * torque) * self.dt
+        theta_dot = numpy.clip(theta_dot, -self.max_speed, self.max_speed)
+        theta = theta + theta_dot * self.dt
+
+        dones = numpy.zeros(len(state), dtype=bool)
+        return numpy.stack((theta, theta_dot), axis=1), -costs, dones
+
+    def step_single(self, state, action):
+        theta, theta_dot = state
+        torque = min(max(float(action[0]), -self.max_torque), self.max_torque)
+        costs = (angle_normalize(theta) ** 2 + 0.1 * theta_dot ** 2
+                 + 0.001 * (torque ** 2))
+
+        theta_dot = theta_dot + (
+            3 * self.g / (2 * self.l) * math.sin(theta)
+            + 3.0 / (self.m * self.l ** 2) * torque) * self.dt
+        theta_dot = min(max(theta_dot, -self.max_speed), self.max_speed)
+        theta = theta + theta_dot * self.dt
+        return [theta, theta_dot], -costs, False
+
+    def get_observations(self):
+        theta, theta_dot = self.state.T
+        return numpy.stack((numpy.cos(theta), numpy.sin(theta), theta_dot),
+                           axis=1).astype(numpy.float32)
+
+    def get_observation(self, state):
+        theta, theta_dot = state
+        return numpy.array((math.cos(theta), math.sin(theta), theta_dot),
+                           dtype=numpy.float32)
+
+
+class SimulatorEnv:
+    """
+    Wraps a :class:`BatchSimulator` with a single row into an
+    environment with the interface of `gym.Env`. The state is kept
+    as floats and stepped by :method:`BatchSimulator.step_single()`.
+    """
+
+    def __init__(self, simulator: BatchSimulator):
+        self.simulator = simulator
+        self.action_space = simulator.single_action_space
+        self.state: list[float] = []
+        self.elapsed_steps = 0
+
+    def reset(self, seed=None):
+        self.simulator.reset(seed=[seed])
+        self.state = self.simulator.state[0].tolist()
+        self.elapsed_steps = 0
+        return self.simulator.get_observation(self.state)
+
+    def step(self, action):
+        self.state, reward, done = self.simulator.step_single(
+            self.state, action)
+        self.elapsed_steps += 1
+        done = done or self.elapsed_steps >= self.simulator.max_episode_steps
+        return self.simulator.get_observation(self.state), reward, done, {}
+
+    def render(self, mode='human'):
+        self.simulator.render(mode)
+
+    def close(self):
+        self.simulator.close()
+
+
+SIMULATORS = {
+    'CartPole-v1': CartPoleSimulator,
+    'MountainCar-v0': MountainCarSimulator,
+    'Pendulum-v1': PendulumSimulator,
+}
+
+
+def angle_normalize(x):
+    """
+    Returns the angles normalized between -pi and pi.
+
+    :param numpy.ndarray x: Angles in radians
+    :return: Normalized angles
+    """
+    return ((x + numpy.pi) % (2 * numpy.pi)) - numpy.pi
+
+
+def make(name, num_envs=None):
+    """
+    Creates a simulator of the gym environment with the given name.
+
+    :param str name: Name of the gym environment
+    :param int num_envs: Amount of rows of a batched simulator,
+     defaults to a single environment with the interface of `gym.Env`
+    :return: Batched simulator or single environment
+    """
+    simulator = SIMULATORS[name]
+    if num_envs is None:
+        return SimulatorEnv(simulator(1))
+    return simulator(num_envs)
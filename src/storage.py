@@ -0,0 +1,201 @@
+"""
+This module holds the append-only store for the training logs.
+
+The episodes and the processed windows of the monitor are written as
+fixed-width records of a structured NumPy dtype into raw binary files,
+one chunk of records at a time. The names of the controllers are kept
+in a text file next to them and referenced by their line number, so
+every record has the same width and the files can be memory-mapped
+back as arrays without any parsing.
+"""
+import os
+
+import numpy
+
+EPISODE_DTYPE = numpy.dtype([
+    ('episode', '<i8'),
+    ('reward', '<f8'),
+    ('steps', '<i8'),
+    ('seed', '<i8'),
+    ('difficulty', '<f8'),
+    ('name', '<i4'),
+])
+WINDOW_DTYPE = numpy.dtype([
+    ('episodes', '<i8'),
+    ('highest', '<f8'),
+    ('average', '<f8'),
+    ('lowest', '<f8'),
+    ('median', '<f8'),
+    ('middle', '<f8'),
+    ('epsilon', '<f8'),
+    ('multiplier', '<f8'),
+    ('name', '<i4'),
+])
+
+EPISODES_FILE = 'episodes.bin'
+WINDOWS_FILE = 'windows.bin'
+NAMES_FILE = 'names.txt'
+
+
+class RecordWriter:
+    """
+    Class collects records of a structured dtype in a chunk
+    and appends the full chunk to a binary file.
+
+    Available methods:
+    :method:`append()`,
+    :method:`flush()`,
+    :method:`close()`
+    """
+
+    def __init__(self, path, dtype, chunk_size=1024):
+        self.path = path
+        self.chunk = numpy.zeros(chunk_size, dtype)
+        self.size = 0
+        self.file = open(path, 'ab')
+        # Drop a record that was only partly written before a crash
+        # to keep the following records aligned
+        size = os.path.getsize(path)
+        self.file.truncate(size - size % dtype.itemsize)
+
+    def append(self, values: dict[str, float | int]) -> None:
+        """
+        Adds a record and writes the chunk when it is full.
+        Fields missing from the values are written as zero.
+
+        :param dict values: Value per field of the record
+        """
+        self.chunk[self.size] = tuple(
+            values.get(field, 0) for field in self.chunk.dtype.names)
+        self.size += 1
+        if self.size == len(self.chunk):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the collected records to the end of the file.
+        """
+        self.chunk[:self.size].tofile(self.file)
+        self.file.flush()
+        self.size = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class LogStore:
+    """
+    Class writes the episodes and the processed windows of a
+    training run into a directory, see :func:`load()` to read
+    them back.
+
+    Available methods:
+    :method:`add_episode()`,
+    :method:`add_window()`,
+    :method:`get_name_id()`,
+    :method:`flush()`,
+    :method:`close()`
+    """
+
+    def __init__(self, directory, chunk_size=1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.names = load_names(directory)
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        self.names_file = open(os.path.join(directory, NAMES_FILE), 'a')
+        self.episodes = RecordWriter(
+            os.path.join(directory, EPISODES_FILE), EPISODE_DTYPE, chunk_size)
+        self.windows = RecordWriter(
+            os.path.join(directory, WINDOWS_FILE), WINDOW_DTYPE, chunk_size)
+
+    def get_name_id(self, name) -> int:
+        """
+        Returns the id of the name and adds unknown names to the names.
+
+        :param str name: Name of a controller
+        :return: Line of the name in the names file
+        """
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+            self.names_file.write(name + '\n')
+            self.names_file.flush()
+        return name_id
+
+    def add_episode(self, values: dict[str, float | int], name='') -> None:
+        """
+        Adds the values of an episode as they are given to
+        :method:`EnvironmentMonitor.monitor()`.
+
+        :param dict values: Value per field of the episode
+        :param str name: Name of the controller of the episode
+        """
+        self.episodes.append({**values, 'name': self.get_name_id(name)})
+
+    def add_window(self, result: dict[str, any], name='') -> None:
+        """
+        Adds the summary of a processed window of the monitor.
+
+        :param dict result: Result of :method:`EnvironmentMonitor.process()`
+        :param str name: Name of the controller of the window
+        """
+        self.windows.append({**result, 'name': self.get_name_id(name)})
+
+    def flush(self) -> None:
+        self.episodes.flush()
+        self.windows.flush()
+
+    def close(self) -> None:
+        self.episodes.close()
+        self.windows.close()
+        self.names_file.close()
+
+
+def load_names(directory) -> list[str]:
+    """
+    Returns the names of the controllers of a store.
+
+    :param str directory: Directory of the store
+    :return: Names ordered by their id
+    """
+    path = os.path.join(directory, NAMES_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return file.read().splitlines()
+
+
+def load_records(path, dtype) -> numpy.ndarray:
+    """
+    Memory-maps the complete records of a file as a read-only array.
+    A record that was only partly written is left out.
+
+    :param str path: Path of the binary file
+    :param numpy.dtype dtype: Dtype of the records
+    :return: Array of the records
+    """
+    if not os.path.exists(path):
+        return numpy.zeros(0, dtype)
+    size = os.path.getsize(path) // dtype.itemsize
+    if size == 0:
+        return numpy.zeros(0, dtype)
+    return numpy.memmap(path, dtype, mode='r', shape=(size,))
+
+
+def load(directory) -> tuple[numpy.ndarray, numpy.ndarray, list[str]]:
+    """
+    Loads a store written by :class:`LogStore` without copying
+    or parsing the records.
+
+    :param str directory: Directory of the store
+    :return: Episodes, windows, and the names referenced by their
+     `name` field
+    """
+    episodes = load_records(
+        os.path.join(directory, EPISODES_FILE), EPISODE_DTYPE)
+    windows = load_records(
+        os.path.join(directory, WINDOWS_FILE), WINDOW_DTYPE)
+    return episodes, windows, load_names(directory)
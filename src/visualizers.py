@@ -1,10 +1,32 @@
+import importlib.util
 import os
-import tkinter.filedialog
-import tkinter.messagebox
+import sys
 from abc import abstractmethod
 from typing import List, Callable, Dict
 
 
+def lazy_import(name):
+    """
+    Returns the module with the given name, which is only loaded
+    when one of its attributes is accessed for the first time.
+
+    :param str name: Name of the module
+    :return: Module that loads itself on first use
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+tkinter = lazy_import('tkinter')
+
+
 class Base:
     @abstractmethod
     def __init__(self, master, name):
@@ -272,6 +294,8 @@ class ActionControl(Frame):
 
 
 def select_file():
+    import tkinter.filedialog
+
     filetypes = (
         ('All files', '*.*'),
     )
@@ -0,0 +1,121 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from src import checkpoints
+from src import controllers
+from src import genetics
+from src import settings
+from src import simulators
+
+
+class Worker(controllers.EnvironmentWorker):
+    def __init__(self, env, pid, node):
+        super().__init__(env)
+        self.pid, self.node = pid, node
+        self.episode = 0
+
+    def reset(self, seed=None):
+        self.episode += 1
+        self.difficulty = (seed or 0) / 1000
+
+    def get_action(self, observation):
+        value = self.node.get_output(observation, 0)
+        return int(self.pid.get_output((value,), 0.0) > 0)
+
+    def get_reward(self, observation):
+        return -abs(observation[2])
+
+    def get_checkpoint(self):
+        return {'episode': self.episode, 'difficulty': self.difficulty}
+
+
+def generate_manager(writer=None):
+    pid = controllers.ImprovingPIDModel('PID', (0.5, 0.01, 2.0))
+    node = controllers.ImprovingNodeModel('NODE', (0.1, 0.5, 1.0, 0.3))
+    agent = controllers.ImprovingControllerManager()
+    agent.add_controller(pid)
+    agent.add_controller(node)
+    env = simulators.make('CartPole-v1')
+    worker = Worker(env, pid.model, node.model)
+    return controllers.EnvironmentManager(
+        env, agent, worker, checkpoint_writer=writer)
+
+
+def run_windows(manager, windows):
+    results = []
+    for _ in range(windows * settings.EPISODE_LEARN):
+        manager.run_sequence()
+        results.append((manager.rewards, manager.agent.get_string()))
+    return results
+
+
+class TestCheckpoints(TestCase):
+    def setUp(self) -> None:
+        self.settings = settings.get_checkpoint()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'run.ckpt')
+
+    def tearDown(self) -> None:
+        settings.set_checkpoint(self.settings)
+        self.directory.cleanup()
+
+    def test_resume_matches_uninterrupted_run(self):
+        manager = generate_manager()
+        manager.start()
+        run_windows(manager, 2)
+        checkpoints.save(self.path, manager)
+        expected = run_windows(manager, 3)
+        epsilon = settings.EPSILON.VALUE
+
+        resumed = generate_manager()
+        resumed.start()
+        checkpoints.set_checkpoint(resumed, checkpoints.load(self.path))
+        self.assertEqual(expected, run_windows(resumed, 3))
+        self.assertEqual(epsilon, settings.EPSILON.VALUE)
+        self.assertEqual(manager.episode, resumed.episode)
+        self.assertEqual(manager.logger.get_log(), resumed.logger.get_log())
+
+    def test_writer_saves_every_window(self):
+        writer = checkpoints.CheckpointWriter(self.path)
+        manager = generate_manager(writer)
+        manager.start()
+        run_windows(manager, 1)
+        writer.close()
+        checkpoint = checkpoints.load(self.path)
+        self.assertEqual(settings.EPISODE_LEARN + 1,
+                         checkpoint['manager']['episode'])
+
+    def test_stop_closes_writer(self):
+        writer = checkpoints.CheckpointWriter(self.path)
+        manager = generate_manager(writer)
+        manager.start()
+        run_windows(manager, 1)
+        manager.stop()
+        self.assertFalse(writer.thread.is_alive())
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_set_checkpoint_rejects_other_version(self):
+        manager = generate_manager()
+        checkpoint = checkpoints.get_checkpoint(manager)
+        checkpoint['version'] = 0
+        with self.assertRaises(ValueError):
+            checkpoints.set_checkpoint(manager, checkpoint)
+
+
+class TestGeneticCheckpoint(TestCase):
+    def test_set_checkpoint_restores_population(self):
+        controller = genetics.GeneticEvolutionController(4)
+        controller.add_controller(controllers.PIDModel((1, 2, 3)))
+        controller.select_controller(2)
+        controller.reward(5.0)
+        checkpoint = controller.get_checkpoint()
+
+        restored = genetics.GeneticEvolutionController(4)
+        restored.add_controller(controllers.PIDModel((0, 0, 0)))
+        restored.set_checkpoint(checkpoint)
+        self.assertEqual(controller.genetic_population,
+                         restored.genetic_population)
+        self.assertEqual((2, [5.0]), (restored.genetic_index, restored.rewards))
+        self.assertEqual(controller.name, restored.name)
+        self.assertEqual(controller.get_string(), restored.get_string())
@@ -1,8 +1,21 @@
+import dataclasses
+import importlib
+import os
+import signal
+import subprocess
+import sys
+import tempfile
 from unittest import TestCase, mock
 
+import gym
+import numpy
+
 from src import controllers
 from src import mutations
+from src import settings
+from src import simulators
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 NAME = 'TEST'
 PID = (10, 0.1, 2)
 NODE = (0.5, 0.1, 2, 0)
@@ -212,6 +225,82 @@ class TestNodeModel(BaseTest.IOModel):
         self.assertEqual(0 + 1 + -4 + 0, output)
 
 
+class TestPIDBank(TestCase):
+    def setUp(self) -> None:
+        self.presets = [PID, (5, 1, 9), (-1, 0.5, 0)]
+        self.bank = controllers.PIDBank(self.presets)
+        self.models = [controllers.PIDModel(p) for p in self.presets]
+
+    def test_init_failure(self):
+        with self.assertRaises(ValueError):
+            controllers.PIDBank([(1, 4, 5, 6)])
+
+    def test_get_model(self):
+        self.assertEqual(PID, self.bank.get_model(0))
+        self.assertEqual(self.presets, self.bank.get_models())
+
+    def test_set_model_changes_single_row(self):
+        self.bank.set_model(1, (2, 3, 4))
+        self.assertEqual([PID, (2, 3, 4), (-1, 0.5, 0)],
+                         self.bank.get_models())
+
+    def test_set_models_failure(self):
+        with self.assertRaises(ValueError):
+            self.bank.set_models([(1, 2, 3)])
+
+    def test_get_output_matches_pid_model(self):
+        targets = [100, -10, 3]
+        for values in [(10, -1, 2), (4, 2, 1), (-3, 0, 7)]:
+            output = self.bank.get_output(values, targets)
+            for model, value, target, result in zip(
+                    self.models, values, targets, output):
+                self.assertEqual(model.get_output((value,), target), result)
+
+    def test_get_output_sums_values(self):
+        output = self.bank.get_output([(4, 6), (1, 1), (0, 0)], 0.0)
+        self.assertEqual(self.models[0].get_output((4, 6), 0.0), output[0])
+
+    def test_reset_single_row(self):
+        self.bank.get_output((10, 10, 10), 100)
+        self.bank.reset(1)
+        self.assertEqual([90, 0, 90], self.bank.value_i.tolist())
+        self.bank.reset()
+        self.assertEqual([0, 0, 0], self.bank.value_d.tolist())
+
+
+class TestNodeLayer(TestCase):
+    def setUp(self) -> None:
+        self.presets = [NODE, (1, -1), (0.3, 0.2, 0.1, 4)]
+        self.layer = controllers.NodeLayer(self.presets)
+        self.models = [controllers.NodeModel(p) for p in self.presets]
+
+    def test_get_models_keeps_lengths(self):
+        self.assertEqual(self.presets, self.layer.get_models())
+
+    def test_set_model_failure(self):
+        with self.assertRaises(ValueError):
+            self.layer.set_model(0, (1, 2, 3, 4, 5))
+
+    def test_get_output_matches_node_model(self):
+        values = (0.5, 10, -2, 1)
+        output = self.layer.get_output(values, 2)
+        for model, result in zip(self.models, output):
+            self.assertAlmostEqual(model.get_output(values, 2), result)
+
+    def test_get_output_row_values(self):
+        values = [(0, 10, -2, 1), (1, 1, 1, 1), (2, 0, 0, 1)]
+        output = self.layer.get_output(values, 0)
+        self.assertEqual([-3, 0, 4.6], output.round(4).tolist())
+
+    def test_get_batch_output(self):
+        values = [(0, 10, -2, 1), (1, 2, 3, 4)]
+        output = self.layer.get_batch_output(values)
+        self.assertEqual((2, 3), output.shape)
+        for row, value in zip(output, values):
+            for model, result in zip(self.models, row):
+                self.assertAlmostEqual(model.get_output(value, 0), result)
+
+
 class TestImprovingController(BaseTest.ImprovingController):
     def setUp(self) -> None:
         # Using NodeModel because the following tests need an implemented model
@@ -251,6 +340,31 @@ class TestImprovingController(BaseTest.ImprovingController):
         self.assertEqual((1, 2, 3), self.controller.previous_model)
 
 
+    def test_evaluate_keeps_best_improving_candidate(self):
+        target = numpy.array([1.0, -1.0, 0.5])
+
+        def evaluate_models(configurations):
+            return [[-abs(numpy.array(c) - target).sum()] * 3
+                    for c in configurations]
+
+        distance = evaluate_models([self.controller.previous_model])[0][0]
+        for _ in range(20):
+            self.controller.evaluate(evaluate_models, 4)
+            self.assertEqual(self.controller.previous_model,
+                             self.controller.model.get_model())
+        self.assertGreater(
+            evaluate_models([self.controller.previous_model])[0][0], distance)
+
+    def test_evaluate_reverts_without_improvement(self):
+        def evaluate_models(configurations):
+            return [[10.0 if c == (0, 0, 0) else -10.0] * 3
+                    for c in configurations]
+
+        self.controller.evaluate(evaluate_models, 4)
+        self.assertEqual((0, 0, 0), self.controller.previous_model)
+        self.assertEqual((0, 0, 0), self.controller.model.get_model())
+
+
 class TestImprovingNodeModel(BaseTest.ImprovingController):
     def setUp(self) -> None:
         self.controller = controllers.ImprovingModelController(NAME)
@@ -298,6 +412,12 @@ class TestImprovingControllerManager(BaseTest.ImprovingController,
         self.assertEqual(11, self.manager.count)
         self.assertTrue(self.manager.is_next)
 
+    def test_eliminate_keeps_rotation(self):
+        self.manager.current_rewards = [1.0]
+        self.manager.eliminate()
+        self.assertEqual([], self.manager.current_rewards)
+        self.assertFalse(self.manager.is_next)
+
 
 class TestEnvironmentMonitor(TestCase):
     def setUp(self) -> None:
@@ -402,6 +522,50 @@ class TestEnvironmentMonitorResults(TestCase):
         self.assertEqual(9, result['episode']['average'])
 
 
+class TestEnvironmentMonitorRing(TestCase):
+    def test_results_ring_downsamples_history(self):
+        monitor = controllers.EnvironmentMonitor(capacity=3, downsample=2)
+        for episode in range(1, 11):
+            monitor.monitor({'reward': 1.0, 'episode': episode})
+            monitor.process(episode)
+        self.assertEqual([8, 9, 10], [r['episodes'] for r in monitor.results])
+        self.assertEqual([3, 5, 7], [r['episodes'] for r in monitor.history])
+
+
+class TestEpisodeBuffer(TestCase):
+    def setUp(self) -> None:
+        self.buffer = controllers.EpisodeBuffer(capacity=2)
+
+    def test_append_grows_capacity(self):
+        for episode in range(5):
+            self.buffer.append({'episode': episode, 'reward': 0.5})
+        self.assertEqual(5, len(self.buffer))
+        self.assertEqual(8, self.buffer.capacity)
+        self.assertEqual({'episode': 4, 'reward': 0.5}, self.buffer[-1])
+
+    def test_get_column_keeps_integers(self):
+        self.buffer.append({'reward': 1, 'episode': 1})
+        self.buffer.append({'reward': 1.5, 'episode': 2})
+        self.assertEqual([1, 1.5], self.buffer.get_values('reward', [0, 1]))
+        self.assertIsInstance(self.buffer[1]['episode'], int)
+
+    def test_append_new_key_adds_column(self):
+        self.buffer.append({'reward': 1.0})
+        self.buffer.append({'reward': 2.0, 'steps': 3})
+        self.assertEqual({'reward': 1.0, 'steps': 0}, self.buffer[0])
+        self.assertEqual({'reward': 2.0, 'steps': 3}, self.buffer[1])
+        self.buffer.append({'steps': 4, 'reward': 3.0})
+        self.assertEqual({'reward': 3.0, 'steps': 4}, self.buffer[2])
+
+    def test_clear_reuses_data(self):
+        self.buffer.append({'reward': 1})
+        data = self.buffer.data
+        self.buffer.clear()
+        self.buffer.append({'reward': 2})
+        self.assertIs(data, self.buffer.data)
+        self.assertEqual(1, len(self.buffer))
+
+
 class TestModuleFunctions(TestCase):
     def test_get_improvement_positive_not_zero(self):
         result = controllers.get_improvement_gain(10, 1)
@@ -559,6 +723,38 @@ class TestMutations(TestCase):
             result = mutations.mutate_io_model((0, 0), (0, 0))
         self.assertNotEqual((0, 0), result)
 
+    def test_mutate_io_models_changes_single_value_per_row(self):
+        result = mutations.mutate_io_models((1, 0, 2), (0, 0, 2), 500, 'pid')
+        self.assertEqual((500, 3), result.shape)
+        changed = result != (1, 0, 2)
+        self.assertTrue((changed.sum(axis=1) == 1).all())
+        self.assertTrue(changed.any(axis=0).all())
+        # Explored values are scaled like mutate_io_controller_random
+        bound = 0.5 * settings.MULTIPLIER_RANDOM * settings.MULTIPLIER_EPSILON
+        self.assertLessEqual(abs(result[:, 1]).max(), bound * 0.1)
+        self.assertLessEqual(abs(result[:, 2] - 2).max(), bound * 2)
+
+    def test_mutate_io_models_improves_or_explores(self):
+        improving = settings.RunConfig(state=settings.RunState(epsilon=0.0))
+        result = mutations.mutate_io_models(
+            [(1, 0), (0, 0)], [(0, 0), (0, 0)], config=improving)
+        self.assertEqual([1.8, 0], result[0].tolist())
+        self.assertEqual(1, result[1].tolist().count(0))
+        exploring = settings.RunConfig(state=settings.RunState(epsilon=1.0))
+        result = mutations.mutate_io_models(
+            (1, 0), (0, 0), 20, config=exploring)
+        self.assertTrue((result[:, 0] == 1).all())
+        self.assertTrue((result[:, 1] != 0).all())
+
+    def test_mutate_io_models_repeats_matrix(self):
+        improving = settings.RunConfig(state=settings.RunState(epsilon=0.0))
+        result = mutations.mutate_io_models(
+            [(1, 0), (0, 2)], [(0, 0), (0, 1)], 3, config=improving)
+        self.assertEqual([[1.8, 0]] * 3 + [[0, 2.8]] * 3, result.tolist())
+        with self.assertRaisesRegex(ValueError, 'shape'):
+            mutations.mutate_io_models([(1, 0), (0, 2)], [(0, 0)] * 3, 3)
+
+
 class TestEnvironmentSeedManager(TestCase):
     def setUp(self) -> None:
         self.generator = controllers.EnvironmentSeedManager()
@@ -587,3 +783,479 @@ class TestEnvironmentSeedManager(TestCase):
         a = self.generator.next_seed()
         self.assertEqual(a, self.generator.get_seed())
         self.assertIsInstance(a, int)
+
+
+class TestVectorEnvironmentManager(TestCase):
+    def setUp(self) -> None:
+        pid = controllers.PIDModel((0.5, 0.01, 2.0))
+        node = controllers.NodeModel((0.1, 0.5, 1.0, 0.3))
+
+        class Worker(controllers.EnvironmentWorker):
+            def reset(self, seed=None):
+                self.difficulty = seed / 1000
+
+            def get_action(self, observation):
+                value = node.get_output(observation, 0)
+                return int(pid.get_output((value,), 0.0) > 0)
+
+            def get_reward(self, observation):
+                return -abs(observation[2])
+
+        class Agent(controllers.ImprovingController):
+            def explore(self):
+                pass
+
+            def reset(self):
+                pid.reset()
+                node.reset()
+
+            def get_string(self):
+                return ''
+
+        self.env = gym.make('CartPole-v1')
+        self.worker, self.agent = Worker, Agent
+        self.models = [pid, node]
+
+    def run_episodes(self, manager):
+        results = []
+        for episode in range(1, 25):
+            manager.episode = episode
+            manager.step_episode()
+            results.append((manager.rewards, manager.time_steps,
+                            manager.seed_manager.output,
+                            manager.worker.difficulty))
+            if episode % 20 == 0:
+                manager.seed_manager.reset()
+        return results
+
+    def test_step_episode_matches_sequential_episodes(self):
+        manager = controllers.EnvironmentManager(
+            self.env, self.agent(), self.worker(self.env))
+        vector_env = gym.vector.make(
+            'CartPole-v1', num_envs=8, asynchronous=False)
+        vector = controllers.VectorEnvironmentManager(
+            self.env, self.agent(), self.worker(self.env),
+            vector_env, self.models)
+        self.assertEqual(self.run_episodes(manager),
+                         self.run_episodes(vector))
+        self.assertEqual(16, len(vector.batch))
+        vector.stop()
+
+    def test_batched_worker_matches_sequential_episodes(self):
+        pid, node = self.models
+
+        class Worker(self.worker):
+            batched = True
+
+            def get_actions(self, observations):
+                value = node.get_output(observations.T, 0)
+                return (pid.get_output((value,), 0.0) > 0).astype(int)
+
+            def get_rewards(self, observations):
+                return -abs(observations[:, 2])
+
+        expected = self.run_episodes(controllers.EnvironmentManager(
+            self.env, self.agent(), self.worker(self.env)))
+        for vector_env in (gym.vector.make('CartPole-v1', num_envs=8,
+                                           asynchronous=False),
+                           simulators.make('CartPole-v1', 8)):
+            vector = controllers.VectorEnvironmentManager(
+                self.env, self.agent(), Worker(self.env),
+                vector_env, self.models)
+            self.assertEqual(expected, self.run_episodes(vector))
+            self.assertEqual((0.5, 0.01, 2.0), pid.get_model())
+            self.assertEqual((0, 0, 0), pid.get_state())
+            vector.stop()
+
+    def test_eliminate_drops_rest_of_batch(self):
+        agent = self.agent()
+        agent.get_is_eliminated = lambda: len(agent.current_rewards) == 3
+        agent.eliminate = mock.Mock(side_effect=agent.reflect)
+        vector = controllers.VectorEnvironmentManager(
+            self.env, agent, self.worker(self.env),
+            simulators.make('CartPole-v1', 8), self.models)
+        vector.racing = True
+        vector.headless = True
+        vector.start()
+        for _ in range(4):
+            vector.run_sequence()
+        agent.eliminate.assert_called_once()
+        seeds = controllers.get_evaluation_seeds(settings.EPISODE_LEARN)
+        self.assertEqual(seeds[0], vector.seed_manager.output)
+        self.assertEqual(settings.EPISODE_LEARN - 1, len(vector.batch))
+        vector.stop()
+
+    def test_evaluate_configurations_matches_sequential_episodes(self):
+        configurations = [
+            [(0.5, 0.01, 2.0), (0.1, 0.5, 1.0, 0.3)],
+            [(1.0, 0.0, 0.5), (0.0, 0.2, 1.0, 0.1)],
+        ]
+        seeds = [3, 4, 5]
+        sequential = []
+        for configuration in configurations:
+            for model, model_configuration in zip(self.models, configuration):
+                model.set_model(model_configuration)
+            sequential.append([
+                controllers.run_episode(
+                    self.env, self.worker(self.env), self.agent(), seed)[0]
+                for seed in seeds])
+        vector_env = simulators.make('CartPole-v1', 4)
+        vector = controllers.VectorEnvironmentManager(
+            self.env, self.agent(), self.worker(self.env),
+            vector_env, self.models)
+        rewards = vector.evaluate_configurations(configurations, seeds)
+        self.assertEqual(sequential, rewards)
+        self.assertEqual(configurations[1], [m.get_model() for m in self.models])
+
+    def test_evaluate_configurations_share_worker_resets(self):
+        class Worker(self.worker):
+            episode = 0
+
+            def reset(self, seed=None):
+                # Rewards get harder with every reset, like the scripts
+                super().reset(seed)
+                self.episode += 1
+                self.difficulty += self.episode
+
+            def get_reward(self, observation):
+                return -self.difficulty
+
+        vector = controllers.VectorEnvironmentManager(
+            self.env, self.agent(), Worker(self.env),
+            simulators.make('CartPole-v1', 4), self.models)
+        configuration = [m.get_model() for m in self.models]
+        first, second = vector.evaluate_configurations(
+            [configuration, configuration], [3, 4, 5])
+        self.assertEqual(first, second)
+
+    def test_evaluate_models_keeps_other_models(self):
+        vector = controllers.VectorEnvironmentManager(
+            self.env, self.agent(), self.worker(self.env),
+            simulators.make('CartPole-v1', 4), self.models)
+        current = [m.get_model() for m in self.models]
+        points = [(0.1, 0.5, 1.0, 0.3), (0.0, 0.2, 1.0, 0.1)]
+        rewards = vector.evaluate_models(self.models[1], points, [3, 4])
+        self.assertEqual(vector.evaluate_configurations(
+            [[current[0], point] for point in points], [3, 4]), rewards)
+        self.assertEqual(current, [m.get_model() for m in self.models])
+
+
+class TestEnvironmentManagerHeadless(TestCase):
+    def setUp(self) -> None:
+        class Worker(controllers.EnvironmentWorker):
+            episodes = 0
+
+            def reset(self, seed=None):
+                Worker.episodes += 1
+                if Worker.episodes == self.stop_at:
+                    os.kill(os.getpid(), signal.SIGTERM)
+
+            def get_action(self, observation):
+                return int(observation[2] > 0)
+
+            def get_reward(self, observation):
+                return 0.0
+
+        class Agent(controllers.ImprovingController):
+            def explore(self):
+                pass
+
+            def reset(self):
+                pass
+
+            def get_string(self):
+                return ''
+
+        self.env = simulators.make('CartPole-v1')
+        self.env.render = mock.Mock()
+        self.worker = Worker(self.env)
+        self.worker.stop_at = 0
+        self.manager = controllers.EnvironmentManager(
+            self.env, Agent(), self.worker)
+        self.manager.fps_time = 0
+        self.cap = settings.EPISODE.CAP
+        settings.EPISODE.CAP = 30
+
+    def tearDown(self) -> None:
+        settings.EPISODE.CAP = self.cap
+
+    def test_run_headless_skips_rendering(self):
+        with mock.patch('builtins.print') as printed:
+            self.manager.run(headless=True)
+        self.env.render.assert_not_called()
+        self.assertEqual(32, self.manager.episode)
+        self.assertEqual(1, self.manager.skipped_renders)
+        self.assertGreaterEqual(self.manager.skipped_frames, 1)
+        self.assertIn('Headless: 31 episodes', printed.call_args[0][0])
+
+    def test_run_headless_stops_on_signal(self):
+        handler = signal.getsignal(signal.SIGTERM)
+        self.worker.stop_at = 5
+        with mock.patch('builtins.print'):
+            self.manager.run(headless=True)
+        self.assertEqual(6, self.manager.episode)
+        self.assertIs(handler, signal.getsignal(signal.SIGTERM))
+
+    def test_run_headless_stops_on_stop_file(self):
+        with tempfile.NamedTemporaryFile() as file, mock.patch('builtins.print'):
+            self.manager.run(headless=True, stop_file=file.name)
+        self.assertEqual(2, self.manager.episode)
+
+    def test_get_throughput_gain(self):
+        self.manager.skipped_renders = 2
+        throughput = self.manager.get_throughput(100, 4.0)
+        self.assertEqual(25.0, throughput['episodes_per_second'])
+        self.assertEqual(0.02, throughput['gain'])
+
+
+class TestPhaseTimer(TestCase):
+    setUp = TestEnvironmentManagerHeadless.setUp
+    tearDown = TestEnvironmentManagerHeadless.tearDown
+
+    def test_run_sequence_timed_adds_phases(self):
+        self.manager.timer = controllers.PhaseTimer()
+        self.manager.headless = True
+        self.manager.run_sequence()
+        self.manager.run_sequence()
+        timer = self.manager.timer
+        self.assertEqual(2, timer.counts['episode'])
+        self.assertEqual(2, timer.counts['checkpoint'])
+        self.assertEqual(timer.counts['episode.step'],
+                         timer.counts['episode.action'])
+        self.assertLessEqual(timer.times['episode.step'], timer.times['episode'])
+
+    def test_run_episode_timed_matches_run_episode(self):
+        timer = controllers.PhaseTimer()
+        expected = controllers.run_episode(
+            self.env, self.worker, self.manager.agent, 5)
+        result = controllers.run_episode(
+            self.env, self.worker, self.manager.agent, 5, timer=timer)
+        self.assertEqual(expected, result)
+        self.assertEqual(result[1] - 1, timer.counts['episode.reward'])
+
+    def test_get_line_excludes_nested_phases_from_total(self):
+        timer = controllers.PhaseTimer()
+        timer.add('episode', 750)
+        timer.add('episode.step', 500, 10)
+        timer.add('agent', 250)
+        self.assertEqual(1000, timer.get_total())
+        self.assertEqual('Time: episode 75.0%, episode.step 50.0%, '
+                         'agent 25.0%', timer.get_line())
+        self.assertIn('| episode.step |', timer.get_report())
+
+
+class TestRacing(TestCase):
+    setUp = TestEnvironmentManagerHeadless.setUp
+    tearDown = TestEnvironmentManagerHeadless.tearDown
+
+    def test_get_is_eliminated(self):
+        old = [10.0, 12.0, 11.0, 9.0]
+        self.assertTrue(controllers.get_is_eliminated([1.0, 2.0], old, 12.0))
+        self.assertFalse(controllers.get_is_eliminated([10.0, 2.0], old, 100.0))
+        self.assertFalse(controllers.get_is_eliminated([11.0, 13.0], old, 13.0))
+        self.assertFalse(controllers.get_is_eliminated([1.0], [], 12.0))
+        self.assertFalse(controllers.get_is_eliminated([], old, 12.0))
+
+    def test_get_is_eliminated_needs_bound(self):
+        old = [10.0, 10.0, 10.0, 10.0]
+        self.assertFalse(controllers.get_is_eliminated([1.0], old))
+        self.assertFalse(controllers.get_is_eliminated([1.0], old, 100.0))
+        self.assertTrue(controllers.get_is_eliminated([1.0], old, 10.0))
+
+    def test_eliminate_reverts_model(self):
+        controller = controllers.ImprovingPIDModel('PID', (1.0, 0.0, 0.0))
+        controller.previous_rewards = [10.0, 10.0]
+        controller.reward_bound = 10.0
+        controller.current_model = (2.0, 0.0, 0.0)
+        controller.model.set_model(controller.current_model)
+        controller.reward(1.0)
+        self.assertTrue(controller.get_is_eliminated())
+        controller.eliminate()
+        self.assertEqual((1.0, 0.0, 0.0), controller.model.get_model())
+        self.assertEqual([], controller.current_rewards)
+
+    def test_run_sequence_ends_eliminated_window(self):
+        agent = self.manager.agent
+        agent.get_is_eliminated = lambda: len(agent.current_rewards) == 3
+        agent.eliminate = mock.Mock(side_effect=agent.reflect)
+        self.manager.racing = True
+        for _ in range(3):
+            self.manager.run_sequence()
+        agent.eliminate.assert_called_once()
+        self.assertEqual(0, self.manager.learn_episode)
+        self.assertEqual(settings.EPISODE_LEARN - 3,
+                         self.manager.raced_episodes)
+        self.assertEqual(3, self.manager.logger.results[-1]['episodes'])
+
+    def test_get_reward_bound(self):
+        config = settings.RunConfig(time_steps=50)
+        self.assertEqual(100.0, controllers.get_reward_bound(2.0, config))
+        self.assertEqual(0.0, controllers.get_reward_bound(0.0, config))
+        self.assertEqual(-0.5, controllers.get_reward_bound(-0.5, config))
+
+    def test_script_races_rejected_candidate(self):
+        # The script changes the settings when it is imported first
+        checkpoint = settings.get_checkpoint()
+        cart_pole = importlib.import_module('Cart_Pole')
+        settings.set_checkpoint(checkpoint)
+        config = settings.RunConfig(time_steps=50)
+        balancing = (0.0, 0.0, 1.0, 1.0)
+        episodes = {}
+        for racing in (False, True):
+            cart_pole.generate_improving_model()
+            agent = cart_pole.manager
+            pid_pole, node_pole = agent.controllers[1], agent.controllers[4]
+            for controller, preset in ((pid_pole, (-1.0, 0.0, 0.0)),
+                                       (node_pole, balancing)):
+                controller.current_model = controller.previous_model = preset
+                controller.model.set_model(preset)
+            agent.select_controller(4)
+            env = simulators.make('CartPole-v1')
+            manager = controllers.EnvironmentManager(
+                env, agent, cart_pole.CartPole(env), config=config, seed=0)
+            manager.headless = True
+            manager.racing = racing
+            manager.start()
+            for _ in range(config.episode_learn):
+                manager.run_sequence()
+            # A candidate which drops the pole right away
+            node_pole.current_model = (0.0, 0.0, -1.0, -1.0)
+            node_pole.model.set_model(node_pole.current_model)
+            episodes[racing] = 0
+            while episodes[racing] == 0 or manager.learn_episode != 0:
+                manager.run_sequence()
+                episodes[racing] += 1
+            self.assertEqual(balancing, node_pole.previous_model)
+        self.assertEqual(config.episode_learn, episodes[False])
+        self.assertLess(episodes[True], episodes[False])
+
+
+class TestRewardCache(TestCase):
+    def test_put_drops_least_recently_used(self):
+        cache = controllers.RewardCache(2)
+        cache.put('a', (1.0, 10))
+        cache.put('b', (2.0, 20))
+        self.assertEqual((1.0, 10), cache.get('a'))
+        cache.put('c', (3.0, 30))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(['a', 'c'], list(cache.entries))
+        self.assertEqual(0.5, cache.get_hit_rate())
+        self.assertGreater(cache.get_memory(), 0)
+        self.assertIn('2 episodes, 50.0% hits', cache.get_line())
+
+    def test_get_key_needs_models(self):
+        cache = controllers.RewardCache()
+        worker = controllers.EnvironmentWorker(simulators.make('CartPole-v1'))
+        agent = controllers.ImprovingControllerManager()
+        agent.add_controller(controllers.ImprovingPIDModel('PID', (1, 2, 3)))
+        key = cache.get_key(agent, worker, 5)
+        self.assertEqual((((1, 2, 3),), 5, 0, 'PID'), key[:4])
+        self.assertIn(settings.TIME_STEPS, key[4])
+        self.assertIsNone(cache.get_key(agent, worker, None))
+        agent.add_controller(controllers.ImprovingController('OTHER'))
+        self.assertIsNone(cache.get_key(agent, worker, 5))
+
+    def test_get_key_includes_config(self):
+        cache = controllers.RewardCache()
+        worker = controllers.EnvironmentWorker(simulators.make('CartPole-v1'))
+        agent = controllers.ImprovingPIDModel('PID', (1, 2, 3))
+        config = settings.RunConfig()
+        key = cache.get_key(agent, worker, 5, config)
+        self.assertNotEqual(key, cache.get_key(
+            agent, worker, 5, dataclasses.replace(config, episode_learn=10)))
+        config.state.epsilon = 0.5
+        self.assertEqual(key, cache.get_key(agent, worker, 5, config))
+
+    def test_vector_manager_rejects_reward_cache(self):
+        env = simulators.make('CartPole-v1')
+        agent = controllers.ImprovingPIDModel('PID', (1, 2, 3))
+        vector = controllers.VectorEnvironmentManager(
+            env, agent, controllers.EnvironmentWorker(env),
+            simulators.make('CartPole-v1', 4), [agent.model])
+        vector.reward_cache = controllers.RewardCache()
+        with self.assertRaises(ValueError):
+            vector.step_episode()
+
+    def test_run_sequence_skips_cached_episodes(self):
+        def run(reward_cache):
+            env = simulators.make('CartPole-v1')
+            worker = controllers.EnvironmentWorker(env)
+            worker.get_action = lambda observation: int(observation[2] > 0)
+            worker.get_reward = lambda observation: 1.0
+            agent = controllers.ImprovingControllerManager()
+            agent.add_controller(
+                controllers.ImprovingPIDModel('PID', (1, 0, 0)))
+            manager = controllers.EnvironmentManager(env, agent, worker)
+            manager.reward_cache = reward_cache
+            with mock.patch.object(env, 'step', wraps=env.step) as step:
+                rewards = []
+                for _ in range(2 * settings.EPISODE_LEARN):
+                    manager.run_sequence()
+                    rewards.append((manager.rewards, manager.time_steps))
+            return rewards, step.call_count
+
+        cache = controllers.RewardCache()
+        # The model is the same for every episode, only the seed changes
+        with mock.patch.object(controllers.ImprovingPIDModel, 'explore'):
+            expected, steps = run(None)
+            rewards, cached_steps = run(cache)
+        self.assertEqual(expected, rewards)
+        self.assertGreaterEqual(cache.hits, settings.EPISODE_LEARN)
+        self.assertLess(cached_steps, steps)
+
+
+class TestRunConfig(TestCase):
+    def generate_manager(self, config):
+        agent = controllers.ImprovingControllerManager()
+        agent.add_controller(
+            controllers.ImprovingPIDModel('PID', (0.5, 0.01, 2.0)))
+        env = simulators.make('CartPole-v1')
+        return controllers.EnvironmentManager(
+            env, agent, controllers.EnvironmentWorker(env), config=config)
+
+    def test_manager_keeps_module_variables(self):
+        epsilon = settings.EPSILON.VALUE
+        config = settings.RunConfig(time_steps=5, episode_print=1,
+                                    episode_cap=100)
+        manager = self.generate_manager(config)
+        with mock.patch.object(controllers.EnvironmentWorker, 'get_action',
+                               return_value=0):
+            for _ in range(config.episode_learn):
+                manager.run_sequence()
+        self.assertEqual(epsilon, settings.EPSILON.VALUE)
+        self.assertLess(config.state.epsilon, 0.9)
+        self.assertEqual(5, manager.time_steps)
+        self.assertIs(config, manager.agent.controllers[0].config)
+
+    def test_managers_are_independent(self):
+        fast = settings.RunConfig(episode_cap=100)
+        slow = settings.RunConfig(episode_cap=100000)
+        controllers.decay_epsilon(10, fast)
+        controllers.decay_epsilon(10, slow)
+        self.assertLess(fast.state.epsilon, slow.state.epsilon)
+        self.assertIsNot(fast.state, settings.RunConfig().state)
+
+
+class TestImports(TestCase):
+    def get_loaded_modules(self, module, names):
+        code = 'import sys, {}; print(*[n in sys.modules for n in {!r}])'
+        process = subprocess.run(
+            [sys.executable, '-c', code.format(module, names)],
+            cwd=ROOT, capture_output=True, text=True, check=True)
+        return process.stdout.split()
+
+    def test_import_skips_heavy_modules(self):
+        loaded = self.get_loaded_modules(
+            'src.genetics, src.visualizers',
+            ['gym', 'tabulate', '_tkinter', 'multiprocessing'])
+        self.assertEqual(['False'] * 4, loaded)
+
+    def test_import_mutations_first(self):
+        loaded = self.get_loaded_modules('src.mutations', ['src.controllers'])
+        self.assertEqual(['True'], loaded)
+
+    def test_get_log_loads_tabulate(self):
+        monitor = controllers.EnvironmentMonitor()
+        monitor.monitor({'episode': 1, 'reward': 1.0})
+        monitor.process(1)
+        self.assertIn('|', monitor.get_log())
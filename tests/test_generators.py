@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import numpy
+
+from src import generators
+
+
+class TestBlockGenerator(TestCase):
+    def test_random_matches_generator(self):
+        generator = generators.BlockGenerator(7, block_size=4)
+        expected = numpy.random.default_rng(7).random(10).tolist()
+        self.assertEqual(expected, [generator.random() for _ in range(10)])
+        self.assertEqual((2, 3), generator.random((2, 3)).shape)
+
+    def test_integers_stay_in_range(self):
+        generator = generators.BlockGenerator(7)
+        values = {generator.integers(3) for _ in range(200)}
+        self.assertEqual({0, 1, 2}, values)
+        self.assertEqual((5,), generator.integers(0, 3, 5).shape)
+        with self.assertRaises(ValueError):
+            generator.integers(0)
+
+    def test_checkpoint_resumes_inside_block(self):
+        generator = generators.BlockGenerator(7, block_size=4)
+        for _ in range(3):
+            generator.random()
+        checkpoint = generator.get_checkpoint()
+        expected = [generator.random() for _ in range(6)]
+        resumed = generators.BlockGenerator(0, block_size=4)
+        resumed.set_checkpoint(checkpoint)
+        self.assertEqual(expected, [resumed.random() for _ in range(6)])
+
+    def test_spawn_is_independent_of_order(self):
+        root = generators.BlockGenerator(7)
+        first = root.spawn('agent').random()
+        root.random()
+        other = root.spawn(1).random()
+        self.assertEqual(first, generators.get_generator(7, 'agent').random())
+        self.assertEqual(other, generators.get_generator(7, 1).random())
+        self.assertNotEqual(first, other)
+        self.assertNotEqual(first, generators.BlockGenerator(7).random())
+        self.assertEqual(generators.get_generator(7, 'agent', 0).random(),
+                         root.spawn('agent').spawn(0).random())
@@ -1,7 +1,11 @@
 from unittest import TestCase
 
+import numpy
+
 from src import controllers
+from src import generators
 from src import genetics
+from src import settings
 
 
 class TestModelManager(TestCase):
@@ -113,3 +117,349 @@ class TestGeneticEvolutionController(TestCase):
         # self.controller.reflect()
         # self.assertEqual([0, 2, 4, 6], self.controller.previous_rewards[0])
         # self.assertEqual([3, 2, 4, 6], self.controller.previous_rewards[1])
+
+
+def generate_evaluation():
+    import gym
+
+    pid = controllers.PIDModel((0.5, 0.01, 2.0))
+    node = controllers.NodeModel((0.1, 0.5, 1.0, 0.3))
+
+    class Worker(controllers.EnvironmentWorker):
+        def get_action(self, observation):
+            value = node.get_output(observation, 0)
+            return int(pid.get_output((value,), 0.0) > 0)
+
+        def get_reward(self, observation):
+            return -abs(observation[2])
+
+    controller = genetics.GeneticEvolutionController(0)
+    controller.add_controller(pid)
+    controller.add_controller(node)
+    env = gym.make('CartPole-v1')
+    return env, Worker(env), controller
+
+
+class TestPopulationEvaluator(TestCase):
+    def setUp(self) -> None:
+        self.names = ['A:0', 'B:0', 'C:0']
+        self.genes = [
+            [(0.5, 0.01, 2.0), (0.1, 0.5, 1.0, 0.3)],
+            [(1.0, 0.0, 0.0), (0.0, 0.0, 1.0, 0.0)],
+            [(0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 0.0)],
+        ]
+
+    def test_evaluate_returns_rewards_per_seed(self):
+        evaluator = genetics.PopulationEvaluator(generate_evaluation, 0)
+        rewards = evaluator.evaluate(self.names, self.genes, [1, 2, 3, 4])
+        self.assertEqual(3, len(rewards))
+        self.assertEqual(4, len(rewards[0]))
+        self.assertNotEqual(rewards[0], rewards[2])
+
+    def test_evaluate_processes_match_serial(self):
+        serial = genetics.PopulationEvaluator(generate_evaluation, 0)
+        pool = genetics.PopulationEvaluator(generate_evaluation, 2)
+        try:
+            self.assertEqual(serial.evaluate(self.names, self.genes),
+                             pool.evaluate(self.names, self.genes))
+        finally:
+            pool.close()
+
+    def test_controller_evaluate_ranks_population(self):
+        controller = genetics.GeneticEvolutionController(3)
+        controller.add_controller(controllers.PIDModel((0, 0, 0)))
+        controller.add_controller(controllers.NodeModel((0, 0, 0, 0)))
+        for i, gene in enumerate(self.genes):
+            controller.genetic_population.set_gene(i, gene)
+        evaluator = genetics.PopulationEvaluator(generate_evaluation, 0)
+        controller.evaluate(evaluator)
+        ranks = controller.genetic_population.rank.tolist()
+        self.assertEqual(1, max(ranks))
+        self.assertEqual(0, min(ranks))
+        self.assertEqual(2, controller.genetic_index)
+
+    def test_evaluate_follows_config(self):
+        config = settings.RunConfig(time_steps=10, episode_learn=3)
+        serial = genetics.PopulationEvaluator(generate_evaluation, 0, config)
+        pool = genetics.PopulationEvaluator(generate_evaluation, 2, config)
+        try:
+            rewards = serial.evaluate(self.names, self.genes)
+            self.assertEqual(rewards, pool.evaluate(self.names, self.genes))
+        finally:
+            pool.close()
+        env, worker, controller = generate_evaluation()
+        controller.model_manager.set_models(self.genes[0])
+        self.assertEqual([controllers.run_episode(
+            env, worker, controller, seed, config)[0]
+            for seed in controllers.get_evaluation_seeds(3)], rewards[0])
+
+    def test_rank_population_with_tied_rewards(self):
+        controller = genetics.GeneticEvolutionController(3)
+        controller.add_controller(controllers.PIDModel((0, 0, 0)))
+        controller.genetic_population.rewards = [[5.0], [2.0, 5.0], [5.0]]
+        controller.rank_population()
+        self.assertEqual([1.0, 1.0, 1.0],
+                         controller.genetic_population.rank.tolist())
+
+    def test_generator_reproduces_generation(self):
+        def run(processes):
+            controller = genetics.GeneticEvolutionController(6)
+            controller.set_generator(generators.get_generator(3, 'agent'))
+            controller.add_controller(controllers.PIDModel((0.5, 0, 2)))
+            controller.add_controller(controllers.NodeModel((0, 0.5, 1, 0)))
+            evaluator = genetics.PopulationEvaluator(
+                generate_evaluation, processes)
+            try:
+                controller.evaluate(evaluator)
+            finally:
+                evaluator.close()
+            controller.explore()
+            # Draws of other controllers in the process do not matter
+            genetics.rng.random(processes + 1)
+            return controller.genetic_population.genes
+
+        numpy.testing.assert_array_equal(run(0), run(2))
+
+
+class TestBatchPopulationEvaluator(TestCase):
+    setUp = TestPopulationEvaluator.setUp
+
+    def test_evaluate_matches_population_evaluator(self):
+        from src import simulators
+
+        serial = genetics.PopulationEvaluator(generate_evaluation, 0)
+        batch = genetics.BatchPopulationEvaluator(
+            generate_evaluation,
+            lambda size: simulators.make('CartPole-v1', size))
+        seeds = [5, 6, 7]
+        self.assertEqual(serial.evaluate(self.names, self.genes, seeds),
+                         batch.evaluate(self.names, self.genes, seeds))
+
+    def test_evaluate_follows_config(self):
+        from src import simulators
+
+        config = settings.RunConfig(time_steps=10, episode_learn=3)
+        serial = genetics.PopulationEvaluator(generate_evaluation, 0, config)
+        batch = genetics.BatchPopulationEvaluator(
+            generate_evaluation,
+            lambda size: simulators.make('CartPole-v1', size), config)
+        self.assertEqual(serial.evaluate(self.names, self.genes),
+                         batch.evaluate(self.names, self.genes))
+
+
+class TestSuccessiveHalvingEvaluator(TestCase):
+    class Evaluator:
+        # Reward of a gene is its first value plus a small seed offset
+        def __init__(self):
+            self.calls = []
+
+        def evaluate(self, names, genes, seeds=None):
+            self.calls.append((list(names), list(seeds)))
+            return [[gene[0][0] + seed / 1000 for seed in seeds]
+                    for gene in genes]
+
+        def close(self):
+            pass
+
+    def setUp(self) -> None:
+        self.names = [f'{name}:0' for name in 'ABCDEFGH']
+        self.genes = [[(value, 0, 0)] for value in (3, 7, 1, 5, 8, 2, 6, 4)]
+        self.evaluator = self.Evaluator()
+
+    def test_evaluate_drops_worst_half(self):
+        halving = genetics.SuccessiveHalvingEvaluator(self.evaluator)
+        rewards = halving.evaluate(self.names, self.genes, list(range(16)))
+        names, seeds = self.evaluator.calls[1]
+        self.assertEqual(['E:0', 'B:0', 'G:0', 'D:0'], names)
+        self.assertEqual([2, 3], seeds)
+        # The order did not change, so the ranking is stable
+        self.assertEqual(2, halving.rounds)
+        self.assertEqual(8 * 2 + 4 * 2, halving.episodes)
+        self.assertEqual([2, 4, 2, 4, 4, 2, 4, 2], [len(r) for r in rewards])
+
+    def test_evaluate_continues_until_order_is_stable(self):
+        genes = [(1,), (2,), (3,), (4,)]
+
+        def evaluate(names, genes, seeds=None):
+            # The second gene gets better on the later seeds
+            return [[gene[0] + (seed > 1) * (gene[0] == 2) * 10
+                     for seed in seeds] for gene in genes]
+
+        self.evaluator.evaluate = evaluate
+        halving = genetics.SuccessiveHalvingEvaluator(
+            self.evaluator, start=2, keep=0.75)
+        rewards = halving.evaluate(self.names[:4], genes, list(range(8)))
+        self.assertEqual(3, halving.rounds)
+        self.assertEqual([2, 8, 4, 8], [len(r) for r in rewards])
+
+    def test_default_seeds_follow_config(self):
+        config = settings.RunConfig(episode_learn=4)
+        halving = genetics.SuccessiveHalvingEvaluator(
+            self.evaluator, start=4, config=config)
+        halving.evaluate(self.names, self.genes)
+        self.assertEqual(controllers.get_evaluation_seeds(4),
+                         self.evaluator.calls[0][1])
+
+    def test_controller_ranks_kept_genes_above_dropped(self):
+        controller = genetics.GeneticEvolutionController(8)
+        controller.add_controller(controllers.PIDModel((0, 0, 0)))
+        population = controller.genetic_population
+        for i, gene in enumerate(self.genes):
+            population.set_gene(i, gene)
+        halving = genetics.SuccessiveHalvingEvaluator(self.evaluator)
+        controller.evaluate(halving)
+        ranked = population.rank.argsort()[::-1]
+        self.assertEqual([8, 7, 6, 5], population.genes[ranked[:4], 0].tolist())
+
+
+class TestPopulation(TestCase):
+    def setUp(self) -> None:
+        self.controller = genetics.GeneticEvolutionController(20)
+        self.controller.add_controller(controllers.PIDModel((1, 2, 3)))
+        self.controller.add_controller(controllers.NodeModel((4, 5, 6, 7)))
+        self.population = self.controller.genetic_population
+
+    def test_add_model_randomizes_columns(self):
+        self.assertEqual((20, 7), self.population.genes.shape)
+        self.assertEqual([3, 4], self.population.sizes)
+        gene = self.population.get_gene(0)
+        self.assertEqual([3, 4], [len(model) for model in gene])
+        self.assertNotEqual([(1, 2, 3), (4, 5, 6, 7)], gene)
+
+    def test_get_name_follows_lineage(self):
+        population = self.population
+        population.name_id[:3] = [0, 1, 2]
+        population.parents[2] = [0, 1]
+        population.iteration[2] = 3
+        self.assertEqual(['A:0', 'B:0', 'C=A+B:3'],
+                         [population.get_name(i) for i in range(3)])
+
+    def test_explore_creates_next_generation(self):
+        population = self.population
+        population.rank = numpy.linspace(0, 1, 20)
+        genes = population.genes.copy()
+        self.controller.genetic_index = 19
+        self.controller.explore()
+        progress = self.controller.genetic_population
+        self.assertEqual(20, len(progress))
+        self.assertEqual((20, 7), progress.genes.shape)
+        # The parents are not changed by the mutations of their copies
+        numpy.testing.assert_array_equal(genes, population.genes)
+        mutated = progress.iteration > 0
+        self.assertTrue(numpy.all(progress.rank[mutated] == 0))
+        bred = progress.parents[:, 0] > -1
+        self.assertTrue(numpy.all(progress.parents[bred, 0]
+                                  != progress.parents[bred, 1]))
+        # Elitism keeps the individual with the highest rank
+        self.assertIn(population.name_id[-1], progress.name_id)
+
+    def test_breed_genetics_takes_whole_models(self):
+        genetics_a = numpy.zeros((50, 7))
+        genetics_b = numpy.ones((50, 7))
+        children = genetics.breed_genetics(genetics_a, genetics_b, [3, 4])
+        self.assertTrue(numpy.all(children[:, :3] == children[:, :1]))
+        self.assertTrue(numpy.all(children[:, 3:] == children[:, 3:4]))
+
+    def test_mutate_genetics_changes_one_value(self):
+        genes = numpy.zeros((30, 7))
+        mutated = genetics.mutate_genetics(genes, [3, 4])
+        self.assertEqual([1] * 30, (mutated != 0).sum(axis=1).tolist())
+        self.assertFalse(genes.any())
+
+    def test_mutate_genetics_uses_random_scale(self):
+        config = settings.RunConfig(multiplier_random=0.2,
+                                    state=settings.RunState(1.0, 5.0))
+        mutated = genetics.mutate_genetics(numpy.zeros((200, 3)), [3], config)
+        self.assertLessEqual(numpy.abs(mutated).max(), 0.5)
+        self.assertGreater(numpy.abs(mutated).max(), 0.4)
+
+
+class TestSelections(TestCase):
+    def setUp(self) -> None:
+        self.rank = numpy.array([0.0, 0.1, 0.0, 0.4, 0.5])
+
+    def test_selections_pick_exact_count(self):
+        for name, select in genetics.SELECTIONS.items():
+            with self.subTest(name):
+                picked = select(self.rank, 7)
+                self.assertEqual(7, len(picked))
+                self.assertTrue(numpy.all(picked < len(self.rank)))
+
+    def test_roulette_never_picks_zero_rank(self):
+        picked = genetics.select_roulette(self.rank, 10000)
+        counts = numpy.bincount(picked, minlength=5)
+        self.assertEqual(0, counts[0] + counts[2])
+        self.assertAlmostEqual(0.5, counts[4] / 10000, delta=0.03)
+
+    def test_universal_picks_expected_counts(self):
+        picked = genetics.select_universal(self.rank, 10)
+        counts = numpy.bincount(picked, minlength=5)
+        self.assertEqual([0, 1, 0, 4, 5], counts.tolist())
+
+    def test_tournament_prefers_higher_rank(self):
+        picked = genetics.select_tournament(self.rank, 1000, size=5)
+        counts = numpy.bincount(picked, minlength=5)
+        self.assertGreater(counts[4], counts[3])
+        self.assertGreater(counts[3], counts[1])
+
+    def test_zero_ranks_are_picked_evenly(self):
+        picked = genetics.select_roulette(numpy.zeros(4), 4000)
+        counts = numpy.bincount(picked, minlength=4)
+        self.assertTrue(numpy.all(counts > 800))
+
+    def test_not_finite_ranks_are_picked_evenly(self):
+        for name, select in genetics.SELECTIONS.items():
+            with self.subTest(name):
+                picked = select(numpy.array([numpy.nan, 1.0, numpy.inf]), 30)
+                self.assertEqual(30, len(picked))
+                self.assertTrue(numpy.all(picked < 3))
+
+    def test_explore_with_tied_rewards(self):
+        for name in genetics.SELECTIONS:
+            with self.subTest(name):
+                controller = genetics.GeneticEvolutionController(30, name)
+                controller.add_controller(controllers.PIDModel((1, 2, 3)))
+                population = controller.genetic_population
+                population.rewards = [[4.0] for _ in range(30)]
+                controller.rank_population()
+                controller.genetic_index = 29
+                controller.explore()
+                self.assertEqual(30, len(population))
+                self.assertTrue(numpy.all(numpy.isfinite(population.genes)))
+
+    def test_explore_with_zero_ranks(self):
+        for name in genetics.SELECTIONS:
+            with self.subTest(name):
+                controller = genetics.GeneticEvolutionController(30, name)
+                controller.add_controller(controllers.PIDModel((1, 2, 3)))
+                controller.genetic_population.rank[:] = 0
+                controller.genetic_index = 29
+                controller.explore()
+                population = controller.genetic_population
+                self.assertEqual(30, len(population))
+                bred = population.parents[:, 0] > -1
+                self.assertTrue(numpy.all(population.parents[bred, 0]
+                                          != population.parents[bred, 1]))
+
+
+class TestNameGenerator(TestCase):
+    def test_next_follows_alphabet(self):
+        generator = genetics.NameGenerator()
+        names = [generator.next() for _ in range(28)]
+        self.assertEqual(['A', 'B', 'C'], names[:3])
+        self.assertEqual(['Z', 'AA', 'AB'], names[25:])
+
+    def test_next_ids_continue_sequence(self):
+        generator = genetics.NameGenerator()
+        generator.next()
+        self.assertEqual([1, 2, 3], generator.next_ids(3).tolist())
+        self.assertEqual('E', generator.next())
+
+    def test_get_genome_name_sequence(self):
+        alphabet = genetics.ALPHABET
+        expected = alphabet + [a + b for a in alphabet for b in alphabet]
+        expected += [a + b + c for a in alphabet
+                     for b in alphabet for c in alphabet]
+        names = [genetics.get_genome_name(i) for i in range(len(expected))]
+        self.assertEqual(expected, names)
+        self.assertEqual('AAAA', genetics.get_genome_name(len(expected)))
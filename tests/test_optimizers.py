@@ -0,0 +1,198 @@
+from unittest import TestCase
+
+import numpy
+
+from src import controllers
+from src import generators
+from src import optimizers
+from src import simulators
+
+
+class Evaluator:
+    """
+    Rewards genes by their distance to a target configuration.
+    """
+
+    def __init__(self, target):
+        self.target = numpy.asarray(target)
+        self.episodes = 0
+
+    def evaluate(self, names, genes, seeds=None):
+        self.episodes += len(genes) * len(seeds)
+        return [[-float(((numpy.concatenate(gene) - self.target) ** 2).sum())]
+                * len(seeds) for gene in genes]
+
+
+class TestCMAESStrategy(TestCase):
+    def test_tell_moves_mean_to_optimum(self):
+        strategy = optimizers.CMAESStrategy([3.0] * 4, 1.0)
+        generator = generators.get_generator(0, 'test')
+        for _ in range(100):
+            candidates = strategy.ask(generator)
+            strategy.tell(candidates, -(candidates ** 2).sum(axis=1))
+        self.assertLess(abs(strategy.mean).max(), 1e-3)
+        self.assertLess(strategy.sigma, 1e-2)
+        self.assertEqual(100, strategy.generation)
+
+    def test_default_size(self):
+        self.assertEqual(9, optimizers.CMAESStrategy([0.0] * 6).size)
+        self.assertEqual(12, optimizers.CMAESStrategy([0.0] * 6, 1, 12).size)
+
+
+class TestCMAESController(TestCase):
+    def setUp(self) -> None:
+        self.controller = optimizers.CMAESController()
+        self.controller.set_generator(generators.get_generator(0, 'test'))
+        self.pid = controllers.PIDModel((0, 0, 0))
+        self.node = controllers.NodeModel((0, 0, 0, 0))
+        self.controller.add_controller(self.pid)
+        self.controller.add_controller(self.node)
+
+    def test_add_controller_samples_joint_candidates(self):
+        self.assertEqual((9, 7), self.controller.candidates.shape)
+        self.assertEqual(9, self.controller.get_size())
+        self.assertEqual(
+            [len(model) for model in self.controller.get_gene(0)], [3, 4])
+        self.assertEqual(self.controller.get_gene(0)[0],
+                         self.pid.get_model())
+
+    def test_seed_of_manager_reproduces_first_generation(self):
+        def run():
+            # Draws of the module generator before the seed do not matter
+            optimizers.rng.random(3)
+            controller = optimizers.CMAESController()
+            controller.add_controller(controllers.PIDModel((0, 0, 0)))
+            env = simulators.make('CartPole-v1')
+            controllers.EnvironmentManager(
+                env, controller, controllers.EnvironmentWorker(env), seed=7)
+            return controller.candidates
+
+        numpy.testing.assert_array_equal(run(), run())
+
+    def test_reflect_updates_after_generation(self):
+        controller = self.controller
+        candidates = controller.candidates.copy()
+        for index in range(controller.get_size()):
+            self.assertEqual(index, controller.candidate_index)
+            controller.reward(float(index))
+            controller.reflect()
+            controller.explore()
+        self.assertEqual(1, controller.strategy.generation)
+        self.assertFalse(numpy.array_equal(candidates, controller.candidates))
+        self.assertEqual(0, controller.candidate_index)
+
+    def test_evaluate_finds_target(self):
+        target = (1.0, 0.1, 2.0, 0.5, -0.5, 1.0, 0.0)
+        evaluator = Evaluator(target)
+        for _ in range(150):
+            self.controller.evaluate(evaluator)
+            self.controller.explore()
+        mean = numpy.concatenate(self.controller.get_mean())
+        numpy.testing.assert_allclose(target, mean, atol=1e-3)
+        self.assertEqual(150 * 9 * 20, evaluator.episodes)
+
+    def test_set_checkpoint_continues_search(self):
+        self.controller.evaluate(Evaluator([0] * 7))
+        checkpoint = self.controller.get_checkpoint()
+        self.controller.explore()
+
+        restored = optimizers.CMAESController()
+        restored.set_generator(generators.get_generator(0, 'other'))
+        restored.add_controller(controllers.PIDModel((1, 1, 1)))
+        restored.add_controller(controllers.NodeModel((1, 1, 1, 1)))
+        restored.set_checkpoint(checkpoint)
+        restored.explore()
+        numpy.testing.assert_array_equal(
+            self.controller.candidates, restored.candidates)
+        self.assertEqual(self.controller.name, restored.name)
+
+
+def get_fitness(point):
+    target, scale = numpy.array([1.0, 0.1, 2.0]), numpy.array([5, 0.1, 2])
+    return -float((((numpy.asarray(point) - target) / scale) ** 2).sum())
+
+
+class TestTuners(TestCase):
+    def run_tuner(self, tuner, iterations):
+        evaluations, generator = 0, generators.get_generator(0, 'test')
+        for _ in range(iterations):
+            points = tuner.ask(generator)
+            evaluations += len(points)
+            tuner.tell([get_fitness(point) for point in points])
+        return evaluations
+
+    def test_spsa_asks_two_points_per_iteration(self):
+        tuner = optimizers.SPSATuner((0, 0, 0), (5, 0.1, 2))
+        plus, minus = tuner.ask()
+        numpy.testing.assert_allclose((0, 0, 0), (plus + minus) / 2)
+        numpy.testing.assert_allclose((0.5, 0.01, 0.2), abs(plus))
+        tuner.tell([get_fitness(plus), get_fitness(minus)])
+        self.assertEqual(400, self.run_tuner(tuner, 200))
+        numpy.testing.assert_allclose(
+            (1.0, 0.1, 2.0), tuner.get_best(), rtol=0.05)
+
+    def test_nelder_mead_asks_simplex_first(self):
+        tuner = optimizers.NelderMeadTuner((0, 0, 0), (5, 0.1, 2))
+        self.assertEqual(4, len(tuner.ask()))
+        tuner.tell([get_fitness(point) for point in tuner.ask()])
+        self.assertEqual(1, len(tuner.ask()))
+        self.run_tuner(tuner, 200)
+        numpy.testing.assert_allclose(
+            (1.0, 0.1, 2.0), tuner.get_best(), rtol=1e-4)
+
+
+class TestTuningModelController(TestCase):
+    def setUp(self) -> None:
+        self.tuner = optimizers.TuningPIDModel('PID', (0, 0, 0))
+        self.manager = controllers.ImprovingControllerManager()
+        self.manager.add_controller(self.tuner)
+
+    def run_window(self, point=None):
+        model = self.tuner.model.get_model() if point is None else point
+        for _ in range(3):
+            self.manager.reward(get_fitness(model))
+        self.manager.reflect()
+        self.manager.explore()
+
+    def test_windows_evaluate_points(self):
+        # The first window runs the preset before the first explore
+        self.run_window()
+        self.assertEqual(0, self.tuner.tuner.iteration)
+        plus = self.tuner.model.get_model()
+        self.run_window()
+        self.assertNotEqual(plus, self.tuner.model.get_model())
+        self.run_window()
+        self.assertEqual(1, self.tuner.tuner.iteration)
+        self.assertFalse(self.tuner.get_is_eliminated())
+
+    def test_evaluate_runs_points_at_once(self):
+        calls = []
+
+        def evaluate_points(points):
+            calls.append(len(points))
+            return [[get_fitness(point)] * 3 for point in points]
+
+        for _ in range(100):
+            self.tuner.evaluate(evaluate_points)
+        self.assertEqual([2] * 100, calls)
+        self.assertEqual(self.tuner.get_best(), self.tuner.model.get_model())
+        self.assertGreater(get_fitness(self.tuner.get_best()), -0.01)
+
+    def test_set_checkpoint_continues_iteration(self):
+        self.tuner.explore()
+        self.run_window()
+        checkpoint = self.tuner.get_checkpoint()
+
+        restored = optimizers.TuningPIDModel('PID', (0, 0, 0))
+        restored.set_checkpoint(checkpoint)
+        self.assertEqual(1, len(restored.results))
+        restored.explore()
+        self.assertEqual(self.tuner.model.get_model(),
+                         restored.model.get_model())
+
+    def test_nelder_mead_method(self):
+        tuner = optimizers.TuningNodeModel('NODE', (0, 0), 'nelder_mead')
+        tuner.explore()
+        self.assertEqual(3, len(tuner.points))
+        with self.assertRaises(ValueError):
+            optimizers.TuningNodeModel('NODE')
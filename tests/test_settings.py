@@ -1,3 +1,4 @@
+import dataclasses
 from unittest import TestCase
 
 import settings
@@ -44,3 +45,30 @@ class Test(TestCase):
         self.assertEqual(1, settings.EPSILON.VALUE)
         settings.set_dict(info)
         self.assertEqual(100, settings.EPSILON.VALUE)
+
+
+class TestRunConfig(TestCase):
+
+    def test_from_module_matches_get_dict(self):
+        self.assertEqual(settings.get_dict(),
+                         settings.RunConfig.from_module().get_dict())
+
+    def test_derived_variables(self):
+        config = settings.RunConfig(episode_cap=100, epsilon_discount=0.5)
+        self.assertEqual(0.5 ** 0.1, config.epsilon_decay_rate)
+        self.assertAlmostEqual(0.05, config.improvement_threshold_rng)
+
+    def test_variables_are_frozen(self):
+        config = settings.RunConfig()
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.time_steps = 10
+        config.state.epsilon = 0.5
+        self.assertEqual(0.9, settings.RunConfig().state.epsilon)
+
+    def test_module_config_follows_variables(self):
+        time_steps = settings.TIME_STEPS
+        settings.TIME_STEPS = 7
+        self.assertEqual(7, settings.CONFIG.time_steps)
+        settings.TIME_STEPS = time_steps
+        with self.assertRaises(AttributeError):
+            settings.CONFIG.time_steps = 7
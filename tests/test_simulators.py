@@ -0,0 +1,158 @@
+from unittest import TestCase
+
+import gym
+import numpy
+
+from src import simulators
+
+SEEDS = [0, 1, 2, 3, 4, 5, 6, 7]
+
+
+class BaseTest:
+    class BatchSimulator(TestCase):
+        name = ''
+        steps = 0
+        # Whether the episodes of the policy end by the rules of the
+        # environment instead of the time limit, None without a policy
+        policy_terminated = None
+
+        def get_actions(self, rng, size):
+            raise NotImplementedError
+
+        def get_policy(self, observations):
+            raise NotImplementedError
+
+        def test_trajectories_match_gym(self):
+            simulator = simulators.make(self.name, len(SEEDS))
+            envs = [gym.make(self.name) for _ in SEEDS]
+            observations = simulator.reset(seed=SEEDS)
+            for env, seed, observation in zip(envs, SEEDS, observations):
+                numpy.testing.assert_allclose(
+                    env.reset(seed=seed), observation, atol=1e-6)
+
+            rng = numpy.random.default_rng(0)
+            finished = [False] * len(SEEDS)
+            for _ in range(self.steps):
+                actions = self.get_actions(rng, len(SEEDS))
+                observations, rewards, dones, _ = simulator.step(actions)
+                for i, env in enumerate(envs):
+                    if finished[i]:
+                        self.assertTrue(dones[i])
+                        self.assertEqual(0, rewards[i])
+                        continue
+                    observation, reward, done, _ = env.step(actions[i])
+                    numpy.testing.assert_allclose(
+                        observation, observations[i], atol=1e-5)
+                    self.assertAlmostEqual(reward, rewards[i], places=5)
+                    self.assertEqual(done, dones[i])
+                    finished[i] = done
+
+        def test_policy_matches_gym(self):
+            if self.policy_terminated is None:
+                self.skipTest('No policy which reaches the end')
+            simulator = simulators.make(self.name, len(SEEDS))
+            single = simulators.make(self.name)
+            steps = []
+            for seed in SEEDS:
+                env = gym.make(self.name)
+                observation = env.reset(seed=seed)
+                numpy.testing.assert_allclose(
+                    observation, single.reset(seed=seed), atol=1e-6)
+                done, step = False, 0
+                while not done:
+                    action = self.get_policy(observation[None])[0]
+                    observation, reward, done, _ = env.step(action)
+                    result = single.step(action)
+                    numpy.testing.assert_allclose(
+                        observation, result[0], atol=1e-5)
+                    self.assertAlmostEqual(reward, result[1], places=5)
+                    self.assertEqual(done, result[2])
+                    step += 1
+                steps.append(step)
+
+            observations = simulator.reset(seed=SEEDS)
+            while not simulator.dones.all():
+                observations, _, _, _ = simulator.step(
+                    self.get_policy(observations))
+            self.assertEqual(steps, simulator.elapsed_steps.tolist())
+            self.assertEqual([self.policy_terminated] * len(SEEDS),
+                             simulator.terminated.tolist())
+
+        def test_single_environment_interface(self):
+            env = simulators.make(self.name)
+            reference = gym.make(self.name)
+            observation = env.reset(seed=10)
+            numpy.testing.assert_allclose(
+                reference.reset(seed=10), observation, atol=1e-6)
+            action = self.get_actions(numpy.random.default_rng(0), 1)[0]
+            observation, reward, done, info = env.step(action)
+            self.assertEqual(observation.shape,
+                             reference.observation_space.shape)
+            self.assertIsInstance(reward, float)
+            self.assertIsInstance(done, bool)
+
+
+class TestCartPoleSimulator(BaseTest.BatchSimulator):
+    name = 'CartPole-v1'
+    steps = 520
+
+    policy_terminated = False
+
+    def get_actions(self, rng, size):
+        return [int(a) for a in rng.integers(0, 2, size)]
+
+    def get_policy(self, observations):
+        # Balances the pole until the time limit
+        x, x_dot, theta, theta_dot = numpy.transpose(observations)
+        return (10 * theta + 2 * theta_dot + 0.1 * x + 0.5 * x_dot
+                > 0).astype(int)
+
+    def test_finished_rows_are_frozen(self):
+        simulator = simulators.make(self.name, 2)
+        simulator.reset(seed=[1, 2])
+        simulator.dones[0] = True
+        state = simulator.state.copy()
+        simulator.step([1, 1])
+        self.assertEqual(state[0].tolist(), simulator.state[0].tolist())
+        self.assertNotEqual(state[1].tolist(), simulator.state[1].tolist())
+
+
+class TestMountainCarSimulator(BaseTest.BatchSimulator):
+    name = 'MountainCar-v0'
+    steps = 210
+
+    policy_terminated = True
+
+    def get_actions(self, rng, size):
+        return [int(a) for a in rng.choice([0, 2], size, p=[0.3, 0.7])]
+
+    def get_policy(self, observations):
+        # Pushes along the velocity until the car reaches the flag
+        return numpy.where(numpy.transpose(observations)[1] >= 0, 2, 0)
+
+    def test_goal_reached_is_masked(self):
+        simulator = simulators.make(self.name, 2)
+        simulator.reset(seed=[1, 2])
+        simulator.state[0] = (0.49, 0.05)
+        observations, rewards, dones, _ = simulator.step([2, 2])
+        self.assertEqual([True, False], simulator.goal_reached.tolist())
+        self.assertEqual([True, False], dones.tolist())
+        observations, rewards, dones, _ = simulator.step([2, 2])
+        self.assertEqual([0, -1], rewards.tolist())
+
+
+class TestPendulumSimulator(BaseTest.BatchSimulator):
+    name = 'Pendulum-v1'
+    steps = 205
+
+    def get_actions(self, rng, size):
+        return [(float(a),) for a in rng.uniform(-3, 3, size)]
+
+    def test_rewards_are_costs(self):
+        simulator = simulators.make(self.name, 2)
+        simulator.reset(seed=[1, 2])
+        simulator.state[:] = ((0, 0), (numpy.pi, 1))
+        _, rewards, dones, _ = simulator.step([(0,), (2,)])
+        self.assertEqual(0, rewards[0])
+        self.assertAlmostEqual(-(numpy.pi ** 2 + 0.1 + 0.004), rewards[1])
+        self.assertEqual([False, False], dones.tolist())
@@ -0,0 +1,104 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from src import controllers
+from src import settings
+from src import simulators
+from src import storage
+
+
+class TestLogStore(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        self.store = storage.LogStore(self.path, chunk_size=4)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def add_episodes(self, amount, name='PID'):
+        for episode in range(1, amount + 1):
+            self.store.add_episode({
+                'episode': episode, 'reward': episode / 2, 'steps': 10,
+                'seed': 100 + episode, 'difficulty': 0.5}, name)
+
+    def test_add_episode_writes_full_chunks(self):
+        self.add_episodes(6)
+        episodes, _, _ = storage.load(self.path)
+        self.assertEqual(4, len(episodes))
+        self.store.flush()
+        episodes, _, _ = storage.load(self.path)
+        self.assertEqual(list(range(1, 7)), episodes['episode'].tolist())
+        self.assertEqual(3.0, episodes['reward'][-1])
+
+    def test_load_memory_maps_records(self):
+        self.add_episodes(4)
+        episodes, windows, names = storage.load(self.path)
+        self.assertIsInstance(episodes, storage.numpy.memmap)
+        self.assertEqual(0, len(windows))
+        self.assertEqual(['PID'], names)
+
+    def test_load_skips_partial_record(self):
+        self.add_episodes(4)
+        with open(os.path.join(self.path, storage.EPISODES_FILE), 'ab') as file:
+            file.write(b'\0' * 5)
+        episodes, _, _ = storage.load(self.path)
+        self.assertEqual(4, len(episodes))
+        self.store.close()
+        store = storage.LogStore(self.path, chunk_size=1)
+        store.add_episode({'episode': 5})
+        store.close()
+        episodes, _, _ = storage.load(self.path)
+        self.assertEqual([1, 2, 3, 4, 5], episodes['episode'].tolist())
+
+    def test_names_are_kept_on_reopen(self):
+        self.add_episodes(1, 'PID')
+        self.add_episodes(1, 'NODE')
+        self.store.close()
+        store = storage.LogStore(self.path)
+        self.assertEqual(1, store.get_name_id('NODE'))
+        self.assertEqual(2, store.get_name_id('OTHER'))
+        store.close()
+        episodes, _, names = storage.load(self.path)
+        self.assertEqual(['PID', 'NODE', 'OTHER'], names)
+        self.assertEqual([0, 1], episodes['name'].tolist())
+
+
+class TestEnvironmentManagerStore(TestCase):
+    def test_run_sequence_stores_episodes_and_windows(self):
+        class Worker(controllers.EnvironmentWorker):
+            def reset(self, seed=None):
+                self.difficulty = 0.0
+
+            def get_action(self, observation):
+                return int(observation[2] > 0)
+
+            def get_reward(self, observation):
+                return 1.0
+
+        class Agent(controllers.ImprovingController):
+            def explore(self):
+                pass
+
+            def reset(self):
+                pass
+
+            def get_string(self):
+                return ''
+
+        with tempfile.TemporaryDirectory() as path:
+            env = simulators.make('CartPole-v1')
+            manager = controllers.EnvironmentManager(
+                env, Agent('AGENT'), Worker(env), storage.LogStore(path))
+            for _ in range(settings.EPISODE_LEARN * 2):
+                manager.run_sequence()
+            manager.stop()
+            episodes, windows, names = storage.load(path)
+            self.assertEqual(settings.EPISODE_LEARN * 2, len(episodes))
+            self.assertEqual(2, len(windows))
+            self.assertEqual(['AGENT'], names)
+            result = manager.logger.results[-1]
+            self.assertEqual(result['episodes'], windows['episodes'][-1])
+            self.assertEqual(result['highest'], windows['highest'][-1])
+            del episodes, windows